@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Minimal TwelveLabs REST client for background jobs.
+
+Hooks only see what the MCP tools return; background jobs such as the task
+poller talk to the API directly. Anything with the same methods can stand
+in for TwelveLabsClient (see load_client), so jobs can run against a fake
+or a different transport.
+
+Client interface:
+    host: str
+        Host the client sends requests to, used for rate limiting
+    create_task(index_id, source) -> str
+        Start indexing a local file or URL; returns the task ID
+    get_tasks(task_ids) -> list[dict]
+        Current state of the given indexing tasks, each normalized to
+        {task_id, status, video_id, filename, index_id}. Tasks the API
+        doesn't know about are left out.
+    list_videos(index_id, page, page_limit) -> dict
+    list_indexes(page, page_limit) -> dict
+        One page of a listing, newest first, as the API returns it:
+        {"data": [...], "page_info": {page, limit_per_page, total_page,
+        total_results}}. Only needed to refresh the listing mirror
+        (list_mirror.py).
+
+FakeClient is an in-memory stand-in for tests and dry runs.
+
+Configuration (environment variables):
+- TWELVELABS_API_KEY: API key (required for TwelveLabsClient)
+- TWELVELABS_API_URL: API base URL (default https://api.twelvelabs.io/v1.3)
+"""
+
+import importlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Any, Iterator, Optional
+
+from sources import is_url
+
+API_URL = os.environ.get("TWELVELABS_API_URL", "https://api.twelvelabs.io/v1.3")
+REQUEST_TIMEOUT = 30
+
+# Tasks per page when listing recent tasks to answer a batch in one request
+LIST_PAGE_LIMIT = 50
+# Pages of recent tasks to scan before falling back to per-task requests
+LIST_MAX_PAGES = 2
+
+CLIENT_ERRORS = (urllib.error.URLError, OSError, ValueError)
+
+# Bytes read per chunk when streaming a file upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def multipart_body(fields: dict, file_field: Optional[str] = None,
+                   file_path: Optional[str] = None) -> tuple[Iterator[bytes], int, str]:
+    """Build a streamed multipart/form-data body.
+
+    Returns:
+        Tuple of (chunk iterator, content length, content type). The file,
+        if any, is read in UPLOAD_CHUNK_SIZE chunks as the body is sent.
+    """
+    boundary = uuid.uuid4().hex
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    if file_path:
+        filename = os.path.basename(file_path).replace('"', "")
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+    tail = (b"\r\n" if file_path else b"") + f"--{boundary}--\r\n".encode()
+    size = os.path.getsize(file_path) if file_path else 0
+
+    def chunks():
+        yield head
+        if file_path:
+            with open(file_path, "rb") as f:
+                while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                    yield chunk
+        yield tail
+
+    return chunks(), len(head) + size + len(tail), f"multipart/form-data; boundary={boundary}"
+
+
+def normalize_task(task: dict) -> dict:
+    """Normalize an API task object to {task_id, status, video_id, filename, index_id}."""
+    metadata = task.get("system_metadata") or task.get("metadata") or {}
+    return {
+        "task_id": task.get("_id") or task.get("task_id") or task.get("id"),
+        "status": (task.get("status") or "").lower(),
+        "video_id": task.get("video_id"),
+        "filename": metadata.get("filename"),
+        "index_id": task.get("index_id"),
+    }
+
+
+class TwelveLabsClient:
+    """TwelveLabs API client using only the standard library."""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: str = API_URL):
+        self.api_key = api_key or os.environ.get("TWELVELABS_API_KEY")
+        if not self.api_key:
+            raise ValueError("TWELVELABS_API_KEY is not set")
+        self.base_url = base_url.rstrip("/")
+        self.host = urllib.parse.urlsplit(self.base_url).netloc
+
+    def request(self, method: str, path: str, params: Optional[dict] = None,
+                body: Optional[dict] = None, data: Any = None, headers: Optional[dict] = None) -> Any:
+        """Make an API request and return the decoded JSON response.
+
+        body is sent as JSON; data and headers are passed through as-is
+        for other encodings.
+        """
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        headers = dict(headers or {})
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(url, data=data, method=method, headers=headers)
+        req.add_header("x-api-key", self.api_key)
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+            return json.load(resp)
+
+    def create_task(self, index_id: str, source: str) -> str:
+        """Start an indexing task for a local file (uploaded) or a URL."""
+        if is_url(source):
+            data, length, content_type = multipart_body({"index_id": index_id, "video_url": source})
+        else:
+            data, length, content_type = multipart_body({"index_id": index_id}, "video_file", source)
+        result = self.request("POST", "/tasks", data=data, headers={
+            "Content-Type": content_type,
+            "Content-Length": str(length),
+        })
+        task_id = result.get("_id") or result.get("id")
+        if not task_id:
+            raise ValueError(f"No task ID in response: {result}")
+        return task_id
+
+    def get_task(self, task_id: str) -> Optional[dict]:
+        """Get one task, or None if it doesn't exist."""
+        try:
+            return normalize_task(self.request("GET", f"/tasks/{urllib.parse.quote(task_id)}"))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def get_tasks(self, task_ids: list[str]) -> list[dict]:
+        """Get several tasks, coalescing them into as few requests as possible.
+
+        Recent tasks are listed a page at a time, which answers a batch of
+        in-flight tasks in one request; anything not found in the first
+        LIST_MAX_PAGES pages is fetched individually.
+        """
+        wanted = set(task_ids)
+        found = {}
+        if len(wanted) > 1:
+            for page in range(1, LIST_MAX_PAGES + 1):
+                result = self.request("GET", "/tasks", params={
+                    "page": page,
+                    "page_limit": LIST_PAGE_LIMIT,
+                    "sort_by": "created_at",
+                    "sort_option": "desc",
+                })
+                for item in result.get("data", []):
+                    task = normalize_task(item)
+                    if task["task_id"] in wanted:
+                        found[task["task_id"]] = task
+                page_info = result.get("page_info") or {}
+                if len(found) == len(wanted) or page >= page_info.get("total_page", page):
+                    break
+        for task_id in task_ids:
+            if task_id not in found:
+                task = self.get_task(task_id)
+                if task is not None:
+                    found[task_id] = task
+        return [found[t] for t in task_ids if t in found]
+
+    def list_videos(self, index_id: str, page: int = 1, page_limit: int = LIST_PAGE_LIMIT) -> dict:
+        """Get one page of the videos in an index, newest first."""
+        return self.request("GET", f"/indexes/{urllib.parse.quote(index_id)}/videos", params={
+            "page": page,
+            "page_limit": page_limit,
+            "sort_by": "created_at",
+            "sort_option": "desc",
+        })
+
+    def list_indexes(self, page: int = 1, page_limit: int = LIST_PAGE_LIMIT) -> dict:
+        """Get one page of the account's indexes, newest first."""
+        return self.request("GET", "/indexes", params={
+            "page": page,
+            "page_limit": page_limit,
+            "sort_by": "created_at",
+            "sort_option": "desc",
+        })
+
+
+class FakeClient:
+    """In-memory stand-in for TwelveLabsClient.
+
+    Tasks advance one status each time they are polled and end up ready.
+    Latency and a failure rate can be simulated with TWELVELABS_FAKE_LATENCY
+    (seconds per request) and TWELVELABS_FAKE_FAILURE_RATE (0-1).
+    """
+
+    STATUSES = ("validating", "pending", "queued", "indexing", "ready")
+
+    def __init__(self, latency: Optional[float] = None, failure_rate: Optional[float] = None):
+        self.latency = float(os.environ.get("TWELVELABS_FAKE_LATENCY", 0) if latency is None else latency)
+        self.failure_rate = float(os.environ.get("TWELVELABS_FAKE_FAILURE_RATE", 0) if failure_rate is None else failure_rate)
+        self.host = "fake.twelvelabs.invalid"
+        self.tasks = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise OSError("Simulated request failure")
+
+    def create_task(self, index_id: str, source: str) -> str:
+        self._request()
+        task_id = f"fake-{uuid.uuid4().hex[:16]}"
+        with self._lock:
+            self.tasks[task_id] = {"index_id": index_id, "source": source, "step": 0,
+                                   "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.") + f"{len(self.tasks):06d}Z"}
+        return task_id
+
+    def get_tasks(self, task_ids: list[str]) -> list[dict]:
+        self._request()
+        results = []
+        with self._lock:
+            for task_id in task_ids:
+                task = self.tasks.get(task_id)
+                if task is None:
+                    continue
+                task["step"] = min(task["step"] + 1, len(self.STATUSES) - 1)
+                status = self.STATUSES[task["step"]]
+                results.append({
+                    "task_id": task_id,
+                    "status": status,
+                    "video_id": f"video-{task_id[5:]}" if status == "ready" else None,
+                    "filename": os.path.basename(task["source"]),
+                    "index_id": task["index_id"],
+                })
+        return results
+
+    def _page(self, items: list, page: int, page_limit: int) -> dict:
+        items.sort(key=lambda item: item["created_at"], reverse=True)
+        return {
+            "data": items[(page - 1) * page_limit:page * page_limit],
+            "page_info": {
+                "page": page,
+                "limit_per_page": page_limit,
+                "total_page": max(1, -(-len(items) // page_limit)),
+                "total_results": len(items),
+            },
+        }
+
+    def list_videos(self, index_id: str, page: int = 1, page_limit: int = LIST_PAGE_LIMIT) -> dict:
+        self._request()
+        with self._lock:
+            videos = [
+                {"_id": f"video-{task_id[5:]}", "created_at": task["created_at"], "updated_at": task["created_at"],
+                 "system_metadata": {"filename": os.path.basename(task["source"])}}
+                for task_id, task in self.tasks.items()
+                if task["index_id"] == index_id and task["step"] == len(self.STATUSES) - 1
+            ]
+        return self._page(videos, page, page_limit)
+
+    def list_indexes(self, page: int = 1, page_limit: int = LIST_PAGE_LIMIT) -> dict:
+        self._request()
+        with self._lock:
+            indexes = {}
+            for task in self.tasks.values():
+                created = indexes.get(task["index_id"], {}).get("created_at", task["created_at"])
+                indexes[task["index_id"]] = {"_id": task["index_id"], "index_name": task["index_id"],
+                                             "created_at": min(created, task["created_at"])}
+        return self._page(list(indexes.values()), page, page_limit)
+
+
+def load_client(spec: Optional[str] = None):
+    """Create a client from a spec.
+
+    Args:
+        spec: "twelvelabs" (the default), "fake" for FakeClient, or
+            "module:factory", where factory
+            is a class or function that takes no arguments
+
+    Returns:
+        A client instance
+    """
+    if not spec or spec == "twelvelabs":
+        return TwelveLabsClient()
+    if spec == "fake":
+        return FakeClient()
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Client spec must be 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Content-addressed store for large cached payloads.
+
+Blobs live under <state dir>/cache/<sha256>, where the hash is of the
+uncompressed bytes, so identical payloads are stored once. They are
+compressed with zstd when the zstandard package is installed and with
+gzip otherwise; the codec is recognized from the file's magic bytes on
+read, so a store can hold a mix of both.
+
+A writer stores its blob before it commits the pointer to it, so garbage
+collection spares blobs written (or reused, which refreshes their mtime)
+within the last GC_GRACE_SECONDS: an unreferenced blob that new may be
+about to be referenced.
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Blobs modified this recently are never garbage collected
+GC_GRACE_SECONDS = 60
+
+
+def default_codec() -> str:
+    """The codec used for new blobs."""
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompress a blob. Raises ValueError if it is corrupt or of an unknown codec."""
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("Blob is zstd-compressed but the zstandard package is not installed")
+        try:
+            return zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt zstd blob: {e}") from e
+    if data.startswith(GZIP_MAGIC):
+        try:
+            return gzip.decompress(data)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"Corrupt gzip blob: {e}") from e
+    raise ValueError("Unrecognized blob encoding")
+
+
+class BlobStore:
+    """Compressed, content-addressed blobs in a directory."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest
+
+    def put(self, data: bytes) -> dict:
+        """Store data and return its pointer record {sha256, codec, size}."""
+        digest = hashlib.sha256(data).hexdigest()
+        codec = default_codec()
+        path = self.path(digest)
+        try:
+            # Already stored: mark it as in use so garbage collection spares it
+            os.utime(path)
+        except FileNotFoundError:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{digest}.", suffix=".tmp", dir=self.root)
+            try:
+                with open(fd, "wb") as f:
+                    f.write(compress(data, codec))
+                os.replace(tmp_name, path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        return {"sha256": digest, "codec": codec, "size": len(data)}
+
+    def get(self, digest: str) -> bytes:
+        """Read and decompress a blob. Raises OSError if it is missing."""
+        with open(self.path(digest), "rb") as f:
+            return decompress(f.read())
+
+    def collect_garbage(self, referenced: Iterable[str], started: Optional[float] = None,
+                        candidates: Optional[Iterable[str]] = None) -> int:
+        """Delete every blob not in referenced. Returns the number removed.
+
+        Blobs modified less than GC_GRACE_SECONDS before started (a
+        time.time() value, default now) are kept, so a blob stored while
+        referenced was being collected survives. With candidates, only
+        those blobs are considered instead of the whole store.
+        """
+        if not self.root.is_dir():
+            return 0
+        cutoff = (time.time() if started is None else started) - GC_GRACE_SECONDS
+        keep = set(referenced)
+        removed = 0
+        paths = self.root.iterdir() if candidates is None else [self.path(digest) for digest in candidates]
+        for path in paths:
+            if path.name in keep or path.name.startswith("."):
+                continue
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+        return removed
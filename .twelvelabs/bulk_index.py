@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Bulk indexing of a directory tree or a manifest of sources.
+
+Collects video sources, skips anything already indexed or pending (by
+normalized source and, for local files, by content fingerprint, including
+duplicates within the same run), and starts indexing tasks through a
+bounded pool of async workers. Requests are rate limited per host with a
+token bucket, and failed requests are retried with backoff.
+
+With --upload, or whenever TWELVELABS_UPLOAD_URL is set, local files are
+first sent through the chunked upload manager (uploader.py) and indexed
+from the URL of the uploaded copy; an upload cut short resumes from its
+last acknowledged chunk on the next run.
+
+Every started task is recorded in pending_tasks as soon as the API returns
+its ID, so an interrupted run can simply be started again: sources that
+already have a task are skipped. The background poller (poller.py) or
+/twelvelabs:status then tracks the tasks to completion.
+
+Usage:
+    python bulk_index.py <directory | manifest> [options]
+
+A manifest is a text file with one local path or URL per line; blank
+lines and lines starting with # are ignored. Relative paths are resolved
+against the manifest's directory.
+
+Options:
+    --index-id ID        target index (default: the configured default index)
+    --concurrency N      parallel uploads (default 4)
+    --rate R             requests per second per host (default 2)
+    --burst N            requests allowed in a burst per host (default 4)
+    --client SPEC        "twelvelabs", "fake" or module:factory (see api_client.py)
+    --upload SPEC        upload local files in chunks first: "http" (TWELVELABS_UPLOAD_URL)
+                         or module:factory (see uploader.py)
+    --dry-run            list what would be indexed without starting tasks
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+from api_client import CLIENT_ERRORS, load_client
+from config_helper import (
+    add_pending_task,
+    get_default_index_id,
+    get_cached_full_fingerprint,
+    lookup_file_content,
+    lookup_source,
+    remove_upload,
+)
+from sources import VIDEO_EXTENSIONS, is_url, normalize_source
+
+CONCURRENCY = 4
+RATE = 2.0
+BURST = 4
+# Attempts per source before giving up, with exponential backoff between them
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 2.0
+
+
+class RateLimiter:
+    """Token bucket per host: `rate` requests per second, bursts of `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+    async def acquire(self, host: str) -> None:
+        """Wait until a request to host is allowed."""
+        while True:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self.buckets[host] = (tokens - 1, now)
+                return
+            self.buckets[host] = (tokens, now)
+            await asyncio.sleep((1 - tokens) / self.rate)
+
+
+def collect_sources(target: str) -> list[str]:
+    """List the sources in a directory tree (recursively) or a manifest file."""
+    if os.path.isdir(target):
+        sources = []
+        for root, dirs, files in os.walk(target):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            sources.extend(os.path.join(root, name) for name in sorted(files) if not name.startswith("."))
+        return sources
+
+    base = os.path.dirname(os.path.abspath(target))
+    sources = []
+    with open(target) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if not is_url(line):
+                line = os.path.join(base, os.path.expanduser(line))
+            sources.append(line)
+    return sources
+
+
+def request_host(source: str, client) -> str:
+    """Host that starting a task for source loads: the URL's host for URLs
+    (TwelveLabs downloads them), the API host for uploads."""
+    if is_url(source):
+        return urlsplit(source).netloc.lower()
+    return client.host
+
+
+def plan_source(source: str, seen: set, index_id: str | None = None,
+                read_only: bool = False) -> tuple[str | None, str | None]:
+    """Decide whether to index a source.
+
+    Args:
+        source: Local path or URL
+        seen: Source keys and fingerprints already planned in this run
+        index_id: Index the sources go to; only its videos count as duplicates
+        read_only: Don't cache fingerprints or rebuild stale indexes (dry runs)
+
+    Returns:
+        Tuple of (skip reason, fingerprint); the reason is None if the
+        source should be indexed
+    """
+    fingerprint = None
+    if not is_url(source):
+        if os.path.splitext(source.lower())[1] not in VIDEO_EXTENSIONS:
+            return "not_video", None
+        if not os.path.isfile(source):
+            return "missing", None
+
+    key = normalize_source(source)
+    found = lookup_source(source, index_id, read_only)
+    if key in seen or found["video"] or found["pending_task"]:
+        return "duplicate", None
+
+    if not is_url(source):
+        try:
+            found = lookup_file_content(source, index_id, read_only)
+        except OSError:
+            return "missing", None
+        fingerprint = found["fingerprint"]
+        if fingerprint in seen or found["video"] or found["pending_task"]:
+            return "duplicate", None
+        seen.add(fingerprint)
+
+    seen.add(key)
+    return None, fingerprint
+
+
+async def index_sources(sources: list[str], client, index_id: str, concurrency: int = CONCURRENCY,
+                        rate: float = RATE, burst: int = BURST, dry_run: bool = False,
+                        log=None, transport=None) -> dict:
+    """Start indexing tasks for sources through a bounded worker pool.
+
+    Planning (which fingerprints local files) and the blocking client calls
+    run in worker threads, so hashing a large file doesn't stall the
+    uploads in flight; state writes stay on the event loop thread. With an upload transport (see uploader.py),
+    local files are uploaded in chunks and indexed from the returned URL.
+    A dry run only plans: it leaves the plugin state untouched.
+
+    Returns:
+        Summary counts plus the list of failed sources
+    """
+    summary = {"total": len(sources), "submitted": 0, "duplicate": 0, "not_video": 0,
+               "missing": 0, "failed": 0, "failures": []}
+    limiter = RateLimiter(rate, burst)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    def fail(source: str, error: Exception | str) -> None:
+        summary["failed"] += 1
+        summary["failures"].append({"source": source, "error": str(error)})
+        if log:
+            log(f"failed     {source}: {error}")
+
+    async def submit(source: str, fingerprint: str | None) -> None:
+        target = source
+        if transport is not None and not is_url(source):
+            from uploader import UPLOAD_ERRORS, upload
+            try:
+                target = (await upload(source, transport, log=log))["url"]
+            except UPLOAD_ERRORS as e:
+                fail(source, e)
+                return
+
+        host = request_host(target, client)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await limiter.acquire(host)
+            try:
+                task_id = await asyncio.to_thread(client.create_task, index_id, target)
+                break
+            except CLIENT_ERRORS as e:
+                if attempt == MAX_ATTEMPTS:
+                    fail(source, e)
+                    return
+                await asyncio.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+        full_fingerprint = get_cached_full_fingerprint(source) if fingerprint else None
+        if not add_pending_task(task_id, source, status="validating", fingerprint=fingerprint,
+                                index_id=index_id, full_fingerprint=full_fingerprint):
+            fail(source, f"task {task_id} started but couldn't be recorded in the plugin state")
+            return
+        if target != source:
+            remove_upload(source)
+        summary["submitted"] += 1
+        if log:
+            log(f"submitted  {source} (task {task_id})")
+
+    async def worker() -> None:
+        while True:
+            source, fingerprint = await queue.get()
+            try:
+                await submit(source, fingerprint)
+            except Exception as e:
+                # Anything unexpected fails this source only; a dead worker would hang queue.join()
+                fail(source, e)
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    seen = set()
+    for source in sources:
+        reason, fingerprint = await asyncio.to_thread(plan_source, source, seen, index_id, dry_run)
+        if reason:
+            summary[reason] += 1
+            continue
+        if dry_run:
+            summary["submitted"] += 1
+            if log:
+                log(f"would index {source}")
+            continue
+        await queue.put((source, fingerprint))
+
+    await queue.join()
+    for w in workers:
+        w.cancel()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index every video in a directory tree or manifest.")
+    parser.add_argument("target", help="directory to scan, or manifest file with one path or URL per line")
+    parser.add_argument("--index-id")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=RATE)
+    parser.add_argument("--burst", type=int, default=BURST)
+    parser.add_argument("--client", default=os.environ.get("TWELVELABS_BULK_CLIENT"))
+    parser.add_argument("--upload", default=os.environ.get("TWELVELABS_UPLOAD_TRANSPORT")
+                        or ("http" if os.environ.get("TWELVELABS_UPLOAD_URL") else None))
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    index_id = args.index_id or get_default_index_id()
+    if not index_id and not args.dry_run:
+        print("No index ID: pass --index-id or set a default index", file=sys.stderr)
+        sys.exit(2)
+
+    client = None if args.dry_run else load_client(args.client)
+    transport = None
+    if args.upload and not args.dry_run:
+        from uploader import load_transport
+        transport = load_transport(args.upload)
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    summary = asyncio.run(index_sources(
+        collect_sources(args.target), client, index_id,
+        concurrency=args.concurrency, rate=args.rate, burst=args.burst,
+        dry_run=args.dry_run, log=log, transport=transport
+    ))
+    print(json.dumps(summary, indent=2))
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
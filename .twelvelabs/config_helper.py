@@ -1,6 +1,20 @@
 #!/usr/bin/env python3
 """Helper functions to read/write the TwelveLabs local config safely.
 
+State is kept by a pluggable storage backend (see storage.py): an indexed
+SQLite database by default, the plain config.json document when
+TWELVELABS_STATE_BACKEND=json, or a snapshot plus an append-only journal
+of changes when TWELVELABS_STATE_BACKEND=journal. An existing config.json
+is migrated into SQLite (or the first journal snapshot) on first use.
+
+Videos, pending tasks, cached analyses and their source and fingerprint
+indexes are sharded by index (see storage.ShardSet): each index has its own
+backend, so hooks for different indexes don't wait on each other's locks
+and only load their own index. The root state keeps the default index, the
+manifest of shards, the search cache, the listing mirror, the
+fingerprint and probe caches and chunked uploads. read_config() merges
+everything back into the schema below.
+
 Config Schema:
 {
   "default_index_id": string | null,  # Default index for operations
@@ -24,26 +38,61 @@ Config Schema:
   },
   "analysis_cache": {                  # Cached analysis results
     "<video_id>": {
-      "<analysis_type>": {
+      "<cache_key>": {                 # analysis_type, or analysis_type:<prompt hash>
+        "analysis_type": string,
+        "prompt": string,              # Optional
+        "params": object,              # Optional model parameters
         "result": any,
-        "cached_at": string            # ISO timestamp
+        "cached_at": string,           # ISO timestamp
+        "hits": int
       }
     }
   }
 }
 """
 
+import copy
 import json
 import os
-import fcntl
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
+
+import metrics
+from sources import is_url, normalize_source
+from storage import SHARDED_TABLES, STORAGE_ERRORS, DocumentTransaction, ShardSet, open_backend, shard_name
 
 # Config file location
-CONFIG_DIR = Path(__file__).parent
+CONFIG_DIR = Path(os.environ.get("TWELVELABS_STATE_DIR") or Path(__file__).parent)
 CONFIG_FILE = CONFIG_DIR / "config.json"
 
+# Storage backend: "sqlite" (default), "json" for the plain config.json file
+# or "journal" for a snapshot plus an append-only log of changes
+STATE_BACKEND = os.environ.get("TWELVELABS_STATE_BACKEND", "sqlite")
+
+# Analysis cache budget; entries are evicted least recently used first
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("TWELVELABS_ANALYSIS_CACHE_MAX_ENTRIES", 500))
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get("TWELVELABS_ANALYSIS_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+# Default time-to-live for cached analyses, in seconds
+ANALYSIS_CACHE_TTL = int(os.environ.get("TWELVELABS_ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+# Analysis results larger than this many bytes (serialized) go to the blob store
+BLOB_THRESHOLD = int(os.environ.get("TWELVELABS_BLOB_THRESHOLD", 4096))
+BLOB_DIR = CONFIG_DIR / "cache"
+# Eviction trims the cache to this fraction of the budget so it doesn't run on every write
+ANALYSIS_CACHE_LOW_WATER = 0.9
+
+# Search result cache: entries expire after the TTL (seconds) and the least
+# recently used are evicted beyond the entry budget
+SEARCH_CACHE_TTL = int(os.environ.get("TWELVELABS_SEARCH_CACHE_TTL", 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("TWELVELABS_SEARCH_CACHE_MAX_ENTRIES", 200))
+
+# Mirrored video and index listings are served for this many seconds after a sync
+LIST_MIRROR_TTL = int(os.environ.get("TWELVELABS_LIST_MIRROR_TTL", 600))
+
+# Full-text index over cached analysis and search results (see segment_index.py)
+SEGMENT_INDEX_PATH = CONFIG_DIR / "segments.db"
+
 # Default config schema
 DEFAULT_CONFIG = {
     "default_index_id": None,
@@ -52,97 +101,391 @@ DEFAULT_CONFIG = {
     "analysis_cache": {}
 }
 
+# Initial contents of a per-index shard
+SHARD_DEFAULT = {
+    "videos": {},
+    "pending_tasks": {},
+    "analysis_cache": {}
+}
+
+# Bump to force a rebuild of the source/fingerprint indexes from videos/pending_tasks
+SOURCE_INDEX_VERSION = 2
+
+# Bump to re-split the root state into per-index shards
+SHARD_LAYOUT_VERSION = 1
+
+_backend = None
+_shards = None
+_known_shards = set()
+_blob_store = None
+_segment_index = None
+
 
 def get_config_path() -> Path:
-    """Get the path to the config file."""
-    return CONFIG_FILE
+    """Get the path to the file backing the current storage backend."""
+    return get_backend().path
+
+
+def get_backend():
+    """Get the storage backend, opening it on first use."""
+    global _backend
+    if _backend is None:
+        _backend = open_backend(STATE_BACKEND, CONFIG_DIR, DEFAULT_CONFIG)
+    return _backend
+
+
+def _get_blob_store():
+    """Get the blob store for large cached results, creating it on first use."""
+    global _blob_store
+    if _blob_store is None:
+        from blob_store import BlobStore
+        _blob_store = BlobStore(BLOB_DIR)
+    return _blob_store
+
+
+def _get_segment_index():
+    """Get the local segment index, opening it on first use."""
+    global _segment_index
+    if _segment_index is None:
+        from segment_index import SegmentIndex
+        _segment_index = SegmentIndex(SEGMENT_INDEX_PATH)
+    return _segment_index
+
+
+@contextmanager
+def config_transaction(event: Optional[str] = None) -> Iterator[Any]:
+    """Run a read -> mutate -> write cycle as one atomic transaction.
+
+    Yields a transaction with row-level get/put/delete/rows/find and
+    get_meta/set_meta methods. The state lock is held until the block
+    exits; changes are committed on a clean exit and discarded if the
+    block raises. Storage errors propagate to the caller. event names the
+    change in the journal backend's log ("update" if omitted).
+
+    Example:
+        with config_transaction() as txn:
+            task = txn.get("pending_tasks", task_id)
+            task["status"] = "indexing"
+            txn.put("pending_tasks", task_id, task)
+    """
+    with get_backend().transaction(event) as txn:
+        yield txn
+
+
+def get_shards() -> ShardSet:
+    """Get the per-index shards, splitting an unsharded state on first use."""
+    global _shards
+    if _shards is None:
+        _shards = ShardSet(get_backend().name, CONFIG_DIR, SHARD_DEFAULT)
+        _migrate_to_shards()
+    return _shards
+
+
+def _shard_id(record: dict) -> str:
+    """The shard a video or pending task lives in: its index, or "" if unknown."""
+    return record.get("index_id") or ""
+
+
+def _shard(index_id: Optional[str]):
+    """Get the backend of an index's shard."""
+    return get_shards().get(index_id)
+
+
+@contextmanager
+def shard_transaction(index_id: Optional[str], event: Optional[str] = None) -> Iterator[Any]:
+    """Like config_transaction(), on the shard of one index.
+
+    index_id None or "" is the shard of records whose index is unknown. The
+    shard is added to the root manifest the first time it is written.
+    """
+    created = _register_shard(index_id or "")
+    with _shard(index_id).transaction(event) as txn:
+        if created:
+            txn.set_meta("source_index_version", SOURCE_INDEX_VERSION)
+        yield txn
+
+
+def _register_shard(index_id: str) -> bool:
+    """Add a shard to the root manifest ("shards") if it isn't there yet.
+
+    Returns True if this call added it.
+    """
+    if index_id in _known_shards:
+        return False
+    get_shards()
+    created = False
+    with get_backend().read() as txn:
+        shards = txn.get_meta("shards") or {}
+    if index_id not in shards:
+        with config_transaction("shard_registered") as txn:
+            shards = txn.get_meta("shards") or {}
+            if index_id not in shards:
+                shards[index_id] = {
+                    "name": shard_name(index_id),
+                    "created_at": datetime.utcnow().isoformat() + "Z"
+                }
+                txn.set_meta("shards", shards)
+                created = True
+    _known_shards.add(index_id)
+    return created
+
+
+def _shard_ids() -> list[str]:
+    """IDs of the indexes that have a shard ("" for unknown), default index first.
+
+    Records without an index ID at hand are found by probing the shards in
+    this order, so with one index in use a probe stops at the first shard.
+    """
+    get_shards()
+    with get_backend().read() as txn:
+        shards = txn.get_meta("shards") or {}
+        default = txn.get_meta("default_index_id")
+    return sorted(shards, key=lambda index_id: index_id != default)
+
+
+def _locate(table: str, record_ids: list[str]) -> dict[str, str]:
+    """Find the shards holding some videos or pending tasks.
+
+    Returns {record_id: index ID of its shard ("" for unknown)}, without
+    the records no shard has.
+    """
+    found = {}
+    for index_id in _shard_ids():
+        missing = [record_id for record_id in record_ids if record_id not in found]
+        if not missing:
+            break
+        with _shard(index_id).read() as txn:
+            for record_id in missing:
+                if txn.get(table, record_id) is not None:
+                    found[record_id] = index_id
+    return found
+
+
+def _find_shard(table: str, record_id: str) -> Optional[str]:
+    """Find the shard holding a video or pending task, or None if no shard has it."""
+    return _locate(table, [record_id]).get(record_id)
+
+
+def _migrate_to_shards() -> None:
+    """Move the per-video tables of an unsharded root state into shards.
+
+    Videos and pending tasks go to the shard of their index_id and cached
+    analyses follow their video (or go to the unknown shard). Runs once,
+    when the shards are first used, and again after write_config().
+    """
+    backend = get_backend()
+    with backend.read() as txn:
+        if txn.get_meta("shard_layout") == SHARD_LAYOUT_VERSION:
+            return
+        # Nothing to move; don't write the root just to mark it
+        if not any(next(txn.rows(table), None) for table in SHARDED_TABLES):
+            return
+
+    with config_transaction("shards_migrated") as txn:
+        if txn.get_meta("shard_layout") == SHARD_LAYOUT_VERSION:
+            return
+        grouped = {}
+        video_shards = {}
+        for table in ("videos", "pending_tasks"):
+            for key, record in txn.rows(table):
+                if table == "videos":
+                    video_shards[key] = _shard_id(record)
+                grouped.setdefault(_shard_id(record), []).append((table, key, record))
+        for key, entry in txn.rows("analysis_cache"):
+            grouped.setdefault(video_shards.get(key[0], ""), []).append(("analysis_cache", key, entry))
+
+        shards = txn.get_meta("shards") or {}
+        now = datetime.utcnow().isoformat() + "Z"
+        for index_id, rows in grouped.items():
+            with _shard(index_id).transaction("shards_migrated") as shard_txn:
+                for table, key, record in rows:
+                    shard_txn.put(table, key, record)
+                _rebuild_source_index(shard_txn)
+                shard_txn.set_meta("analysis_cache_usage", _cache_usage(shard_txn, recount=True))
+            shards.setdefault(index_id, {"name": shard_name(index_id), "created_at": now})
+        for table in SHARDED_TABLES:
+            txn.clear(table)
+        txn.set_meta("shards", shards)
+        txn.set_meta("shard_layout", SHARD_LAYOUT_VERSION)
 
 
 def read_config() -> dict:
-    """Read the config file safely.
-    
-    Returns the config dict, or default config if file doesn't exist.
+    """Read the whole config as a dict, with every shard merged in.
+
+    Returns the config dict, or default config if it can't be read.
+    Prefer the targeted helpers below, which only touch the rows they need.
     """
-    if not CONFIG_FILE.exists():
-        return DEFAULT_CONFIG.copy()
-    
     try:
-        with open(CONFIG_FILE, "r") as f:
-            config = json.load(f)
-        # Ensure all required keys exist
-        for key in DEFAULT_CONFIG:
-            if key not in config:
-                config[key] = DEFAULT_CONFIG[key]
-        return config
-    except (json.JSONDecodeError, IOError):
-        return DEFAULT_CONFIG.copy()
+        config = get_backend().load()
+        merged = DocumentTransaction(config)
+        usage = {"entries": 0, "bytes": 0}
+        for index_id in _shard_ids():
+            shard = DocumentTransaction(_shard(index_id).load())
+            for table in SHARDED_TABLES:
+                for key, record in shard.rows(table):
+                    merged.put(table, key, record)
+            for name, value in _cache_usage(shard).items():
+                usage[name] += value
+        config["analysis_cache_usage"] = usage
+    except STORAGE_ERRORS:
+        return copy.deepcopy(DEFAULT_CONFIG)
+    # Ensure all required keys exist
+    for key in DEFAULT_CONFIG:
+        if key not in config:
+            config[key] = copy.deepcopy(DEFAULT_CONFIG[key])
+    return config
 
 
 def write_config(config: dict) -> bool:
-    """Write the config file safely with file locking.
-    
+    """Replace the whole config, splitting it into the per-index shards.
+
+    Each shard's index_version is bumped, since its videos may have
+    changed, so cached searches and listings of the old contents stop
+    matching.
+
     Returns True on success, False on failure.
     """
     try:
-        # Ensure directory exists
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        
-        # Write with exclusive lock to prevent race conditions
-        with open(CONFIG_FILE, "w") as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-            try:
-                json.dump(config, f, indent=2)
-                f.write("\n")
-            finally:
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        for index_id in _shard_ids():
+            shard = _shard(index_id)
+            with shard.read() as txn:
+                version = txn.get_meta("index_version", 0)
+            shard.replace(dict(copy.deepcopy(SHARD_DEFAULT), index_version=version + 1,
+                               analysis_cache_usage={"entries": 0, "bytes": 0}))
+        get_backend().replace(config)
+        with config_transaction() as txn:
+            txn.set_meta("shard_layout", None)
+        _known_shards.clear()
+        _migrate_to_shards()
         return True
-    except (IOError, OSError):
+    except STORAGE_ERRORS:
         return False
 
 
 def get_default_index_id() -> Optional[str]:
     """Get the default index ID from config."""
-    config = read_config()
-    return config.get("default_index_id")
+    try:
+        with get_backend().read() as txn:
+            return txn.get_meta("default_index_id")
+    except STORAGE_ERRORS:
+        return None
 
 
 def set_default_index_id(index_id: str) -> bool:
     """Set the default index ID."""
-    config = read_config()
-    config["default_index_id"] = index_id
-    return write_config(config)
+    try:
+        with config_transaction("default_index_set") as txn:
+            txn.set_meta("default_index_id", index_id)
+        return True
+    except STORAGE_ERRORS:
+        return False
 
 
-def add_pending_task(task_id: str, source: str, status: str = "pending") -> bool:
-    """Add a task to pending_tasks."""
-    config = read_config()
-    config["pending_tasks"][task_id] = {
+def _index_keys(record: dict) -> list[tuple[str, str]]:
+    """The (table, key) index entries that should point at a record."""
+    keys = []
+    source_key = normalize_source(record.get("source"))
+    if source_key:
+        keys.append(("source_index", source_key))
+    if record.get("fingerprint"):
+        keys.append(("fingerprint_index", record["fingerprint"]))
+    return keys
+
+
+def _index_record(txn, record: dict, task_id: Optional[str] = None,
+                  video_id: Optional[str] = None) -> None:
+    """Point the record's source and fingerprint keys at a task and/or video."""
+    for table, key in _index_keys(record):
+        entry = txn.get(table, key) or {}
+        if task_id is not None:
+            entry["task_id"] = task_id
+        if video_id is not None:
+            entry["video_id"] = video_id
+        txn.put(table, key, entry)
+
+
+def _unindex_task(txn, task: dict) -> None:
+    """Drop a pending task from the source and fingerprint indexes."""
+    for table, key in _index_keys(task):
+        entry = txn.get(table, key)
+        if entry is None or entry.get("task_id") != task.get("task_id"):
+            continue
+        del entry["task_id"]
+        if entry:
+            txn.put(table, key, entry)
+        else:
+            txn.delete(table, key)
+
+
+def _rebuild_source_index(txn) -> None:
+    """Rebuild source_index and fingerprint_index from videos and pending_tasks."""
+    txn.clear("source_index")
+    txn.clear("fingerprint_index")
+    for video_id, video in list(txn.rows("videos")):
+        _index_record(txn, video, video_id=video_id)
+    for task_id, task in list(txn.rows("pending_tasks")):
+        _index_record(txn, task, task_id=task_id)
+    txn.set_meta("source_index_version", SOURCE_INDEX_VERSION)
+
+
+def add_pending_task(task_id: str, source: str, status: str = "pending",
+                     fingerprint: Optional[str] = None, index_id: Optional[str] = None,
+                     full_fingerprint: Optional[str] = None) -> bool:
+    """Add a task to pending_tasks.
+
+    fingerprint is the content fingerprint of a local source file (see
+    get_file_fingerprint), full_fingerprint its full hash if known, and
+    index_id the index the video is added to; all three are carried over
+    to the video on completion.
+    """
+    task = {
         "task_id": task_id,
         "source": source,
         "status": status,
         "started_at": datetime.utcnow().isoformat() + "Z"
     }
-    return write_config(config)
+    if fingerprint:
+        task["fingerprint"] = fingerprint
+    if full_fingerprint:
+        task["full_fingerprint"] = full_fingerprint
+    if index_id:
+        task["index_id"] = index_id
+    try:
+        with shard_transaction(index_id, "task_added") as txn:
+            txn.put("pending_tasks", task_id, task)
+            _index_record(txn, task, task_id=task_id)
+        return True
+    except STORAGE_ERRORS:
+        return False
 
 
 def update_pending_task_status(task_id: str, status: str) -> bool:
     """Update the status of a pending task."""
-    config = read_config()
-    if task_id in config["pending_tasks"]:
-        config["pending_tasks"][task_id]["status"] = status
-        return write_config(config)
-    return False
+    try:
+        shard = _find_shard("pending_tasks", task_id)
+        if shard is None:
+            return False
+        with shard_transaction(shard, "task_status") as txn:
+            task = txn.get("pending_tasks", task_id)
+            if task is None:
+                return False
+            task["status"] = status
+            txn.put("pending_tasks", task_id, task)
+        return True
+    except STORAGE_ERRORS:
+        return False
 
 
-def complete_task(task_id: str, video_id: str, filename: Optional[str] = None) -> bool:
-    """Move a task from pending_tasks to videos when indexing completes."""
-    config = read_config()
-    
-    task = config["pending_tasks"].pop(task_id, None)
-    if task is None:
-        return False
-    
-    config["videos"][video_id] = {
+def _move_to_videos(txn, task: dict, video_id: str, filename: Optional[str],
+                    index_id: Optional[str] = None) -> None:
+    """Replace a pending task with its video record inside a shard transaction.
+
+    The video stays in its task's shard, which gets a new version; that
+    invalidates the cached search results of the index.
+    """
+    task_id = task["task_id"]
+    index_id = index_id or task.get("index_id")
+    video = {
         "video_id": video_id,
         "task_id": task_id,
         "source": task.get("source", "unknown"),
@@ -150,79 +493,1232 @@ def complete_task(task_id: str, video_id: str, filename: Optional[str] = None) -
         "status": "ready",
         "indexed_at": datetime.utcnow().isoformat() + "Z"
     }
-    return write_config(config)
+    for field in ("fingerprint", "full_fingerprint"):
+        if task.get(field):
+            video[field] = task[field]
+    if index_id:
+        video["index_id"] = index_id
+    txn.delete("pending_tasks", task_id)
+    _unindex_task(txn, task)
+    _index_record(txn, video, video_id=video_id)
+    txn.put("videos", video_id, video)
+    _bump_index_version(txn)
+
+
+def complete_task(task_id: str, video_id: str, filename: Optional[str] = None) -> bool:
+    """Move a task from pending_tasks to videos when indexing completes."""
+    try:
+        shard = _find_shard("pending_tasks", task_id)
+        if shard is None:
+            return False
+        with shard_transaction(shard, "task_completed") as txn:
+            task = txn.get("pending_tasks", task_id)
+            if task is None:
+                return False
+            _move_to_videos(txn, task, video_id, filename)
+        return True
+    except STORAGE_ERRORS:
+        return False
 
 
 def fail_task(task_id: str) -> bool:
     """Mark a pending task as failed and remove from pending."""
-    config = read_config()
-    if task_id in config["pending_tasks"]:
-        del config["pending_tasks"][task_id]
-        return write_config(config)
-    return False
+    try:
+        shard = _find_shard("pending_tasks", task_id)
+        if shard is None:
+            return False
+        with shard_transaction(shard, "task_failed") as txn:
+            task = txn.get("pending_tasks", task_id)
+            if task is None:
+                return False
+            txn.delete("pending_tasks", task_id)
+            _unindex_task(txn, task)
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def _apply_task_update(txn, task: dict) -> dict:
+    """Apply one normalized task status update inside a shard transaction."""
+    task_id = task["task_id"]
+    status = task.get("status")
+    video_id = task.get("video_id")
+
+    pending = txn.get("pending_tasks", task_id)
+    if pending is None:
+        return {"action": "skipped", "reason": "not tracked locally", "task_id": task_id}
+    if status == "ready" and not video_id:
+        return {"action": "ready_but_no_video_id", "task_id": task_id, "success": False}
+    if status == "ready":
+        _move_to_videos(txn, pending, video_id, task.get("filename"), task.get("index_id"))
+        return {"action": "completed", "task_id": task_id, "video_id": video_id, "success": True}
+    if status == "failed":
+        txn.delete("pending_tasks", task_id)
+        _unindex_task(txn, pending)
+        return {"action": "failed", "task_id": task_id, "success": True}
+    if pending.get("status") != status:
+        pending["status"] = status
+        txn.put("pending_tasks", task_id, pending)
+    return {"action": "updated", "task_id": task_id, "status": status, "success": True}
+
+
+def apply_task_updates(tasks: list[dict]) -> list[dict]:
+    """Reconcile a batch of task status updates, one transaction per shard.
+
+    Each task is a normalized dict with task_id, status, video_id and
+    filename. Ready tasks move to videos, failed tasks are dropped from
+    pending_tasks and any other status is recorded on the pending task.
+
+    Returns one outcome dict per input task, in order, with an "action" of
+    "completed", "failed", "updated", "ready_but_no_video_id" or "skipped".
+    """
+    outcomes = [None] * len(tasks)
+    try:
+        located = _locate("pending_tasks", [task["task_id"] for task in tasks if task.get("task_id")])
+    except STORAGE_ERRORS:
+        located = {}
+
+    by_shard = {}
+    for i, task in enumerate(tasks):
+        task_id = task.get("task_id")
+        if not task_id:
+            outcomes[i] = {"action": "skipped", "reason": "no task_id"}
+        elif task_id not in located:
+            outcomes[i] = {"action": "skipped", "reason": "not tracked locally", "task_id": task_id}
+        else:
+            by_shard.setdefault(located[task_id], []).append(i)
+
+    for shard, indexes in by_shard.items():
+        try:
+            with shard_transaction(shard, "task_updates") as txn:
+                for i in indexes:
+                    outcomes[i] = _apply_task_update(txn, tasks[i])
+        except STORAGE_ERRORS:
+            for i in indexes:
+                if outcomes[i] is None:
+                    outcomes[i] = {"action": "skipped", "reason": "storage error", "task_id": tasks[i]["task_id"]}
+                elif "success" in outcomes[i]:
+                    outcomes[i]["success"] = False
+    return outcomes
 
 
 def get_video(video_id: str) -> Optional[dict]:
     """Get video info by video_id."""
-    config = read_config()
-    return config["videos"].get(video_id)
+    try:
+        return _get_record("videos", video_id)
+    except STORAGE_ERRORS:
+        return None
 
 
-def get_video_by_source(source: str) -> Optional[dict]:
-    """Find a video by its source path/URL."""
-    config = read_config()
-    for video in config["videos"].values():
-        if video.get("source") == source:
-            return video
+def _get_record(table: str, record_id: str) -> Optional[dict]:
+    """Get a video or pending task from whichever shard holds it."""
+    for index_id in _shard_ids():
+        with _shard(index_id).read() as txn:
+            record = txn.get(table, record_id)
+        if record is not None:
+            return record
     return None
 
 
-def is_video_indexed(source: str) -> bool:
-    """Check if a video source is already indexed."""
-    return get_video_by_source(source) is not None
+def _resolve_index(txn, table: str, key: str) -> dict:
+    """Resolve a source or fingerprint index key to its video and pending task."""
+    entry = txn.get(table, key) or {}
+    video_id = entry.get("video_id")
+    task_id = entry.get("task_id")
+    return {
+        "video": txn.get("videos", video_id) if video_id else None,
+        "pending_task": txn.get("pending_tasks", task_id) if task_id else None
+    }
+
+
+def lookup_source(source: str, index_id: Optional[str] = None, read_only: bool = False) -> dict:
+    """Find the indexed video and pending task for a source in one lookup.
+
+    The source is normalized first (see sources.normalize_source), so a
+    relative path, its absolute form and a symlink to it all match, as do
+    URLs differing only in tracking parameters or Google Drive link shape.
+    With index_id, only that index (and videos of unknown index) is
+    searched; otherwise every index is. With read_only, a stale index is
+    rebuilt in memory for this lookup instead of being saved.
+
+    Returns {"video": dict | None, "pending_task": dict | None}.
+    """
+    return _lookup_index("source_index", normalize_source(source), index_id, read_only)
+
+
+def lookup_fingerprint(fingerprint: str, index_id: Optional[str] = None, read_only: bool = False) -> dict:
+    """Find the indexed video and pending task with the same content.
+
+    index_id and read_only work as in lookup_source().
+
+    Returns {"video": dict | None, "pending_task": dict | None}.
+    """
+    return _lookup_index("fingerprint_index", fingerprint, index_id, read_only)
+
+
+def _lookup_index(table: str, key: Optional[str], index_id: Optional[str] = None,
+                  read_only: bool = False) -> dict:
+    """Look up an index key in each shard searched, stopping once both are found."""
+    found = {"video": None, "pending_task": None}
+    if not key:
+        return found
+    try:
+        shards = _shard_ids()
+        if index_id:
+            shards = [shard for shard in (index_id, "") if shard in shards]
+        for shard in shards:
+            for name, record in _lookup_shard_index(shard, table, key, read_only).items():
+                found[name] = found[name] or record
+            if found["video"] and found["pending_task"]:
+                break
+    except STORAGE_ERRORS:
+        return {"video": None, "pending_task": None}
+    return found
+
+
+def _lookup_shard_index(shard: str, table: str, key: str, read_only: bool = False) -> dict:
+    """Look up an index key in one shard, rebuilding its indexes first if they are stale."""
+    with _shard(shard).read() as txn:
+        if txn.get_meta("source_index_version") == SOURCE_INDEX_VERSION:
+            return _resolve_index(txn, table, key)
+        if read_only:
+            scratch = DocumentTransaction({name: dict(txn.rows(name)) for name in ("videos", "pending_tasks")})
+            _rebuild_source_index(scratch)
+            return _resolve_index(scratch, table, key)
+    # Index missing or outdated (e.g. state migrated from an older version)
+    with shard_transaction(shard, "source_index_rebuilt") as txn:
+        if txn.get_meta("source_index_version") != SOURCE_INDEX_VERSION:
+            _rebuild_source_index(txn)
+        return _resolve_index(txn, table, key)
+
+
+def _cached_fingerprints(path: str) -> tuple[str, dict, dict]:
+    """Return (file key, stat, cache entry) for a local file.
+
+    The entry is empty if the file was never fingerprinted or has changed
+    since. Raises OSError if the file can't be read.
+    """
+    from fingerprint import file_identity
+
+    file_key, stat = file_identity(path)
+    try:
+        with get_backend().read() as txn:
+            cached = txn.get("fingerprint_cache", file_key)
+    except STORAGE_ERRORS:
+        cached = None
+    if cached and cached.get("mtime_ns") == stat["mtime_ns"] and cached.get("size") == stat["size"]:
+        return file_key, stat, cached
+    return file_key, stat, {}
+
+
+def get_file_fingerprint(path: str, full: bool = False, read_only: bool = False) -> str:
+    """Get the content fingerprint of a local file.
+
+    Files over fingerprint.FULL_HASH_LIMIT get a sampled fingerprint. With
+    full=True the whole file is hashed instead (full:<size>:<digest>),
+    which is what confirms a match on a sampled fingerprint; the full hash
+    is cached next to the sampled one.
+
+    Results are cached by (inode, mtime, size), so a multi-GB file is only
+    read again after it changes; with read_only a computed fingerprint
+    isn't added to the cache. Raises OSError if the file can't be read.
+    """
+    from fingerprint import file_fingerprint, full_fingerprint
+
+    file_key, stat, entry = _cached_fingerprints(path)
+    name = "full_fingerprint" if full else "fingerprint"
+    if entry.get(name) or (full and entry.get("fingerprint", "").startswith("full:")):
+        metrics.note("cache_fingerprint", "hit")
+        return entry.get(name) or entry["fingerprint"]
+    metrics.note("cache_fingerprint", "miss")
+
+    entry = dict(entry or stat)
+    if "fingerprint" not in entry:
+        entry["fingerprint"] = file_fingerprint(path)
+    if full:
+        fingerprint = entry["fingerprint"]
+        entry["full_fingerprint"] = fingerprint if fingerprint.startswith("full:") else full_fingerprint(path)
+    if read_only:
+        return entry[name]
+    try:
+        with config_transaction("fingerprint_cached") as txn:
+            txn.put("fingerprint_cache", file_key, entry)
+    except STORAGE_ERRORS:
+        pass
+    return entry[name]
+
+
+def get_cached_full_fingerprint(path: str) -> Optional[str]:
+    """The full hash of a local file if it is already known, without reading the file."""
+    try:
+        entry = _cached_fingerprints(path)[2]
+    except OSError:
+        return None
+    fingerprint = entry.get("fingerprint", "")
+    return entry.get("full_fingerprint") or (fingerprint if fingerprint.startswith("full:") else None)
+
+
+def _record_full_fingerprint(record: dict, fingerprint: str, read_only: bool = False,
+                             hash_source: bool = True) -> Optional[str]:
+    """The full hash of a video's or task's content, or None if it can't be known.
+
+    Uses the hash stored with the record, or hashes its source file if that
+    is still on disk with the same sampled fingerprint. Without hash_source
+    only a full hash already cached for the source file is used.
+    """
+    if record.get("full_fingerprint"):
+        return record["full_fingerprint"]
+    source = record.get("source")
+    if not source or is_url(source):
+        return None
+    try:
+        if get_file_fingerprint(source, read_only=read_only) != fingerprint:
+            return None
+        if not hash_source:
+            return get_cached_full_fingerprint(source)
+        return get_file_fingerprint(source, full=True, read_only=read_only)
+    except OSError:
+        return None
+
+
+def lookup_file_content(path: str, index_id: Optional[str] = None, read_only: bool = False,
+                        max_full_bytes: Optional[int] = None) -> dict:
+    """Find the indexed video and pending task with the same content as a local file.
+
+    Two files can share a sampled fingerprint without being identical, so
+    a sampled match is confirmed by comparing full hashes: the local file
+    is hashed in full, and so is the match's source file unless its full
+    hash is already stored with it. A match whose content turns out to
+    differ is dropped. One that can't be hashed (its source is gone or has
+    changed) is kept with "confirmed" False.
+
+    Files larger than max_full_bytes aren't hashed in full; only full hashes
+    that are already known are compared, and a match that can't be
+    confirmed that way is kept with "confirmed" False.
+
+    index_id and read_only work as in lookup_source(); with read_only no
+    fingerprint is cached either. Raises OSError if the file can't be read.
+
+    Returns {"video", "pending_task", "fingerprint", "confirmed"}, where
+    "confirmed" refers to the video if there is one, else the pending task.
+    """
+    fingerprint = get_file_fingerprint(path, read_only=read_only)
+    found = dict(lookup_fingerprint(fingerprint, index_id, read_only), fingerprint=fingerprint, confirmed=True)
+    if not fingerprint.startswith("sample:") or not (found["video"] or found["pending_task"]):
+        return found
+
+    hash_files = max_full_bytes is None or os.path.getsize(path) <= max_full_bytes
+    if hash_files:
+        full = get_file_fingerprint(path, full=True, read_only=read_only)
+    else:
+        full = get_cached_full_fingerprint(path)
+    confirmed = []
+    for name in ("video", "pending_task"):
+        if found[name] is None:
+            continue
+        other = _record_full_fingerprint(found[name], fingerprint, read_only, hash_files)
+        if full is not None and other is not None and other != full:
+            found[name] = None
+        else:
+            confirmed.append(full is not None and other is not None)
+    found["confirmed"] = confirmed[0] if confirmed else True
+    return found
+
+
+def probe_video_file(path: str) -> dict:
+    """Read the container headers of a local video (see probe.py).
+
+    Returns the probe result, {"error": "..."} if the file is empty,
+    truncated or has a corrupt header, or {"unprobed": "..."} if its
+    headers are too large to read within the probe's budget. Results are
+    cached by (inode, mtime, size) like fingerprints, so a file is only
+    probed again after it changes. Raises OSError if the file can't be read.
+    """
+    from fingerprint import file_identity
+    from probe import PROBE_VERSION, ProbeError, ProbeLimitError, probe_file
+
+    file_key, stat = file_identity(path)
+    try:
+        with get_backend().read() as txn:
+            cached = txn.get("probe_cache", file_key)
+    except STORAGE_ERRORS:
+        cached = None
+    if (cached and cached.get("mtime_ns") == stat["mtime_ns"] and cached.get("size") == stat["size"]
+            and cached.get("version") == PROBE_VERSION):
+        metrics.note("cache_probe", "hit")
+        return cached["probe"]
+    metrics.note("cache_probe", "miss")
+
+    try:
+        result = probe_file(path)
+    except ProbeError as e:
+        result = {"error": str(e)}
+    except ProbeLimitError as e:
+        result = {"unprobed": str(e)}
+    try:
+        with config_transaction("probe_cached") as txn:
+            txn.put("probe_cache", file_key, dict(stat, version=PROBE_VERSION, probe=result))
+    except STORAGE_ERRORS:
+        pass
+    return result
+
+
+def get_video_by_source(source: str, index_id: Optional[str] = None) -> Optional[dict]:
+    """Find a video by its source path/URL, in index_id or any index."""
+    return lookup_source(source, index_id)["video"]
+
+
+def is_video_indexed(source: str, index_id: Optional[str] = None) -> bool:
+    """Check if a video source is already indexed, in index_id or any index."""
+    return get_video_by_source(source, index_id) is not None
 
 
 def get_pending_task(task_id: str) -> Optional[dict]:
     """Get a pending task by task_id."""
-    config = read_config()
-    return config["pending_tasks"].get(task_id)
+    try:
+        return _get_record("pending_tasks", task_id)
+    except STORAGE_ERRORS:
+        return None
 
 
 def get_all_pending_tasks() -> dict:
-    """Get all pending tasks."""
-    config = read_config()
-    return config["pending_tasks"]
+    """Get all pending tasks, across every index."""
+    try:
+        pending = {}
+        for index_id in _shard_ids():
+            with _shard(index_id).read() as txn:
+                pending.update(txn.rows("pending_tasks"))
+        return pending
+    except STORAGE_ERRORS:
+        return {}
 
 
-def cache_analysis(video_id: str, analysis_type: str, result: Any) -> bool:
-    """Cache an analysis result."""
-    config = read_config()
-    if video_id not in config["analysis_cache"]:
-        config["analysis_cache"][video_id] = {}
-    
-    config["analysis_cache"][video_id][analysis_type] = {
-        "result": result,
-        "cached_at": datetime.utcnow().isoformat() + "Z"
+def get_upload(source: str) -> Optional[dict]:
+    """Get the chunked upload recorded for a local file (see uploader.py)."""
+    try:
+        with get_backend().read() as txn:
+            return txn.get("uploads", normalize_source(source))
+    except STORAGE_ERRORS:
+        return None
+
+
+def find_upload_by_url(url: str) -> Optional[dict]:
+    """Get the completed upload whose assembled file is served at url."""
+    try:
+        with get_backend().read() as txn:
+            return txn.find("uploads", "url", url)
+    except STORAGE_ERRORS:
+        return None
+
+
+def get_all_uploads() -> dict:
+    """Get every recorded upload, keyed by normalized source."""
+    try:
+        with get_backend().read() as txn:
+            return dict(txn.rows("uploads"))
+    except STORAGE_ERRORS:
+        return {}
+
+
+def start_upload(source: str, upload_id: str, size: int, mtime_ns: int, chunk_size: int) -> Optional[dict]:
+    """Record a new upload of a local file, replacing any earlier one.
+
+    Returns the upload record, or None if it couldn't be saved.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    upload = {
+        "source": source,
+        "upload_id": upload_id,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "chunk_size": chunk_size,
+        "chunks": {},
+        "status": "uploading",
+        "url": None,
+        "started_at": now,
+        "updated_at": now,
     }
-    return write_config(config)
+    try:
+        with config_transaction("upload_started") as txn:
+            txn.put("uploads", normalize_source(source), upload)
+        return upload
+    except STORAGE_ERRORS:
+        return None
+
+
+def ack_upload_chunks(source: str, checksums: dict[int, str]) -> bool:
+    """Record chunks the upload server acknowledged, as {index: sha256}."""
+    try:
+        with config_transaction("upload_chunks") as txn:
+            upload = txn.get("uploads", normalize_source(source))
+            if upload is None:
+                return False
+            upload["chunks"].update((str(index), digest) for index, digest in checksums.items())
+            upload["updated_at"] = datetime.utcnow().isoformat() + "Z"
+            txn.put("uploads", normalize_source(source), upload)
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def complete_upload(source: str, url: str) -> bool:
+    """Mark an upload complete, with the URL of the assembled file."""
+    try:
+        with config_transaction("upload_completed") as txn:
+            upload = txn.get("uploads", normalize_source(source))
+            if upload is None:
+                return False
+            upload.update(status="complete", url=url, updated_at=datetime.utcnow().isoformat() + "Z")
+            txn.put("uploads", normalize_source(source), upload)
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def remove_upload(source: str) -> bool:
+    """Forget the upload of a local file."""
+    try:
+        with config_transaction("upload_removed") as txn:
+            txn.delete("uploads", normalize_source(source))
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def _analysis_shard(video_id: str) -> str:
+    """The shard caching a video's analyses: the video's, or the unknown-index
+    shard for videos indexed elsewhere."""
+    return _find_shard("videos", video_id) or ""
+
+
+def is_error_result(result: Any) -> bool:
+    """Whether a tool result reports a failure rather than an answer.
+
+    Recognizes the MCP isError flag, an "error" or "errors" field, a failed
+    status, and text (plain or in MCP content items) that opens with an
+    error message such as "Error: ..." or "Failed to ...". Such results
+    must not be cached, or the failure would be replayed instead of the
+    call being retried.
+    """
+    if isinstance(result, dict):
+        if result.get("isError") or result.get("is_error") or result.get("error") or result.get("errors"):
+            return True
+        if str(result.get("status") or "").lower() in ("error", "failed", "failure"):
+            return True
+        content = result.get("content")
+        if isinstance(content, list):
+            texts = [item.get("text") for item in content if isinstance(item, dict) and item.get("type") == "text"]
+            return bool(texts) and is_error_result(texts[0])
+        return False
+    if isinstance(result, str):
+        text = result.strip()
+        if text.startswith("{") and len(text) < 65536:
+            try:
+                return is_error_result(json.loads(text))
+            except ValueError:
+                pass
+        import re
+        return re.match(r"(error\b[^\n]{0,40}:|failed to\s)", text, re.IGNORECASE) is not None
+    return False
+
+
+def analysis_cache_key(analysis_type: str, prompt: Optional[str] = None,
+                       params: Optional[dict] = None) -> str:
+    """Build the cache key for an analysis request.
+
+    The prompt is normalized (whitespace collapsed, case folded) and hashed
+    together with any model parameters, so the same question asked again
+    hits the cache while a different question gets its own entry. Requests
+    without a prompt or parameters are keyed by analysis_type alone.
+    """
+    if not prompt and not params:
+        return analysis_type
+    import hashlib
+
+    normalized = " ".join((prompt or "").split()).casefold()
+    digest = hashlib.sha256(
+        json.dumps([normalized, params or {}], sort_keys=True).encode()
+    ).hexdigest()[:16]
+    return f"{analysis_type}:{digest}"
+
+
+def _is_expired(entry: dict, now: datetime, default_ttl: int = ANALYSIS_CACHE_TTL) -> bool:
+    """Check if a cache entry has outlived its TTL."""
+    try:
+        cached_at = datetime.fromisoformat(entry["cached_at"].rstrip("Z"))
+    except (KeyError, ValueError):
+        return True
+    ttl = entry.get("ttl", default_ttl)
+    return (now - cached_at).total_seconds() > ttl
 
 
-def get_cached_analysis(video_id: str, analysis_type: str) -> Optional[dict]:
-    """Get a cached analysis result."""
-    config = read_config()
-    video_cache = config["analysis_cache"].get(video_id, {})
-    return video_cache.get(analysis_type)
+def _cache_usage(txn, recount: bool = False) -> dict:
+    """Get the running entry/byte totals, counting them if missing or asked to."""
+    usage = None if recount else txn.get_meta("analysis_cache_usage")
+    if usage is None:
+        usage = {"entries": 0, "bytes": 0}
+        for _, entry in txn.rows("analysis_cache"):
+            usage["entries"] += 1
+            usage["bytes"] += entry.get("size", 0)
+    return usage
+
+
+def _drop_cache_entry(txn, key: tuple, entry: dict, usage: dict, dropped_blobs: Optional[list] = None) -> None:
+    """Delete a cache entry and take it off the running totals.
+
+    The entry's blob, if any, is added to dropped_blobs for _release_blobs()
+    once the transaction has committed.
+    """
+    txn.delete("analysis_cache", key)
+    usage["entries"] -= 1
+    usage["bytes"] -= entry.get("size", 0)
+    if dropped_blobs is not None and "blob" in entry:
+        dropped_blobs.append(entry["blob"]["sha256"])
+
+
+def _release_blobs(digests: list) -> None:
+    """Delete the blobs of dropped cache entries that no entry points to any more.
+
+    Blobs are content-addressed and may be shared, so every shard is
+    checked first. Call after the dropping transaction has committed.
+    """
+    digests = set(digests)
+    if not digests:
+        return
+    try:
+        for index_id in _shard_ids():
+            with _shard(index_id).read() as txn:
+                for _, entry in txn.rows("analysis_cache"):
+                    if "blob" in entry:
+                        digests.discard(entry["blob"]["sha256"])
+            if not digests:
+                return
+        _get_blob_store().collect_garbage((), candidates=digests)
+    except STORAGE_ERRORS:
+        pass  # compact() collects them later
+
+
+def _evict_analysis_cache(txn, usage: dict, force: bool = False, dropped_blobs: Optional[list] = None) -> dict:
+    """Drop expired entries, then least recently used ones, until the cache
+    fits its budget.
+
+    Only runs when the cache is over budget (or force is set), and then
+    trims down to ANALYSIS_CACHE_LOW_WATER of the budget so the next few
+    writes don't trigger another full pass. Blobs of dropped entries are
+    added to dropped_blobs (see _drop_cache_entry).
+
+    Returns counts of expired and evicted entries.
+    """
+    counts = {"expired": 0, "evicted": 0}
+    over = usage["entries"] > ANALYSIS_CACHE_MAX_ENTRIES or usage["bytes"] > ANALYSIS_CACHE_MAX_BYTES
+    if not (over or force):
+        return counts
+
+    now = datetime.utcnow()
+    live = []
+    for key, entry in list(txn.rows("analysis_cache")):
+        if _is_expired(entry, now):
+            _drop_cache_entry(txn, key, entry, usage, dropped_blobs)
+            counts["expired"] += 1
+        else:
+            live.append((entry.get("last_accessed") or entry.get("cached_at", ""), key, entry))
+
+    max_entries = int(ANALYSIS_CACHE_MAX_ENTRIES * ANALYSIS_CACHE_LOW_WATER) if over else ANALYSIS_CACHE_MAX_ENTRIES
+    max_bytes = int(ANALYSIS_CACHE_MAX_BYTES * ANALYSIS_CACHE_LOW_WATER) if over else ANALYSIS_CACHE_MAX_BYTES
+    live.sort(key=lambda item: item[0])
+    for _, key, entry in live:
+        if usage["entries"] <= max_entries and usage["bytes"] <= max_bytes:
+            break
+        _drop_cache_entry(txn, key, entry, usage, dropped_blobs)
+        counts["evicted"] += 1
+    return counts
+
+
+def cache_analysis(video_id: str, analysis_type: str, result: Any,
+                   prompt: Optional[str] = None, params: Optional[dict] = None,
+                   ttl: Optional[int] = None) -> bool:
+    """Cache an analysis result.
+
+    Several entries are kept per video, one per distinct (analysis_type,
+    prompt, params) combination. Results larger than BLOB_THRESHOLD bytes
+    are stored compressed in the blob store with only a pointer kept in
+    the state. The entry expires after ttl seconds
+    (default ANALYSIS_CACHE_TTL), and the least recently used entries are
+    evicted once the cache exceeds its entry or byte budget; blobs no
+    entry points to any more are deleted with them. The result's
+    text is added to the segment index. Each stored result counts as a
+    cache miss, since it was fetched because the cache didn't have it.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    payload = json.dumps(result)
+    entry = {
+        "analysis_type": analysis_type,
+        "cached_at": now,
+        "last_accessed": now,
+        "size": len(payload)
+    }
+    if len(payload) > BLOB_THRESHOLD:
+        # Keep only a pointer in the state; the payload is read back lazily
+        try:
+            entry["blob"] = _get_blob_store().put(payload.encode())
+        except OSError:
+            return False
+    else:
+        entry["result"] = result
+    if prompt:
+        entry["prompt"] = prompt
+    if params:
+        entry["params"] = params
+    if ttl is not None:
+        entry["ttl"] = ttl
+    key = (video_id, analysis_cache_key(analysis_type, prompt, params))
+    dropped_blobs = []
+    try:
+        with shard_transaction(_analysis_shard(video_id), "analysis_cached") as txn:
+            usage = _cache_usage(txn)
+            previous = txn.get("analysis_cache", key)
+            if previous is not None:
+                _drop_cache_entry(txn, key, previous, usage, dropped_blobs)
+            txn.put("analysis_cache", key, entry)
+            usage["entries"] += 1
+            usage["bytes"] += entry["size"]
+            _evict_analysis_cache(txn, usage, dropped_blobs=dropped_blobs)
+            txn.set_meta("analysis_cache_usage", usage)
+            stats = txn.get_meta("analysis_cache_stats") or {"hits": 0, "misses": 0}
+            stats["misses"] += 1
+            txn.set_meta("analysis_cache_stats", stats)
+    except STORAGE_ERRORS:
+        return False
+    _release_blobs(dropped_blobs)
+    _index_segments(f"analysis:{key[0]}:{key[1]}", analysis_type, result, video_id)
+    return True
+
+
+def get_cached_analysis(video_id: str, analysis_type: str, prompt: Optional[str] = None,
+                        params: Optional[dict] = None) -> Optional[dict]:
+    """Get a cached analysis result and record the hit.
+
+    The lookup runs in a read transaction, so a miss takes no write lock;
+    only a hit (or an expired entry to drop) upgrades to a write for the
+    LRU bookkeeping. Expired entries, and entries whose blob has gone
+    missing, count as a miss and are dropped. A hit refreshes the entry's
+    last_accessed time for LRU eviction. Blob-backed results are only read
+    and decompressed here, on a hit. Misses are counted by cache_analysis(),
+    when the result fetched after the miss is stored.
+    """
+    key = (video_id, analysis_cache_key(analysis_type, prompt, params))
+    shard = _analysis_shard(video_id)
+    try:
+        # Look up without the write lock; a miss leaves the state untouched
+        entry = None
+        if shard in _shard_ids():
+            with _shard(shard).read() as txn:
+                entry = txn.get("analysis_cache", key)
+        if entry is None:
+            metrics.note("cache_analysis", "miss")
+            return None
+
+        dropped_blobs = []
+        with shard_transaction(shard, "analysis_lookup") as txn:
+            entry = txn.get("analysis_cache", key)
+            now = datetime.utcnow()
+            if entry is not None and (_is_expired(entry, now) or "blob" in entry and not _load_blob_result(entry)):
+                usage = _cache_usage(txn)
+                _drop_cache_entry(txn, key, entry, usage, dropped_blobs)
+                txn.set_meta("analysis_cache_usage", usage)
+                entry = None
+            metrics.note("cache_analysis", "hit" if entry is not None else "miss")
+            if entry is not None:
+                stats = txn.get_meta("analysis_cache_stats") or {"hits": 0, "misses": 0}
+                stats["hits"] += 1
+                txn.set_meta("analysis_cache_stats", stats)
+                entry["hits"] = entry.get("hits", 0) + 1
+                entry["last_accessed"] = now.isoformat() + "Z"
+                stored = dict(entry)
+                if "blob" in stored:
+                    del stored["result"]
+                txn.put("analysis_cache", key, stored)
+    except STORAGE_ERRORS:
+        return None
+    _release_blobs(dropped_blobs)
+    return entry
+
+
+def _load_blob_result(entry: dict) -> bool:
+    """Fill entry["result"] from its blob. Returns False if the blob is unreadable."""
+    try:
+        entry["result"] = json.loads(_get_blob_store().get(entry["blob"]["sha256"]))
+        return True
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def get_analysis_cache_stats() -> dict:
+    """Get analysis cache hit/miss counters and its entry/byte totals, over every index."""
+    stats = {"hits": 0, "misses": 0}
+    usage = {"entries": 0, "bytes": 0}
+    try:
+        for index_id in _shard_ids():
+            with _shard(index_id).read() as txn:
+                for totals, values in ((stats, txn.get_meta("analysis_cache_stats") or {}),
+                                       (usage, _cache_usage(txn))):
+                    for name in totals:
+                        totals[name] += values.get(name, 0)
+    except STORAGE_ERRORS:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0, "bytes": 0}
+    lookups = stats["hits"] + stats["misses"]
+    return dict(stats, hit_rate=stats["hits"] / lookups if lookups else 0.0, **usage)
 
 
 def clear_analysis_cache(video_id: Optional[str] = None) -> bool:
     """Clear analysis cache for a video or all videos."""
-    config = read_config()
-    if video_id:
-        if video_id in config["analysis_cache"]:
-            del config["analysis_cache"][video_id]
-    else:
-        config["analysis_cache"] = {}
-    return write_config(config)
+    try:
+        dropped_blobs = []
+        for index_id in [_analysis_shard(video_id)] if video_id else _shard_ids():
+            with shard_transaction(index_id, "analysis_cleared") as txn:
+                if video_id:
+                    usage = _cache_usage(txn)
+                    for key, entry in list(txn.rows("analysis_cache", video_id)):
+                        _drop_cache_entry(txn, key, entry, usage, dropped_blobs)
+                else:
+                    dropped_blobs += [entry["blob"]["sha256"] for _, entry in txn.rows("analysis_cache") if "blob" in entry]
+                    txn.clear("analysis_cache")
+                    usage = {"entries": 0, "bytes": 0}
+                txn.set_meta("analysis_cache_usage", usage)
+        _release_blobs(dropped_blobs)
+        _get_segment_index().remove(f"analysis:{video_id}:" if video_id else "analysis:")
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def search_cache_key(query: str, options: Optional[dict] = None) -> str:
+    """Build the cache key for a search request.
+
+    The query is normalized (whitespace collapsed, case folded) and hashed
+    together with the search options, so re-running the same query with
+    different spacing or capitalization hits the same entry.
+    """
+    import hashlib
+
+    normalized = " ".join(query.split()).casefold()
+    return hashlib.sha256(
+        json.dumps([normalized, options or {}], sort_keys=True).encode()
+    ).hexdigest()[:16]
+
+
+def _bump_index_version(txn) -> None:
+    """Record, in a shard transaction, that the shard's index gained a video."""
+    txn.set_meta("index_version", txn.get_meta("index_version", 0) + 1)
+
+
+def _index_version(index_id: str) -> list:
+    """The shard versions a cached search result or listing for index_id
+    depends on.
+
+    That is the index's own shard and the unknown-index shard, or the sum
+    over every shard for results cached without an index ID.
+    """
+    shards = _shard_ids()
+    versions = {}
+    for shard in shards if not index_id else (index_id, ""):
+        if shard in shards:
+            with _shard(shard).read() as txn:
+                versions[shard] = txn.get_meta("index_version", 0)
+    if not index_id:
+        return [sum(versions.values())]
+    return [versions.get(index_id, 0), versions.get("", 0)]
+
+
+def cache_search(index_id: str, query: str, options: Optional[dict], result: Any) -> bool:
+    """Cache a search result for an index, query and options.
+
+    The entry is tied to the index's current version and stops matching
+    once a video is added to the index. Beyond SEARCH_CACHE_MAX_ENTRIES the
+    least recently used entries are evicted. Storing a result counts the
+    lookup miss that preceded it. The matched clips are added to the segment
+    index under the query.
+    """
+    now = datetime.utcnow().isoformat() + "Z"
+    entry = {
+        "query": query,
+        "cached_at": now,
+        "last_accessed": now,
+        "result": result
+    }
+    if options:
+        entry["options"] = options
+    key = (index_id or "", search_cache_key(query, options))
+    try:
+        entry["version"] = _index_version(key[0])
+        with config_transaction("search_cached") as txn:
+            txn.put("search_cache", key, entry)
+            stats = txn.get_meta("search_cache_stats") or {"hits": 0, "misses": 0}
+            stats["misses"] += 1
+            txn.set_meta("search_cache_stats", stats)
+            entries = sorted(
+                (e.get("last_accessed", ""), k) for k, e in txn.rows("search_cache")
+            )
+            if len(entries) > SEARCH_CACHE_MAX_ENTRIES:
+                keep = int(SEARCH_CACHE_MAX_ENTRIES * ANALYSIS_CACHE_LOW_WATER)
+                for _, old_key in entries[:len(entries) - keep]:
+                    txn.delete("search_cache", old_key)
+    except STORAGE_ERRORS:
+        return False
+    _index_segments(f"search:{key[0]}:{key[1]}", query, result)
+    return True
+
+
+def get_cached_search(index_id: str, query: str, options: Optional[dict] = None) -> Optional[dict]:
+    """Get a cached search result and record the hit.
+
+    As with get_cached_analysis(), the lookup runs in a read transaction and
+    only a hit (or a stale entry to drop) upgrades to a write. Entries that
+    expired or were cached before a video was added to the index count as a
+    miss and are dropped. Misses are counted by cache_search(), when the
+    result fetched after the miss is stored.
+    """
+    key = (index_id or "", search_cache_key(query, options))
+    try:
+        # Look up without the write lock; a miss leaves the state untouched
+        with get_backend().read() as txn:
+            entry = txn.get("search_cache", key)
+        if entry is None:
+            metrics.note("cache_search", "miss")
+            return None
+
+        version = _index_version(key[0])
+        with config_transaction("search_lookup") as txn:
+            entry = txn.get("search_cache", key)
+            now = datetime.utcnow()
+            if entry is not None and (_is_expired(entry, now, SEARCH_CACHE_TTL)
+                                      or entry.get("version") != version):
+                txn.delete("search_cache", key)
+                entry = None
+            metrics.note("cache_search", "hit" if entry is not None else "miss")
+            if entry is not None:
+                stats = txn.get_meta("search_cache_stats") or {"hits": 0, "misses": 0}
+                stats["hits"] += 1
+                txn.set_meta("search_cache_stats", stats)
+                entry["hits"] = entry.get("hits", 0) + 1
+                entry["last_accessed"] = now.isoformat() + "Z"
+                txn.put("search_cache", key, entry)
+            return entry
+    except STORAGE_ERRORS:
+        return None
+
+
+def get_search_cache_stats() -> dict:
+    """Get search cache hit/miss counters and its entry count."""
+    try:
+        with get_backend().read() as txn:
+            stats = txn.get_meta("search_cache_stats") or {"hits": 0, "misses": 0}
+            entries = sum(1 for _ in txn.rows("search_cache"))
+    except STORAGE_ERRORS:
+        return {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}
+    lookups = stats["hits"] + stats["misses"]
+    return dict(stats, hit_rate=stats["hits"] / lookups if lookups else 0.0, entries=entries)
+
+
+def clear_search_cache(index_id: Optional[str] = None) -> bool:
+    """Clear cached search results for an index or all indexes."""
+    try:
+        with config_transaction("search_cleared") as txn:
+            if index_id:
+                txn.delete("search_cache", (index_id,))
+            else:
+                txn.clear("search_cache")
+        _get_segment_index().remove(f"search:{index_id}:" if index_id else "search:")
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def _listing_name(kind: str, index_id: Optional[str]) -> str:
+    """Mirror name of a listing: "videos:<index_id>" or "indexes"."""
+    return f"videos:{index_id or ''}" if kind == "videos" else "indexes"
+
+
+def _item_id(item: dict) -> Optional[str]:
+    return item.get("_id") or item.get("id") or item.get("video_id") or item.get("index_id")
+
+
+def _listing_fresh(state: dict, kind: str, index_id: Optional[str], now: datetime) -> bool:
+    """Whether a listing's last sync is within LIST_MIRROR_TTL and no video
+    has been added to the index since."""
+    if _is_expired({"cached_at": state.get("synced_at", "")}, now, LIST_MIRROR_TTL):
+        return False
+    return state.get("version") == _index_version(index_id if kind == "videos" else "")
+
+
+def mirror_listing_page(kind: str, index_id: Optional[str], page: int, items: list,
+                        page_info: Optional[dict] = None) -> Optional[int]:
+    """Mirror one page of a video or index listing.
+
+    Mirroring page 1 starts a new sync of the listing, and so does a page
+    fetched with a different limit_per_page than the sync started with:
+    page numbers of different page sizes cover different items, so they
+    can't add up to a whole listing. Once every page of a sync has been
+    mirrored, items that were not seen again are dropped and the listing is
+    complete. If the listing was complete before the sync, the first page
+    that brings nothing new or changed completes it early: listings are
+    newest first, so the rest is already mirrored. Items are upserted
+    individually, so a partial refresh only touches the items it returned.
+
+    Args:
+        kind: "videos" or "indexes"
+        index_id: Index the videos belong to (ignored for indexes)
+        page: Page number, from 1
+        items: The page's items as returned by the API
+        page_info: The API's page_info (page, limit_per_page, total_page,
+            total_results), if any; without it the page is the whole listing
+
+    Returns:
+        The number of new or changed items, or None on failure
+    """
+    listing = _listing_name(kind, index_id)
+    now = datetime.utcnow().isoformat() + "Z"
+    page_info = dict(page_info or {})
+    limit = page_info.get("limit_per_page")
+    changed = 0
+    try:
+        version = _index_version(index_id if kind == "videos" else "")
+        with config_transaction("listing_mirrored") as txn:
+            mirrors = txn.get_meta("list_mirror_state") or {}
+            state = mirrors.get(listing) or {}
+            if page == 1 or "synced_at" not in state or state.get("limit_per_page") != limit:
+                state = dict(state, synced_at=now, pages=[], complete=False,
+                             resume=bool(state.get("complete")),
+                             version=version, limit_per_page=limit)
+            for item in items:
+                item_id = _item_id(item) if isinstance(item, dict) else None
+                if not item_id:
+                    continue
+                previous = txn.get("list_mirror", (listing, item_id))
+                if previous is None or previous["item"] != item:
+                    changed += 1
+                txn.put("list_mirror", (listing, item_id), {
+                    "item": item,
+                    "synced_at": state["synced_at"],
+                })
+                if item.get("updated_at") and item["updated_at"] > state.get("marker", ""):
+                    state["marker"] = item["updated_at"]
+            state["pages"] = sorted(set(state["pages"]) | {page})
+            state["fetched_at"] = now
+            page_info.setdefault("limit_per_page", max(len(items), 1))
+            state["page_info"] = page_info
+            total_page = page_info.get("total_page") or 1
+            if set(range(1, total_page + 1)) <= set(state["pages"]):
+                for key, row in list(txn.rows("list_mirror", listing)):
+                    if row["synced_at"] != state["synced_at"]:
+                        txn.delete("list_mirror", key)
+                state["complete"] = True
+            elif state.get("resume") and not changed and set(range(1, page + 1)) <= set(state["pages"]):
+                state["complete"] = True
+            mirrors[listing] = state
+            txn.set_meta("list_mirror_state", mirrors)
+        return changed
+    except STORAGE_ERRORS:
+        return None
+
+
+def get_list_mirror_state(kind: str, index_id: Optional[str]) -> Optional[dict]:
+    """Get a listing's sync state (synced_at, pages, page_info, complete,
+    marker: the newest updated_at mirrored), or None if it has never been
+    mirrored."""
+    try:
+        with get_backend().read() as txn:
+            return (txn.get_meta("list_mirror_state") or {}).get(_listing_name(kind, index_id))
+    except STORAGE_ERRORS:
+        return None
+
+
+def get_mirrored_listing(kind: str, index_id: Optional[str], page: int = 1,
+                         page_limit: Optional[int] = None) -> Optional[dict]:
+    """Serve a page of a video or index listing from the mirror.
+
+    A page is served while the listing's last sync is fresh (see
+    LIST_MIRROR_TTL), no video has been added to the index since, and the
+    mirror holds every item up to that page: either the sync is complete or
+    pages 1 to page were mirrored at the requested page size. Items are
+    ordered by created_at, newest first, like the API.
+
+    Returns:
+        {"data": [...], "page_info": {...}, "synced_at": ...}, or None
+        when the page has to be fetched
+    """
+    listing = _listing_name(kind, index_id)
+    try:
+        with get_backend().read() as txn:
+            state = (txn.get_meta("list_mirror_state") or {}).get(listing)
+            if not state or not _listing_fresh(state, kind, index_id, datetime.utcnow()):
+                metrics.note("cache_list", "miss")
+                return None
+            mirrored_limit = state["page_info"]["limit_per_page"]
+            page_limit = page_limit or mirrored_limit
+            if not state["complete"] and (
+                    page_limit != mirrored_limit or not set(range(1, page + 1)) <= set(state["pages"])):
+                metrics.note("cache_list", "miss")
+                return None
+            items = [row["item"] for _, row in txn.rows("list_mirror", listing)]
+    except STORAGE_ERRORS:
+        return None
+
+    metrics.note("cache_list", "hit")
+    items.sort(key=lambda item: (item.get("created_at") or "", _item_id(item)), reverse=True)
+    total = state["page_info"].get("total_results", len(items)) if not state["complete"] else len(items)
+    return {
+        "data": items[(page - 1) * page_limit:page * page_limit],
+        "page_info": {
+            "page": page,
+            "limit_per_page": page_limit,
+            "total_page": max(1, -(-total // page_limit)),
+            "total_results": total,
+        },
+        "synced_at": state["synced_at"],
+    }
+
+
+def clear_list_mirror() -> bool:
+    """Drop every mirrored listing."""
+    try:
+        with config_transaction("list_mirror_cleared") as txn:
+            txn.clear("list_mirror")
+            txn.set_meta("list_mirror_state", {})
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def _index_segments(source: str, label: str, result: Any, video_id: Optional[str] = None) -> bool:
+    """Replace the segment index entries for one cached result."""
+    from segment_index import extract_segments
+
+    try:
+        _get_segment_index().replace(source, label, extract_segments(result, video_id))
+        return True
+    except STORAGE_ERRORS:
+        return False
+
+
+def search_segments(query: str, limit: int = 10, video_id: Optional[str] = None) -> list[dict]:
+    """Search the text of cached analysis and search results locally.
+
+    Args:
+        query: Free text; segments matching more of its words rank higher
+        limit: Maximum number of segments to return
+        video_id: Only search this video's segments
+
+    Returns:
+        Matching segments, best first, as {video_id, filename, start, end,
+        label, snippet, score}. start and end are seconds, or None for
+        text not tied to a time range (such as a summary). label is the
+        analysis type or the search query the segment came from.
+    """
+    try:
+        matches = _get_segment_index().query(query, limit=limit, video_id=video_id)
+        video_ids = list({match["video_id"] for match in matches if match["video_id"]})
+        videos = {}
+        for video_id, shard in _locate("videos", video_ids).items():
+            with _shard(shard).read() as txn:
+                videos[video_id] = txn.get("videos", video_id)
+        for match in matches:
+            match["filename"] = (videos.get(match["video_id"]) or {}).get("filename")
+    except STORAGE_ERRORS:
+        return []
+    return matches
+
+
+def rebuild_segment_index() -> Optional[dict]:
+    """Rebuild the segment index from the analysis and search caches.
+
+    Entries evicted from the caches stay in the index until it is
+    rebuilt, so what was learned about a video remains searchable.
+
+    Returns the index's segment, source and video counts, or None on failure.
+    """
+    try:
+        index = _get_segment_index()
+        index.remove()
+        analyses = []
+        for index_id in _shard_ids():
+            with _shard(index_id).read() as txn:
+                analyses += txn.rows("analysis_cache")
+        with get_backend().read() as txn:
+            searches = list(txn.rows("search_cache"))
+        for (video_id, cache_key), entry in analyses:
+            if "blob" in entry and not _load_blob_result(entry):
+                continue
+            _index_segments(f"analysis:{video_id}:{cache_key}", entry["analysis_type"],
+                            entry.get("result"), video_id)
+        for (index_id, query_key), entry in searches:
+            _index_segments(f"search:{index_id}:{query_key}", entry["query"], entry.get("result"))
+        index.optimize()
+        return index.stats()
+    except STORAGE_ERRORS:
+        return None
+
+
+def compact() -> Optional[dict]:
+    """Expire and evict analysis cache entries, drop stale search results,
+    delete unreferenced blobs, then compact the storage.
+
+    Blobs are collected without a lock, so ones written since compaction
+    started are kept (see blob_store.GC_GRACE_SECONDS).
+
+    Returns counts of expired and evicted entries, stale search results and
+    removed blobs plus the remaining analysis cache usage, or None on failure.
+    """
+    import time
+
+    started = time.time()
+    try:
+        counts = {"expired": 0, "evicted": 0, "search_expired": 0}
+        usage = {"entries": 0, "bytes": 0}
+        referenced = []
+        for index_id in _shard_ids():
+            with shard_transaction(index_id, "compacted") as txn:
+                shard_usage = _cache_usage(txn, recount=True)
+                for name, count in _evict_analysis_cache(txn, shard_usage, force=True).items():
+                    counts[name] += count
+                txn.set_meta("analysis_cache_usage", shard_usage)
+                referenced += [entry["blob"]["sha256"] for _, entry in txn.rows("analysis_cache") if "blob" in entry]
+            for name in usage:
+                usage[name] += shard_usage[name]
+            _shard(index_id).compact()
+
+        with get_backend().read() as txn:
+            versions = {key[0]: None for key, _ in txn.rows("search_cache")}
+        versions = {index_id: _index_version(index_id) for index_id in versions}
+        with config_transaction("compacted") as txn:
+            now = datetime.utcnow()
+            for key, entry in list(txn.rows("search_cache")):
+                if _is_expired(entry, now, SEARCH_CACHE_TTL) or entry.get("version") != versions.get(key[0]):
+                    txn.delete("search_cache", key)
+                    counts["search_expired"] += 1
+        counts["blobs_removed"] = _get_blob_store().collect_garbage(referenced, started)
+        get_backend().compact()
+    except STORAGE_ERRORS:
+        return None
+    return dict(counts, **usage)
+
+
+def get_journal(limit: Optional[int] = 50) -> Optional[list[dict]]:
+    """Most recent journal records of the root state and every shard, oldest first.
+
+    Each record gets a "shard" field with the index it belongs to ("" for
+    records without an index, None for the root state). Returns None if the
+    journal backend is not in use or the journal can't be read.
+    """
+    if get_backend().name != "journal":
+        return None
+    try:
+        sources = [(None, get_backend())] + [(index_id, _shard(index_id)) for index_id in _shard_ids()]
+        records = [dict(record, shard=index_id) for index_id, backend in sources for record in backend.events()]
+    except STORAGE_ERRORS:
+        return None
+    records.sort(key=lambda record: record["ts"])
+    return records[-limit:] if limit else records
 
 
 if __name__ == "__main__":
@@ -235,6 +1731,45 @@ if __name__ == "__main__":
             print(json.dumps(read_config(), indent=2))
         elif cmd == "path":
             print(get_config_path())
+        elif cmd == "backend":
+            print(get_backend().name)
+        elif cmd == "journal":
+            records = get_journal(int(sys.argv[2]) if len(sys.argv) > 2 else 50)
+            if records is None:
+                print("The journal is only kept with TWELVELABS_STATE_BACKEND=journal")
+                sys.exit(1)
+            for record in records:
+                print(json.dumps(record))
+        elif cmd == "stats":
+            print(json.dumps(metrics.summarize(metrics.iter_records()), indent=2))
+        elif cmd == "cache-stats":
+            print(json.dumps(get_analysis_cache_stats(), indent=2))
+        elif cmd == "compact":
+            result = compact()
+            if result is None:
+                sys.exit(1)
+            print(json.dumps(result, indent=2))
+        elif cmd == "clear-cache":
+            video_id = sys.argv[2] if len(sys.argv) > 2 else None
+            if not clear_analysis_cache(video_id):
+                sys.exit(1)
+        elif cmd == "search-segments":
+            query = " ".join(sys.argv[2:])
+            print(json.dumps(search_segments(query), indent=2))
+        elif cmd == "reindex-segments":
+            result = rebuild_segment_index()
+            if result is None:
+                sys.exit(1)
+            print(json.dumps(result, indent=2))
+        elif cmd == "clear-list-mirror":
+            if not clear_list_mirror():
+                sys.exit(1)
+        elif cmd == "search-cache-stats":
+            print(json.dumps(get_search_cache_stats(), indent=2))
+        elif cmd == "clear-search-cache":
+            index_id = sys.argv[2] if len(sys.argv) > 2 else None
+            if not clear_search_cache(index_id):
+                sys.exit(1)
         else:
             print(f"Unknown command: {cmd}")
     else:
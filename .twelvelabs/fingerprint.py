@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Fast content fingerprints for local video files.
+
+A fingerprint identifies a file by its content rather than its path, so a
+copied or renamed video can be recognized before it is uploaded again.
+
+Files up to FULL_HASH_LIMIT bytes are hashed completely with BLAKE2b.
+Larger files are fingerprinted from their size plus SAMPLE_COUNT chunks
+of SAMPLE_SIZE bytes spread evenly across the file (always including the
+first and last chunk), which reads a few MiB no matter how large the file
+is. The scheme is encoded in the prefix so the two never compare equal:
+
+    full:<size>:<hex digest>
+    sample:<size>:<hex digest>
+
+A sampled fingerprint can't see changes between the sampled chunks, so
+callers treat a sampled match as a candidate only and confirm it with
+full_fingerprint(), which streams the whole file (see
+config_helper.lookup_file_content).
+"""
+
+import hashlib
+import os
+
+SAMPLE_SIZE = 1024 * 1024
+SAMPLE_COUNT = 8
+FULL_HASH_LIMIT = SAMPLE_SIZE * SAMPLE_COUNT
+READ_SIZE = 1024 * 1024
+
+
+def _hasher(size: int) -> "hashlib.blake2b":
+    h = hashlib.blake2b(digest_size=20)
+    h.update(size.to_bytes(8, "little"))
+    return h
+
+
+def full_fingerprint(path: str) -> str:
+    """Hash the whole file, streaming it in READ_SIZE chunks."""
+    size = os.path.getsize(path)
+    h = _hasher(size)
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            h.update(chunk)
+    return f"full:{size}:{h.hexdigest()}"
+
+
+def sampled_fingerprint(path: str) -> str:
+    """Hash the file size plus evenly spaced chunks of the file."""
+    size = os.path.getsize(path)
+    h = _hasher(size)
+    last = max(size - SAMPLE_SIZE, 0)
+    with open(path, "rb") as f:
+        for i in range(SAMPLE_COUNT):
+            f.seek(last * i // (SAMPLE_COUNT - 1))
+            h.update(f.read(SAMPLE_SIZE))
+    return f"sample:{size}:{h.hexdigest()}"
+
+
+def file_fingerprint(path: str) -> str:
+    """Fingerprint a file, sampling it when it is too large to hash fully."""
+    if os.path.getsize(path) <= FULL_HASH_LIMIT:
+        return full_fingerprint(path)
+    return sampled_fingerprint(path)
+
+
+def file_identity(path: str) -> tuple[str, dict]:
+    """Return a (dev:inode key, {mtime_ns, size}) pair used to cache results.
+
+    A cached fingerprint is still valid while the inode key and both stat
+    fields are unchanged.
+    """
+    st = os.stat(path)
+    return f"{st.st_dev}:{st.st_ino}", {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+if __name__ == "__main__":
+    import sys
+
+    for arg in sys.argv[1:]:
+        print(f"{file_fingerprint(arg)}  {arg}")
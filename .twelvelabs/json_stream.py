@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Incremental extraction of values from large JSON documents.
+
+Hook payloads can carry thousands of tasks or a very large analysis
+result. Instead of parsing the whole document into one tree, iter_values()
+walks it incrementally from a file or string and yields only the values at
+the requested paths, each as soon as it has been parsed. Memory is bounded
+by the largest single value decoded, not the whole document.
+
+Paths use dots between object keys and "item" for array elements, e.g.
+"tool_result.data.item" is every element of the tool_result.data array.
+
+Values at target paths are decoded with the json module's C decoder;
+everything else is walked structurally (containers on the way to a target)
+or decoded and dropped (values off every target path).
+"""
+
+import json
+from typing import Any, Iterable, Iterator, TextIO
+
+# Characters read per refill; a value that doesn't fit doubles the read size
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """A buffered cursor over a text stream or string."""
+
+    def __init__(self, source: TextIO | str):
+        if isinstance(source, str):
+            self.fp, self.buf, self.eof = None, source, True
+        else:
+            self.fp, self.buf, self.eof = source, "", False
+        self.pos = 0
+
+    def fill(self, size: int = CHUNK_SIZE) -> bool:
+        """Read more input, dropping what has been consumed. False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of the current buffer")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        size = CHUNK_SIZE
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(size):
+                    raise
+                size = max(size, len(self.buf))
+                continue
+            # A number that runs to the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and isinstance(value, (int, float)) and self.fill(size):
+                continue
+            self.pos = end
+            return value
+
+
+def iter_values(source: TextIO | str, targets: Iterable[str],
+                collect: Iterable[str] = ()) -> Iterator[tuple[str, Any]]:
+    """Yield (path, value) for every value at one of the target paths.
+
+    Args:
+        source: A text stream or a JSON string
+        targets: Paths whose values are decoded and yielded
+        collect: Paths of objects to yield as well, after their closing
+            brace, holding only the members not on the way to a target.
+            A non-object value at a collect path is yielded as-is.
+
+    Raises:
+        ValueError: If the input is not valid JSON
+    """
+    targets = set(targets)
+    collect = set(collect)
+    prefixes = set()
+    for path in targets | collect:
+        parts = path.split(".")
+        prefixes.update(".".join(parts[:i]) for i in range(len(parts)))
+    yield from _walk(_Reader(source), "", targets, collect, prefixes)
+
+
+def _child(path: str, key: str) -> str:
+    return f"{path}.{key}" if path else key
+
+
+def _walk(reader: _Reader, path: str, targets: set, collect: set, prefixes: set) -> Iterator[tuple[str, Any]]:
+    char = reader.peek()
+    if path in targets:
+        yield path, reader.value()
+        return
+    if path not in prefixes and path not in collect:
+        reader.value()
+        return
+
+    if char == "{":
+        reader.pos += 1
+        members = {} if path in collect else None
+        while reader.peek() != "}":
+            key = reader.value()
+            reader.expect(":")
+            child = _child(path, key)
+            if members is not None and child not in prefixes and child not in targets and child not in collect:
+                members[key] = reader.value()
+            else:
+                yield from _walk(reader, child, targets, collect, prefixes)
+            if reader.peek() == ",":
+                reader.pos += 1
+        reader.pos += 1
+        if members is not None:
+            yield path, members
+    elif char == "[":
+        reader.pos += 1
+        child = _child(path, "item")
+        descend = child not in targets
+        while reader.peek() != "]":
+            if descend:
+                yield from _walk(reader, child, targets, collect, prefixes)
+            else:
+                yield child, reader.value()
+            if reader.peek() == ",":
+                reader.pos += 1
+        reader.pos += 1
+    elif char == "":
+        raise ValueError("Unexpected end of JSON input")
+    elif path in collect:
+        yield path, reader.value()
+    else:
+        reader.value()
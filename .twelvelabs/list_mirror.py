@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Refresh the local mirror of the video and index listings.
+
+The post-list hook mirrors whatever pages list-videos and list-indexes
+return; this job fills in and refreshes the mirror directly from the API,
+so the pre-list hook can serve any page of a large index without a round
+trip.
+
+A refresh is incremental: it fetches pages newest first and stops at the
+first page with nothing new or changed, since everything after it is
+already mirrored (see mirror_listing_page). --full fetches every page,
+which also drops items that were deleted remotely.
+
+Usage:
+    python list_mirror.py refresh [--index-id ID] [--indexes] [--full]
+    python list_mirror.py show [--index-id ID] [--indexes]
+
+Options:
+    --index-id ID      index whose videos to mirror (default: the default index)
+    --indexes          mirror the index listing instead of videos
+    --full             fetch every page
+    --page-limit N     items per request (default 50)
+    --client SPEC      "twelvelabs", "fake" or module:factory (see api_client.py)
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from api_client import CLIENT_ERRORS, LIST_PAGE_LIMIT, load_client
+from config_helper import get_default_index_id, get_list_mirror_state, mirror_listing_page
+
+
+def refresh(client, kind: str, index_id: str | None, page_limit: int = LIST_PAGE_LIMIT,
+            full: bool = False) -> dict:
+    """Refresh one listing in the mirror.
+
+    Returns:
+        Summary with the pages fetched, new or changed items, and whether
+        the mirror now holds the complete listing
+    """
+    summary = {"listing": kind, "index_id": index_id, "pages": 0, "changed": 0}
+    page = 1
+    while True:
+        if kind == "videos":
+            result = client.list_videos(index_id, page, page_limit)
+        else:
+            result = client.list_indexes(page, page_limit)
+        page_info = result.get("page_info") or {}
+        changed = mirror_listing_page(kind, index_id, page, result.get("data") or [], page_info)
+        if changed is None:
+            raise OSError("Failed to save the listing mirror")
+        summary["pages"] += 1
+        summary["changed"] += changed
+
+        state = get_list_mirror_state(kind, index_id) or {}
+        if page >= (page_info.get("total_page") or 1) or (state.get("complete") and not full):
+            break
+        page += 1
+
+    summary["complete"] = bool((get_list_mirror_state(kind, index_id) or {}).get("complete"))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the local listing mirror.")
+    parser.add_argument("command", choices=["refresh", "show"])
+    parser.add_argument("--index-id")
+    parser.add_argument("--indexes", action="store_true")
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--page-limit", type=int, default=LIST_PAGE_LIMIT)
+    parser.add_argument("--client", default=os.environ.get("TWELVELABS_LIST_CLIENT"))
+    args = parser.parse_args()
+
+    kind = "indexes" if args.indexes else "videos"
+    index_id = None if args.indexes else (args.index_id or get_default_index_id())
+    if kind == "videos" and not index_id:
+        print("No index ID: pass --index-id or set a default index", file=sys.stderr)
+        sys.exit(2)
+
+    if args.command == "show":
+        print(json.dumps(get_list_mirror_state(kind, index_id), indent=2))
+        return
+
+    try:
+        summary = refresh(load_client(args.client), kind, index_id, args.page_limit, args.full)
+    except CLIENT_ERRORS as e:
+        print(f"Refresh failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
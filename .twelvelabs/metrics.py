@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Per-invocation hook metrics.
+
+dispatch.run() opens a record for every hook invocation and appends it as
+one JSON line to <state dir>/metrics.jsonl when the hook returns. While a
+record is open, the storage backends and caches add to it; outside a hook
+(the CLI, the poller) nothing is recorded and the calls below do nothing.
+
+Record fields (absent when zero or not applicable):
+    ts                  invocation time (epoch seconds)
+    hook                hook name
+    hook_ms             time in the hook, from dispatch to response
+    process_ms          time since dispatch.py started (in-process runs only)
+    server              true when served by the hook server
+    payload_bytes       size of the hook context read
+    response_bytes      size of the JSON response
+    error               true if the hook raised
+    config_reads        read transactions, and config_read_ms spent in them
+    config_writes       write transactions, and config_write_ms spent in them
+                        after taking the lock (including commit)
+    config_read_bytes   serialized state read (JSON: the whole document;
+                        SQLite: the records fetched)
+    config_write_bytes  serialized state written
+    lock_wait_ms        time waiting for the state writer lock
+    state_bytes         size of the state file(s)
+    cache_<name>        "hit" or "miss" for the analysis, search, list,
+                        fingerprint and probe caches
+
+The log rotates once it exceeds TWELVELABS_METRICS_MAX_BYTES (default
+1 MiB), keeping TWELVELABS_METRICS_BACKUPS older files (metrics.jsonl.1 is
+the newest). Set TWELVELABS_METRICS=0 to turn recording off. Appends are
+single O_APPEND writes, so concurrent hooks don't interleave lines.
+
+`python config_helper.py stats` summarizes the log (see summarize()).
+"""
+
+import io
+import json
+import os
+import time
+from typing import Any, Iterable, Iterator, Optional
+
+STATE_DIR = os.environ.get("TWELVELABS_STATE_DIR") or os.path.dirname(os.path.abspath(__file__))
+METRICS_FILE = os.path.join(STATE_DIR, "metrics.jsonl")
+ENABLED = os.environ.get("TWELVELABS_METRICS", "1") not in ("", "0", "false")
+MAX_BYTES = int(os.environ.get("TWELVELABS_METRICS_MAX_BYTES", 1024 * 1024))
+BACKUPS = int(os.environ.get("TWELVELABS_METRICS_BACKUPS", 3))
+
+PERCENTILES = (50, 95, 99)
+
+_record = None
+_context = {}
+
+
+def set_context(**fields: Any) -> None:
+    """Add fields to every record this process writes."""
+    _context.update(fields)
+
+
+def active() -> bool:
+    """Whether a record is open."""
+    return _record is not None
+
+
+def begin(hook: str) -> None:
+    """Open the record for a hook invocation."""
+    global _record
+    if ENABLED:
+        _record = {"ts": round(time.time(), 3), "hook": hook, **_context}
+
+
+def add(key: str, value: float) -> None:
+    """Add to a numeric field of the open record."""
+    if _record is not None:
+        _record[key] = _record.get(key, 0) + value
+
+
+def note(key: str, value: Any) -> None:
+    """Set a field of the open record."""
+    if _record is not None:
+        _record[key] = value
+
+
+class timer:
+    """Add the elapsed milliseconds of a block to a field of the open record."""
+
+    __slots__ = ("key", "start")
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __enter__(self) -> "timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        add(self.key, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class CountingReader(io.RawIOBase):
+    """Binary reader that adds the bytes read to a field of the open record."""
+
+    def __init__(self, raw, key: str = "payload_bytes"):
+        self.raw = raw
+        self.key = key
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> Optional[int]:
+        n = self.raw.readinto(buffer)
+        add(self.key, n or 0)
+        return n
+
+
+def end(**fields: Any) -> None:
+    """Close the open record and append it to the metrics log."""
+    global _record
+    record, _record = _record, None
+    if record is None:
+        return
+    record.update(fields)
+    for key, value in record.items():
+        if isinstance(value, float):
+            record[key] = round(value, 3)
+    try:
+        append(json.dumps(record, separators=(",", ":")) + "\n", METRICS_FILE)
+    except OSError:
+        pass
+
+
+def append(line: str, path: str = METRICS_FILE) -> None:
+    """Append one line to the log, rotating it if it grew past MAX_BYTES."""
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode())
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+    if size > MAX_BYTES:
+        rotate(path)
+
+
+def rotate(path: str = METRICS_FILE) -> None:
+    """Shift the log to path.1, path.1 to path.2 and so on, dropping the oldest."""
+    import fcntl
+
+    lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        # Another process may have rotated while we waited for the lock
+        try:
+            if os.stat(path).st_size <= MAX_BYTES:
+                return
+        except FileNotFoundError:
+            return
+        for i in range(BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        if BACKUPS > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.unlink(path)
+    finally:
+        os.close(lock_fd)
+
+
+def iter_records(path: str = METRICS_FILE) -> Iterator[dict]:
+    """Read the log and its backups, oldest first. Damaged lines are skipped."""
+    for name in [f"{path}.{i}" for i in range(BACKUPS, 0, -1)] + [path]:
+        try:
+            with open(name) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict):
+                        yield record
+        except FileNotFoundError:
+            continue
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = max(1, -(-len(values) * q // 100))
+    return values[int(rank) - 1]
+
+
+def summarize(records: Iterable[dict]) -> dict:
+    """Summarize records per hook.
+
+    Returns:
+        {"records", "since", "until", "hooks": {hook: {"count", "errors",
+        "server", <field>: {"p50", "p95", "p99", "max"}}}, "caches":
+        {name: {"hits", "misses", "hit_rate"}}}. Numeric fields missing
+        from a record count as zero, so percentiles are per invocation.
+    """
+    by_hook = {}
+    caches = {}
+    first = last = None
+    total = 0
+    for record in records:
+        total += 1
+        ts = record.get("ts")
+        if isinstance(ts, (int, float)):
+            first = ts if first is None else min(first, ts)
+            last = ts if last is None else max(last, ts)
+        by_hook.setdefault(record.get("hook", "?"), []).append(record)
+        for key, value in record.items():
+            if key.startswith("cache_") and value in ("hit", "miss"):
+                counts = caches.setdefault(key[6:], {"hits": 0, "misses": 0})
+                counts["hits" if value == "hit" else "misses"] += 1
+
+    hooks = {}
+    for hook, hook_records in sorted(by_hook.items()):
+        fields = sorted({
+            key for record in hook_records for key, value in record.items()
+            if key != "ts" and isinstance(value, (int, float)) and not isinstance(value, bool)
+        })
+        summary = {
+            "count": len(hook_records),
+            "errors": sum(1 for record in hook_records if record.get("error")),
+            "server": sum(1 for record in hook_records if record.get("server")),
+        }
+        for field in fields:
+            values = sorted(record.get(field, 0) for record in hook_records)
+            summary[field] = {f"p{q}": round(percentile(values, q), 3) for q in PERCENTILES}
+            summary[field]["max"] = round(values[-1], 3)
+        hooks[hook] = summary
+
+    for counts in caches.values():
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_rate"] = round(counts["hits"] / lookups, 3) if lookups else 0.0
+
+    def iso(ts):
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)) if ts is not None else None
+
+    return {"records": total, "since": iso(first), "until": iso(last), "hooks": hooks, "caches": caches}
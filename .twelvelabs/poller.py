@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Background poller for pending indexing tasks.
+
+Polls the status of the tasks in pending_tasks, and only those, and
+reconciles the results with apply_task_updates(), the same path the
+post-check-status hook uses: ready tasks move to videos, failed tasks are
+dropped and anything else updates the pending task's status.
+
+Each task is polled on its own schedule, stored with the task as "poll":
+{"interval", "next_at", "count"}. A task whose status changed is polled
+again after the base interval for its new status; while the status stays
+the same the interval doubles, up to MAX_INTERVAL. Tasks that come due
+within a fraction of their interval of each other are coalesced into the
+same poll, and each poll is sent as batch requests of up to --batch-size
+tasks.
+
+Usage:
+    python poller.py once                  # poll due tasks once and exit
+    python poller.py run [--exit-when-idle]  # poll in the foreground
+    python poller.py start | stop | status   # manage a background poller
+
+Options:
+    --client module:factory   task status client (default: TwelveLabs API,
+                              or TWELVELABS_POLLER_CLIENT); see api_client.py
+    --batch-size N            tasks per status request (default 50)
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from api_client import CLIENT_ERRORS, load_client
+from config_helper import CONFIG_DIR, STORAGE_ERRORS, apply_task_updates, get_all_pending_tasks, shard_transaction
+
+# First poll interval (seconds) after a task enters each status
+BASE_INTERVALS = {
+    "validating": 5,
+    "pending": 10,
+    "queued": 15,
+    "indexing": 30,
+}
+DEFAULT_INTERVAL = 15
+MAX_INTERVAL = int(os.environ.get("TWELVELABS_POLL_MAX_INTERVAL", 600))
+BACKOFF_FACTOR = 2
+# Randomize each delay by +/- this fraction so tasks started together spread out
+JITTER = 0.1
+# A task due within this fraction of its interval is polled along with due tasks
+COALESCE_FRACTION = 0.25
+# How long to sleep when there is nothing to poll
+IDLE_SLEEP = 60
+BATCH_SIZE = 50
+
+PID_FILE = CONFIG_DIR / "poller.pid"
+LOG_FILE = CONFIG_DIR / "poller.log"
+
+
+def next_schedule(poll: dict | None, old_status: str | None, new_status: str | None, now: float) -> dict:
+    """Compute a task's next poll after polling it at time now.
+
+    Args:
+        poll: The task's current schedule, or None if it was never polled
+        old_status: Status before the poll
+        new_status: Status after the poll
+        now: Time of the poll (epoch seconds)
+
+    Returns:
+        The new schedule {"interval", "next_at", "count"}
+    """
+    if poll is None or old_status != new_status:
+        interval = BASE_INTERVALS.get(new_status, DEFAULT_INTERVAL)
+    else:
+        interval = min(poll.get("interval", DEFAULT_INTERVAL) * BACKOFF_FACTOR, MAX_INTERVAL)
+    delay = interval * random.uniform(1 - JITTER, 1 + JITTER)
+    return {
+        "interval": interval,
+        "next_at": round(now + delay, 3),
+        "count": (poll or {}).get("count", 0) + 1
+    }
+
+
+def due_tasks(pending: dict, now: float) -> list[str]:
+    """Select the task IDs to poll now.
+
+    Tasks never polled before and tasks past their next_at are due. If any
+    task is due, tasks coming due soon are included so they share the batch.
+    """
+    due, soon = [], []
+    for task_id, task in pending.items():
+        poll = task.get("poll")
+        if not poll or poll.get("next_at", 0) <= now:
+            due.append(task_id)
+        elif poll["next_at"] - now <= COALESCE_FRACTION * poll.get("interval", DEFAULT_INTERVAL):
+            soon.append(task_id)
+    return due + soon if due else []
+
+
+def poll_once(client, batch_size: int = BATCH_SIZE) -> dict:
+    """Poll the due pending tasks once.
+
+    Returns:
+        Summary with counts of polled, completed, failed and updated tasks,
+        client errors, remaining pending tasks and seconds until the next
+        poll is due (None if nothing is pending)
+    """
+    now = time.time()
+    pending = get_all_pending_tasks()
+    due = due_tasks(pending, now)
+    summary = {"polled": len(due), "completed": 0, "failed": 0, "updated": 0, "errors": 0}
+
+    results = {}
+    for i in range(0, len(due), batch_size):
+        batch = due[i:i + batch_size]
+        try:
+            for task in client.get_tasks(batch):
+                results[task["task_id"]] = task
+        except CLIENT_ERRORS as e:
+            summary["errors"] += 1
+            print(f"Task status request failed: {e}", file=sys.stderr)
+
+    updates = [results[task_id] for task_id in due if task_id in results]
+    for outcome in apply_task_updates(updates):
+        if outcome.get("success") and outcome["action"] in ("completed", "failed", "updated"):
+            summary[outcome["action"]] += 1
+
+    # Reschedule tasks still pending, including ones the client didn't return
+    next_at = None
+    try:
+        # Tasks live in the shard of the index they were added to
+        by_index = {}
+        for task_id in due:
+            by_index.setdefault(pending[task_id].get("index_id"), []).append(task_id)
+        for index_id, task_ids in by_index.items():
+            with shard_transaction(index_id, "task_polled") as txn:
+                for task_id in task_ids:
+                    task = txn.get("pending_tasks", task_id)
+                    if task is None:
+                        continue
+                    old_status = pending[task_id].get("status")
+                    task["poll"] = next_schedule(task.get("poll"), old_status, task.get("status"), now)
+                    txn.put("pending_tasks", task_id, task)
+        remaining = 0
+        for task in get_all_pending_tasks().values():
+            remaining += 1
+            task_next = (task.get("poll") or {}).get("next_at", now)
+            next_at = task_next if next_at is None else min(next_at, task_next)
+    except STORAGE_ERRORS as e:
+        print(f"Failed to save poll schedule: {e}", file=sys.stderr)
+        remaining = len(pending)
+
+    summary["pending"] = remaining
+    summary["next_poll_in"] = None if next_at is None else round(max(next_at - time.time(), 0), 1)
+    return summary
+
+
+def run(client, batch_size: int = BATCH_SIZE, exit_when_idle: bool = False) -> None:
+    """Poll until stopped, sleeping until the next task is due."""
+    while True:
+        try:
+            summary = poll_once(client, batch_size)
+        except Exception as e:
+            print(f"Poll failed: {e}", file=sys.stderr)
+            summary = {"pending": None, "next_poll_in": IDLE_SLEEP}
+
+        if summary["pending"] == 0:
+            if exit_when_idle:
+                return
+            delay = IDLE_SLEEP
+        else:
+            delay = min(summary["next_poll_in"] or 0, IDLE_SLEEP)
+        time.sleep(max(delay, 1))
+
+
+def read_pid() -> int | None:
+    """Get the PID of the running background poller, if any."""
+    try:
+        pid = int(PID_FILE.read_text())
+        os.kill(pid, 0)
+        return pid
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll pending TwelveLabs indexing tasks.")
+    parser.add_argument("command", nargs="?", default="once", choices=["once", "run", "start", "stop", "status"])
+    parser.add_argument("--client", default=os.environ.get("TWELVELABS_POLLER_CLIENT"))
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--exit-when-idle", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        pid = read_pid()
+        print(json.dumps({"running": pid is not None, "pid": pid, "pending": len(get_all_pending_tasks())}))
+        sys.exit(0 if pid else 1)
+
+    if args.command == "stop":
+        pid = read_pid()
+        if pid:
+            os.kill(pid, signal.SIGTERM)
+        print(json.dumps({"stopped": pid is not None, "pid": pid}))
+        return
+
+    if args.command == "start":
+        if read_pid():
+            print(json.dumps({"running": True, "pid": read_pid()}))
+            return
+        cmd = [sys.executable, os.path.abspath(__file__), "run", "--batch-size", str(args.batch_size)]
+        if args.client:
+            cmd += ["--client", args.client]
+        if args.exit_when_idle:
+            cmd.append("--exit-when-idle")
+        with open(LOG_FILE, "a") as log:
+            proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+        print(json.dumps({"running": True, "pid": proc.pid}))
+        return
+
+    client = load_client(args.client)
+    if args.command == "once":
+        print(json.dumps(poll_once(client, args.batch_size)))
+        return
+
+    # run
+    if read_pid():
+        print(f"Poller already running (pid {read_pid()})", file=sys.stderr)
+        sys.exit(1)
+    PID_FILE.write_text(str(os.getpid()))
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        run(client, args.batch_size, args.exit_when_idle)
+    finally:
+        PID_FILE.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""Container header probe for local video files.
+
+probe_file() reads only the headers of a video, never the media data, so
+a broken or out-of-limit file can be rejected before it is uploaded:
+
+    MP4/MOV       the top-level boxes (their 8-16 byte headers only) and
+                  the moov box: mvhd, and tkhd/hdlr/stsd of each track
+    Matroska/WebM the EBML header, then Info and Tracks of the Segment up
+                  to the first Cluster (following the SeekHead if needed)
+    AVI           the RIFF header and the hdrl list (avih, strh, strf)
+
+The file is memory-mapped read-only and the parsers touch at most
+MAX_HEADER_BYTES of it, so probing a multi-GB file costs a few page reads.
+The container is recognized from its magic bytes, not the extension.
+
+The result is a dict:
+
+    {"container": "mp4" | "mov" | "matroska" | "webm" | "avi",
+     "size": bytes, "duration": seconds | None,
+     "width": int | None, "height": int | None,
+     "video_codec": "h264" | ... | None, "audio_codec": "aac" | ... | None,
+     "tracks": True if the track list was read}
+
+ProbeError is raised for files that can't be a playable video: empty,
+truncated, or with a corrupt or unfinished header. ProbeLimitError is
+raised instead when the headers run past MAX_HEADER_BYTES; that says
+nothing about the file, so it is not a ProbeError. limit_violations()
+checks a result against the TwelveLabs indexing limits.
+"""
+
+import mmap
+import os
+import struct
+from typing import Iterator, Optional
+
+# Bump when the parsers change so cached results are probed again
+PROBE_VERSION = 2
+
+# Most header bytes a probe reads before giving up on a file
+MAX_HEADER_BYTES = int(os.environ.get("TWELVELABS_PROBE_MAX_BYTES", 16 * 1024 * 1024))
+
+# TwelveLabs indexing limits
+MIN_DURATION = float(os.environ.get("TWELVELABS_MIN_DURATION", 4))
+MAX_DURATION = float(os.environ.get("TWELVELABS_MAX_DURATION", 2 * 3600))
+MIN_RESOLUTION = int(os.environ.get("TWELVELABS_MIN_RESOLUTION", 360))
+MAX_RESOLUTION = (3840, 2160)
+MAX_FILE_BYTES = int(os.environ.get("TWELVELABS_MAX_FILE_BYTES", 2 * 1024 ** 3))
+
+MP4_VIDEO_CODECS = {
+    b"avc1": "h264", b"avc3": "h264", b"hvc1": "hevc", b"hev1": "hevc", b"dvh1": "hevc",
+    b"dvhe": "hevc", b"vp08": "vp8", b"vp09": "vp9", b"av01": "av1", b"mp4v": "mpeg4",
+    b"s263": "h263", b"h263": "h263", b"jpeg": "mjpeg", b"mjpa": "mjpeg", b"mjpb": "mjpeg",
+    b"apcn": "prores", b"apch": "prores", b"apcs": "prores", b"apco": "prores",
+    b"ap4h": "prores", b"ap4x": "prores", b"AVdh": "dnxhd", b"AVdn": "dnxhd",
+    b"dvc ": "dv", b"dvcp": "dv", b"dvh5": "dv", b"dvh6": "dv", b"mp2v": "mpeg2",
+    b"raw ": "rawvideo", b"encv": "encrypted",
+}
+MP4_AUDIO_CODECS = {
+    b"mp4a": "aac", b"ac-3": "ac3", b"ec-3": "eac3", b"Opus": "opus", b"fLaC": "flac",
+    b"alac": "alac", b".mp3": "mp3", b"sowt": "pcm", b"twos": "pcm", b"lpcm": "pcm",
+    b"ipcm": "pcm", b"enca": "encrypted",
+}
+MKV_VIDEO_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_VP8": "vp8", "V_VP9": "vp9",
+    "V_AV1": "av1", "V_MPEG4/ISO/SP": "mpeg4", "V_MPEG4/ISO/ASP": "mpeg4",
+    "V_MPEG4/ISO/AP": "mpeg4", "V_MPEG4/MS/V3": "msmpeg4", "V_MPEG1": "mpeg1",
+    "V_MPEG2": "mpeg2", "V_MJPEG": "mjpeg", "V_PRORES": "prores", "V_THEORA": "theora",
+    "V_UNCOMPRESSED": "rawvideo",
+}
+MKV_AUDIO_PREFIXES = {
+    "A_AAC": "aac", "A_OPUS": "opus", "A_VORBIS": "vorbis", "A_MPEG/L3": "mp3",
+    "A_AC3": "ac3", "A_EAC3": "eac3", "A_FLAC": "flac", "A_PCM": "pcm", "A_DTS": "dts",
+}
+AVI_VIDEO_CODECS = {
+    "h264": "h264", "x264": "h264", "avc1": "h264", "davc": "h264", "hevc": "hevc",
+    "h265": "hevc", "x265": "hevc", "hvc1": "hevc", "xvid": "mpeg4", "divx": "mpeg4",
+    "dx50": "mpeg4", "fmp4": "mpeg4", "mp4v": "mpeg4", "div3": "msmpeg4", "mp43": "msmpeg4",
+    "mjpg": "mjpeg", "vp80": "vp8", "vp90": "vp9", "av01": "av1", "dvsd": "dv",
+    "mpg1": "mpeg1", "mpg2": "mpeg2", "h263": "h263",
+}
+AVI_AUDIO_CODECS = {1: "pcm", 0x55: "mp3", 0xFF: "aac", 0x1610: "aac", 0x2000: "ac3", 0x2001: "dts"}
+
+
+class ProbeError(ValueError):
+    """The file can't be a playable video (empty, truncated or corrupt header)."""
+
+
+class ProbeLimitError(Exception):
+    """The headers are larger than MAX_HEADER_BYTES, so the file wasn't fully probed."""
+
+
+class _Source:
+    """Bounds-checked reads from a memory-mapped file, within a byte budget."""
+
+    def __init__(self, mm: mmap.mmap, size: int):
+        self.mm = mm
+        self.size = size
+        self.budget = MAX_HEADER_BYTES
+
+    def read(self, offset: int, length: int) -> bytes:
+        if offset < 0 or offset + length > self.size:
+            raise ProbeError(f"File is truncated: header at offset {offset} runs past the end of the file")
+        self.budget -= length
+        if self.budget < 0:
+            raise ProbeLimitError(f"Header is too large to probe (over {MAX_HEADER_BYTES} bytes)")
+        return self.mm[offset:offset + length]
+
+
+def _result(container: str, size: int) -> dict:
+    return {"container": container, "size": size, "duration": None, "width": None, "height": None,
+            "video_codec": None, "audio_codec": None, "tracks": False}
+
+
+# --- MP4 / MOV (ISO base media file format) ---
+
+MP4_TOP_LEVEL = {
+    b"ftyp", b"styp", b"moov", b"moof", b"sidx", b"mdat", b"free", b"skip", b"wide", b"pnot", b"uuid", b"meta",
+}
+
+
+def _boxes(src: _Source, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate (type, payload start, box end) over the boxes in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", src.read(pos, 8))
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", src.read(pos + 8, 8))
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise ProbeError(f"Corrupt '{kind.decode('latin-1')}' box at offset {pos}")
+        if pos + size > end:
+            raise ProbeError(
+                f"File is truncated: the '{kind.decode('latin-1')}' box at offset {pos} "
+                f"needs {size} bytes but only {end - pos} are left"
+            )
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _child(src: _Source, start: int, end: int, kind: bytes) -> Optional[tuple[int, int]]:
+    for child, payload, box_end in _boxes(src, start, end):
+        if child == kind:
+            return payload, box_end
+    return None
+
+
+def _probe_mp4(src: _Source) -> dict:
+    moov = None
+    brand = None
+    for kind, payload, end in _boxes(src, 0, src.size):
+        if kind == b"ftyp":
+            brand = src.read(payload, 4)
+        elif kind == b"moov":
+            moov = (payload, end)
+    info = _result("mov" if brand == b"qt  " else "mp4", src.size)
+    if moov is None:
+        raise ProbeError("No 'moov' box: the file is incomplete or was never finalized")
+
+    start, end = moov
+    for kind, payload, box_end in _boxes(src, start, end):
+        if kind == b"mvhd":
+            version = src.read(payload, 1)[0]
+            if version == 1:
+                timescale, duration = struct.unpack(">IQ", src.read(payload + 20, 12))
+            else:
+                timescale, duration = struct.unpack(">II", src.read(payload + 12, 8))
+            if timescale and duration not in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                info["duration"] = duration / timescale
+        elif kind == b"trak":
+            _probe_mp4_track(src, payload, box_end, info)
+    info["tracks"] = True
+    return info
+
+
+def _probe_mp4_track(src: _Source, start: int, end: int, info: dict) -> None:
+    tkhd = _child(src, start, end, b"tkhd")
+    mdia = _child(src, start, end, b"mdia")
+    if not mdia:
+        return
+    hdlr = _child(src, *mdia, b"hdlr")
+    handler = src.read(hdlr[0] + 8, 4) if hdlr else None
+    minf = _child(src, *mdia, b"minf")
+    stbl = _child(src, *minf, b"stbl") if minf else None
+    stsd = _child(src, *stbl, b"stsd") if stbl else None
+    if not stsd or struct.unpack(">I", src.read(stsd[0] + 4, 4))[0] == 0:
+        return
+    entry = stsd[0] + 8
+    fourcc = src.read(entry + 4, 4)
+    if handler == b"vide" and info["video_codec"] is None:
+        info["video_codec"] = MP4_VIDEO_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+        width, height = struct.unpack(">HH", src.read(entry + 32, 4))
+        if tkhd:
+            # Display size (16.16 fixed point) takes pixel aspect ratio into account
+            tkhd_w, tkhd_h = struct.unpack(">II", src.read(tkhd[1] - 8, 8))
+            width, height = (tkhd_w >> 16) or width, (tkhd_h >> 16) or height
+        info["width"], info["height"] = width or None, height or None
+    elif handler == b"soun" and info["audio_codec"] is None:
+        info["audio_codec"] = MP4_AUDIO_CODECS.get(fourcc, fourcc.decode("latin-1").strip())
+
+
+# --- Matroska / WebM (EBML) ---
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+MKV_SEGMENT = 0x18538067
+MKV_SEEK_HEAD, MKV_SEEK, MKV_SEEK_ID, MKV_SEEK_POSITION = 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC
+MKV_INFO, MKV_TIMECODE_SCALE, MKV_DURATION = 0x1549A966, 0x2AD7B1, 0x4489
+MKV_TRACKS, MKV_TRACK_ENTRY, MKV_TRACK_TYPE, MKV_CODEC_ID = 0x1654AE6B, 0xAE, 0x83, 0x86
+MKV_VIDEO, MKV_PIXEL_WIDTH, MKV_PIXEL_HEIGHT = 0xE0, 0xB0, 0xBA
+MKV_CLUSTER = 0x1F43B675
+EBML_DOC_TYPE = 0x4282
+
+
+def _vint(src: _Source, pos: int, marker: bool) -> tuple[Optional[int], int]:
+    """Read an EBML variable-length integer; returns (value, length).
+
+    Element IDs keep their length marker bit; sizes drop it, and an
+    all-ones size (unknown, used by live streams) is returned as None.
+    """
+    first = src.read(pos, 1)[0]
+    if first == 0:
+        raise ProbeError(f"Corrupt EBML element at offset {pos}")
+    length = 9 - first.bit_length()
+    value = int.from_bytes(src.read(pos, length), "big")
+    if marker:
+        return value, length
+    value &= (1 << (7 * length)) - 1
+    return (None if value == (1 << (7 * length)) - 1 else value), length
+
+
+def _elements(src: _Source, start: int, end: int) -> Iterator[tuple[int, int, int]]:
+    """Iterate (id, data start, element end) over the EBML elements in [start, end)."""
+    pos = start
+    while pos < end:
+        element_id, id_length = _vint(src, pos, marker=True)
+        size, size_length = _vint(src, pos + id_length, marker=False)
+        data = pos + id_length + size_length
+        element_end = end if size is None else data + size
+        if element_end > src.size:
+            raise ProbeError(f"File is truncated: element 0x{element_id:X} at offset {pos} runs past the end")
+        yield element_id, data, element_end
+        pos = element_end
+
+
+def _uint(src: _Source, start: int, end: int) -> int:
+    return int.from_bytes(src.read(start, end - start), "big")
+
+
+def _probe_matroska(src: _Source) -> dict:
+    _, header_data, header_end = next(_elements(src, 0, src.size))
+    doc_type = "matroska"
+    for element_id, data, end in _elements(src, header_data, header_end):
+        if element_id == EBML_DOC_TYPE:
+            doc_type = src.read(data, end - data).rstrip(b"\0").decode("ascii", "replace")
+    info = _result("webm" if doc_type == "webm" else "matroska", src.size)
+
+    segment = None
+    for element_id, data, end in _elements(src, header_end, src.size):
+        if element_id == MKV_SEGMENT:
+            segment = (data, end)
+            break
+    if segment is None:
+        raise ProbeError("No Matroska Segment: the file is incomplete")
+    start, end = segment
+
+    found = {}
+    seeks = {}
+    for element_id, data, element_end in _elements(src, start, end):
+        if element_id == MKV_CLUSTER:
+            break
+        if element_id in (MKV_INFO, MKV_TRACKS):
+            found[element_id] = (data, element_end)
+        elif element_id == MKV_SEEK_HEAD:
+            for seek_id, seek_data, seek_end in _elements(src, data, element_end):
+                if seek_id == MKV_SEEK:
+                    fields = {i: (d, e) for i, d, e in _elements(src, seek_data, seek_end)}
+                    if MKV_SEEK_ID in fields and MKV_SEEK_POSITION in fields:
+                        seeks[_uint(src, *fields[MKV_SEEK_ID])] = start + _uint(src, *fields[MKV_SEEK_POSITION])
+        if len(found) == 2:
+            break
+    # Info or Tracks written after the media data: follow the SeekHead
+    for element_id in (MKV_INFO, MKV_TRACKS):
+        if element_id not in found and element_id in seeks:
+            if seeks[element_id] >= end:
+                raise ProbeError(f"Corrupt SeekHead: element 0x{element_id:X} is listed past the end of the Segment")
+            found_id, data, element_end = next(_elements(src, seeks[element_id], end))
+            if found_id == element_id:
+                found[element_id] = (data, element_end)
+
+    if MKV_INFO in found:
+        scale, duration = 1_000_000, None
+        for element_id, data, element_end in _elements(src, *found[MKV_INFO]):
+            if element_id == MKV_TIMECODE_SCALE:
+                scale = _uint(src, data, element_end)
+            elif element_id == MKV_DURATION:
+                raw = src.read(data, element_end - data)
+                if len(raw) not in (4, 8):
+                    raise ProbeError(f"Corrupt Duration at offset {data}: {len(raw)} bytes is not a float")
+                duration = struct.unpack(">f" if len(raw) == 4 else ">d", raw)[0]
+        if duration:
+            info["duration"] = duration * scale / 1e9
+    if MKV_TRACKS in found:
+        for element_id, data, element_end in _elements(src, *found[MKV_TRACKS]):
+            if element_id == MKV_TRACK_ENTRY:
+                _probe_matroska_track(src, data, element_end, info)
+        info["tracks"] = True
+    return info
+
+
+def _probe_matroska_track(src: _Source, start: int, end: int, info: dict) -> None:
+    fields = {element_id: (data, element_end) for element_id, data, element_end in _elements(src, start, end)}
+    track_type = _uint(src, *fields[MKV_TRACK_TYPE]) if MKV_TRACK_TYPE in fields else None
+    codec_id = src.read(fields[MKV_CODEC_ID][0], fields[MKV_CODEC_ID][1] - fields[MKV_CODEC_ID][0]) \
+        .rstrip(b"\0").decode("ascii", "replace") if MKV_CODEC_ID in fields else ""
+    if track_type == 1 and info["video_codec"] is None:
+        info["video_codec"] = MKV_VIDEO_CODECS.get(codec_id, codec_id or None)
+        if MKV_VIDEO in fields:
+            for element_id, data, element_end in _elements(src, *fields[MKV_VIDEO]):
+                if element_id == MKV_PIXEL_WIDTH:
+                    info["width"] = _uint(src, data, element_end)
+                elif element_id == MKV_PIXEL_HEIGHT:
+                    info["height"] = _uint(src, data, element_end)
+    elif track_type == 2 and info["audio_codec"] is None:
+        info["audio_codec"] = next(
+            (name for prefix, name in MKV_AUDIO_PREFIXES.items() if codec_id.startswith(prefix)),
+            codec_id or None,
+        )
+
+
+# --- AVI (RIFF) ---
+
+def _chunks(src: _Source, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate (fourcc, data start, data end) over the RIFF chunks in [start, end)."""
+    pos = start
+    while pos + 8 <= end:
+        fourcc, size = struct.unpack("<4sI", src.read(pos, 8))
+        if pos + 8 + size > end:
+            raise ProbeError(f"File is truncated: the '{fourcc.decode('latin-1')}' chunk at offset {pos} runs past the end")
+        yield fourcc, pos + 8, pos + 8 + size
+        pos += 8 + size + (size & 1)
+
+
+def _probe_avi(src: _Source) -> dict:
+    info = _result("avi", src.size)
+    (riff_size,) = struct.unpack("<I", src.read(4, 4))
+    if 8 + riff_size > src.size:
+        raise ProbeError(f"File is truncated: the RIFF header declares {8 + riff_size} bytes but the file has {src.size}")
+    hdrl = None
+    for fourcc, data, end in _chunks(src, 12, 8 + riff_size):
+        if fourcc == b"LIST" and src.read(data, 4) == b"hdrl":
+            hdrl = (data + 4, end)
+            break
+    if hdrl is None:
+        raise ProbeError("No AVI header list (hdrl): the file is corrupt")
+
+    frames = usec_per_frame = None
+    for fourcc, data, end in _chunks(src, *hdrl):
+        if fourcc == b"avih" and end - data >= 40:
+            usec_per_frame, _, _, _, frames = struct.unpack("<5I", src.read(data, 20))
+            info["width"], info["height"] = struct.unpack("<II", src.read(data + 32, 8))
+        elif fourcc == b"LIST" and src.read(data, 4) == b"strl":
+            stream = {kind: (d, e) for kind, d, e in _chunks(src, data + 4, end)}
+            if b"strh" not in stream or b"strf" not in stream:
+                continue
+            strh, strf = stream[b"strh"][0], stream[b"strf"][0]
+            stream_type, handler = struct.unpack("<4s4s", src.read(strh, 8))
+            if stream_type == b"vids" and info["video_codec"] is None:
+                compression = src.read(strf + 16, 4)
+                fourcc = compression if compression != b"\0\0\0\0" else handler
+                name = fourcc.decode("latin-1").strip("\0 ").lower()
+                info["video_codec"] = "rawvideo" if compression == b"\0\0\0\0" else AVI_VIDEO_CODECS.get(name, name or None)
+                scale, rate, _, length = struct.unpack("<4I", src.read(strh + 20, 16))
+                if scale and rate and length:
+                    info["duration"] = length * scale / rate
+            elif stream_type == b"auds" and info["audio_codec"] is None:
+                (format_tag,) = struct.unpack("<H", src.read(strf, 2))
+                info["audio_codec"] = AVI_AUDIO_CODECS.get(format_tag, f"0x{format_tag:04x}")
+    if info["duration"] is None and frames and usec_per_frame:
+        info["duration"] = frames * usec_per_frame / 1e6
+    info["tracks"] = True
+    return info
+
+
+def probe_file(path: str) -> dict:
+    """Read the container headers of a local video file.
+
+    Raises:
+        ProbeError: If the file is empty, truncated or has a corrupt header.
+        ProbeLimitError: If the headers are over MAX_HEADER_BYTES.
+        OSError: If the file can't be read.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise ProbeError("File is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            src = _Source(mm, size)
+            head = mm[:12]
+            if head.startswith(EBML_MAGIC):
+                return _probe_matroska(src)
+            if head.startswith(b"RIFF") and head[8:12] == b"AVI ":
+                return _probe_avi(src)
+            if head[4:8] in MP4_TOP_LEVEL:
+                return _probe_mp4(src)
+    raise ProbeError("Not a recognized video container (expected MP4/MOV, Matroska/WebM or AVI)")
+
+
+def limit_violations(info: dict) -> list[str]:
+    """Check a probe result against the TwelveLabs indexing limits.
+
+    Returns a description of each limit the file breaks; values the probe
+    couldn't read are not checked.
+    """
+    problems = []
+    if info["size"] > MAX_FILE_BYTES:
+        problems.append(f"file is {info['size'] / 1024 ** 3:.1f} GiB, over the {MAX_FILE_BYTES / 1024 ** 3:.0f} GiB upload limit")
+    duration = info.get("duration")
+    if duration is not None and duration < MIN_DURATION:
+        problems.append(f"video is {duration:.1f}s long, under the {MIN_DURATION:g}s minimum")
+    if duration is not None and duration > MAX_DURATION:
+        problems.append(f"video is {duration / 60:.0f} minutes long, over the {MAX_DURATION / 60:g} minute maximum")
+    if info.get("tracks") and info.get("video_codec") is None:
+        problems.append("file has no video track")
+    codec = info.get("video_codec")
+    if codec == "encrypted":
+        problems.append("video track is encrypted (DRM)")
+    width, height = info.get("width"), info.get("height")
+    if width and height:
+        short, long = sorted((width, height))
+        if short < MIN_RESOLUTION:
+            problems.append(f"resolution {width}x{height} is below the {MIN_RESOLUTION}p minimum")
+        elif long > MAX_RESOLUTION[0] or short > MAX_RESOLUTION[1]:
+            problems.append(f"resolution {width}x{height} is above the {MAX_RESOLUTION[0]}x{MAX_RESOLUTION[1]} maximum")
+    return problems
+
+
+def describe(info: dict) -> str:
+    """One-line summary of a probe result, e.g. "mp4, h264/aac, 1920x1080, 12.5s"."""
+    parts = [info["container"]]
+    codecs = "/".join(filter(None, (info.get("video_codec"), info.get("audio_codec"))))
+    if codecs:
+        parts.append(codecs)
+    if info.get("width") and info.get("height"):
+        parts.append(f"{info['width']}x{info['height']}")
+    if info.get("duration") is not None:
+        parts.append(f"{info['duration']:.1f}s")
+    return ", ".join(parts)
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    for arg in sys.argv[1:]:
+        try:
+            info = probe_file(arg)
+        except (ProbeError, ProbeLimitError, OSError) as e:
+            print(f"{arg}: {e}")
+            continue
+        problems = limit_violations(info)
+        print(f"{arg}: {json.dumps(info)}" + (f"  [{'; '.join(problems)}]" if problems else ""))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Local full-text index over cached analysis and search results.
+
+Everything the plugin has cached about a video (summaries, chapters,
+highlights, the queries a segment matched) is split into segments and
+indexed in an SQLite FTS5 table at <state dir>/segments.db, ranked with
+BM25. Queries like "which video mentioned X" are then answered from disk
+without an API call.
+
+A segment is one piece of text, optionally with a time range:
+
+    {"video_id": str, "start": float | None, "end": float | None, "text": str}
+
+Objects in a result that carry a start time (chapters, highlights, search
+clips) become timestamped segments. Loose text (a summary, a gist) becomes
+one untimed segment per video. Each segment also has a label, the analysis
+type or the search query it came from, which is searchable too.
+
+Segments are grouped by source (one cache entry), so re-caching an entry
+replaces its segments. FTS5 can't index the source column, so a regular
+table, segment_sources, maps each segment's rowid to its source, and
+segments are replaced and removed by rowid through that table's index. The
+index is separate from the state backend, so it is available whichever
+backend is in use.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+# Keys holding a segment's start and end time, in order of preference
+START_KEYS = ("start", "start_sec", "start_time", "startTime", "timestamp")
+END_KEYS = ("end", "end_sec", "end_time", "endTime")
+# Keys holding the video a nested segment belongs to
+VIDEO_KEYS = ("video_id", "videoId")
+
+# Bump when the schema changes; stored as the database's user_version
+SCHEMA_VERSION = 1
+
+
+def parse_seconds(value: Any) -> Optional[float]:
+    """Parse a timestamp given as seconds or as "[HH:]MM:SS[.fff]"."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            seconds = 0.0
+            for part in value.strip().split(":"):
+                seconds = seconds * 60 + float(part)
+            return seconds
+        except ValueError:
+            return None
+    return None
+
+
+def _skip_key(key: str) -> bool:
+    """Identifier, URL and time fields carry no searchable text."""
+    if key in START_KEYS or key in END_KEYS:
+        return True
+    key = key.lower()
+    return key.endswith("id") or key.endswith("url")
+
+
+def _texts(value: Any) -> Iterable[str]:
+    """All non-empty strings in a value, except identifiers, URLs and times."""
+    if isinstance(value, str):
+        if value.strip():
+            yield value.strip()
+    elif isinstance(value, list):
+        for item in value:
+            yield from _texts(item)
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            if not _skip_key(key):
+                yield from _texts(item)
+
+
+def _first(record: dict, keys: tuple) -> Any:
+    for key in keys:
+        if key in record:
+            return record[key]
+    return None
+
+
+def extract_segments(result: Any, video_id: Optional[str] = None) -> list[dict]:
+    """Split a cached result into segments.
+
+    Args:
+        result: An analysis or search result; a string holding JSON is decoded
+        video_id: Video the result belongs to, unless a nested object names one
+
+    Returns:
+        Timestamped segments in document order, followed by one untimed
+        segment per video holding the remaining text
+    """
+    segments = []
+    loose = {}
+
+    def walk(value: Any, video_id: Optional[str]) -> None:
+        if isinstance(value, str):
+            text = value.strip()
+            if text[:1] in ("{", "["):
+                try:
+                    walk(json.loads(text), video_id)
+                    return
+                except ValueError:
+                    pass
+            if text:
+                loose.setdefault(video_id, []).append(text)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item, video_id)
+        elif isinstance(value, dict):
+            video_id = _first(value, VIDEO_KEYS) or video_id
+            start = parse_seconds(_first(value, START_KEYS))
+            if start is None:
+                for key, item in value.items():
+                    if not _skip_key(key):
+                        walk(item, video_id)
+                return
+            if video_id:
+                segments.append({
+                    "video_id": video_id,
+                    "start": start,
+                    "end": parse_seconds(_first(value, END_KEYS)),
+                    "text": " ".join(_texts(value)),
+                })
+
+    walk(result, video_id)
+    for owner, texts in loose.items():
+        if owner:
+            segments.append({"video_id": owner, "start": None, "end": None, "text": "\n".join(texts)})
+    return segments
+
+
+def match_expression(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching any of its words.
+
+    BM25 ranks segments containing more (and rarer) words higher, so this
+    behaves like a web search rather than requiring every word.
+    """
+    words = ["".join(c for c in word if c.isalnum()) for word in query.split()]
+    words = [word for word in words if word]
+    if not words:
+        return None
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+class SegmentIndex:
+    """FTS5 index of video segments in an SQLite database."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5("
+                "text, label, video_id UNINDEXED, source UNINDEXED, start UNINDEXED, end UNINDEXED, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS segment_sources (rowid INTEGER PRIMARY KEY, source TEXT NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS segment_sources_source ON segment_sources (source)")
+                    # Index built before segment_sources existed
+                    conn.execute("INSERT OR REPLACE INTO segment_sources (rowid, source) SELECT rowid, source FROM segments")
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, where: str, params: tuple) -> int:
+        """Delete the segments whose segment_sources rows match where, by rowid."""
+        rowids = conn.execute(f"SELECT rowid FROM segment_sources WHERE {where}", params).fetchall()
+        conn.executemany("DELETE FROM segments WHERE rowid = ?", rowids)
+        conn.execute(f"DELETE FROM segment_sources WHERE {where}", params)
+        return len(rowids)
+
+    def replace(self, source: str, label: str, segments: list[dict]) -> int:
+        """Replace the segments of a source. Returns the number indexed."""
+        with self.conn as conn:
+            self._delete(conn, "source = ?", (source,))
+            for s in segments:
+                rowid = conn.execute("INSERT INTO segment_sources (source) VALUES (?)", (source,)).lastrowid
+                conn.execute(
+                    "INSERT INTO segments (rowid, text, label, video_id, source, start, end) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (rowid, s["text"], label, s["video_id"], source, s["start"], s["end"])
+                )
+        return len(segments)
+
+    def remove(self, source_prefix: str = "") -> int:
+        """Remove the segments of every source starting with source_prefix."""
+        with self.conn as conn:
+            if not source_prefix:
+                conn.execute("DELETE FROM segment_sources")
+                return conn.execute("DELETE FROM segments").rowcount
+            # Sources with the prefix sort between it and the prefix with its last character incremented
+            end = source_prefix[:-1] + chr(ord(source_prefix[-1]) + 1)
+            return self._delete(conn, "source >= ? AND source < ?", (source_prefix, end))
+
+    def query(self, text: str, limit: int = 10, video_id: Optional[str] = None) -> list[dict]:
+        """Find the segments best matching free text, best first.
+
+        Returns:
+            Segments as {video_id, start, end, label, snippet, score}, where
+            the snippet brackets the matched words and a lower score is a
+            better match
+        """
+        expression = match_expression(text)
+        if expression is None:
+            return []
+        sql = (
+            "SELECT video_id, start, end, label, "
+            "snippet(segments, 0, '[', ']', '...', 16), bm25(segments) AS score "
+            "FROM segments WHERE segments MATCH ?"
+        )
+        params = [expression]
+        if video_id:
+            sql += " AND video_id = ?"
+            params.append(video_id)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        return [
+            {"video_id": row[0], "start": row[1], "end": row[2], "label": row[3],
+             "snippet": row[4] or row[3], "score": round(row[5], 4)}
+            for row in self.conn.execute(sql, params)
+        ]
+
+    def stats(self) -> dict:
+        """Count indexed segments, sources and videos."""
+        row = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT source), COUNT(DISTINCT video_id) FROM segments"
+        ).fetchone()
+        return {"segments": row[0], "sources": row[1], "videos": row[2]}
+
+    def optimize(self) -> None:
+        """Merge the index's b-trees after many small writes."""
+        with self.conn as conn:
+            conn.execute("INSERT INTO segments (segments) VALUES ('optimize')")
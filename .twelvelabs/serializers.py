@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Encoding of whole-state documents (snapshots and config.json).
+
+Snapshots can be written in four formats. The format of existing data is
+recognized from its leading bytes on read, so snapshots written in any of
+them can be read back whatever TWELVELABS_SNAPSHOT_FORMAT is set to:
+
+    json          Compact JSON text.
+    json+zstd     JSON compressed with zstd (needs the zstandard package).
+    msgpack       MessagePack (needs the msgpack package).
+    msgpack+zstd  MessagePack compressed with zstd.
+
+"auto", the default, picks json+zstd for large documents when zstandard
+is installed and plain JSON otherwise. Decoding a state is dominated by
+building its Python objects: on a 100,000-video state orjson decodes
+JSON faster than msgpack decodes MessagePack, while zstd shrinks the
+file severalfold for the price of a fast decompression pass. MessagePack
+is there for tools that want it.
+
+Documents that must stay JSON, such as config.json, go through
+dumps_json() and loads_json().
+
+The optional packages (orjson, msgpack, zstandard) each take 5-20 ms to
+import. A hook that touches a small state would spend more time importing
+them than it saves, so they are imported only for documents of at least
+SERIALIZER_MIN_BYTES. Smaller documents use the stdlib json module. Once
+orjson has been imported, JSON is always encoded with it. Large documents
+are also decoded with the garbage collector paused, which would otherwise
+rescan the new objects repeatedly while they are being built.
+"""
+
+import gc
+import importlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+# Snapshot format: "auto" or one of FORMATS
+SNAPSHOT_FORMAT = os.environ.get("TWELVELABS_SNAPSHOT_FORMAT", "auto")
+# Documents smaller than this many bytes use the stdlib json module
+SERIALIZER_MIN_BYTES = int(os.environ.get("TWELVELABS_SERIALIZER_MIN_BYTES", 1024 * 1024))
+
+FORMATS = ("json", "json+zstd", "msgpack", "msgpack+zstd")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+_modules = {}
+
+
+def _optional(name: str):
+    """Import an optional package on first use; None if it isn't installed."""
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except ImportError:
+            _modules[name] = None
+    return _modules[name]
+
+
+def _require(name: str, what: str):
+    module = _optional(name)
+    if module is None:
+        raise ValueError(f"{what} needs the {name} package, which is not installed")
+    return module
+
+
+def dumps_json(obj: Any) -> bytes:
+    """Encode obj as compact JSON (with orjson if it has been imported)."""
+    orjson = _modules.get("orjson")
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads_json(data: bytes) -> Any:
+    """Decode JSON text, with orjson for documents of at least SERIALIZER_MIN_BYTES."""
+    if len(data) < SERIALIZER_MIN_BYTES:
+        orjson = _modules.get("orjson")
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    orjson = _optional("orjson")
+    with _gc_paused():
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Disable the cyclic garbage collector for the duration of the block."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def dumps(obj: Any, format: Optional[str] = None) -> bytes:
+    """Encode a snapshot in format (default SNAPSHOT_FORMAT).
+
+    Raises:
+        ValueError: If the format is unknown or its package isn't installed.
+    """
+    format = format or SNAPSHOT_FORMAT
+    if format == "auto":
+        data = dumps_json(obj)
+        if len(data) < SERIALIZER_MIN_BYTES or _optional("zstandard") is None:
+            return data
+        return _modules["zstandard"].ZstdCompressor(level=3).compress(data)
+    if format not in FORMATS:
+        raise ValueError(f"Unknown snapshot format '{format}'. Choose from: auto, {', '.join(FORMATS)}")
+    codec, _, compression = format.partition("+")
+    if codec == "msgpack":
+        data = _require("msgpack", f"The {format} snapshot format").packb(obj, use_bin_type=True)
+    else:
+        data = dumps_json(obj)
+    if compression:
+        data = _require("zstandard", f"The {format} snapshot format").ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def detect(data: bytes) -> str:
+    """Recognize the outer encoding of a snapshot: "zstd", "json" or "msgpack"."""
+    if data.startswith(ZSTD_MAGIC):
+        return "zstd"
+    # A JSON document starts with "{" or "["; a MessagePack map never does
+    if data[:64].lstrip()[:1] in (b"{", b"["):
+        return "json"
+    return "msgpack"
+
+
+def loads(data: bytes) -> Any:
+    """Decode a snapshot in any of FORMATS.
+
+    Raises:
+        ValueError: If the data is corrupt or its package isn't installed.
+    """
+    if detect(data) == "zstd":
+        zstandard = _require("zstandard", "Reading a zstd-compressed snapshot")
+        try:
+            data = zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt zstd snapshot: {e}") from e
+    if detect(data) == "json":
+        return loads_json(data)
+    msgpack = _require("msgpack", "Reading a MessagePack snapshot")
+    with _gc_paused():
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Canonical keys for video sources.
+
+The same video can be referred to in many ways: a relative or absolute
+path, a path through a symlink, a URL carrying tracking parameters, or
+one of several Google Drive link shapes. normalize_source() reduces all
+of these to a single key so duplicate detection is a dict lookup:
+
+    file:<real absolute path>
+    gdrive:<Drive file or folder ID>
+    url:<scheme://host/path?query without tracking params>
+"""
+
+import os
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Video file extensions TwelveLabs accepts
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+
+# Query parameters that only carry click/campaign tracking
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid",
+    "mc_cid", "mc_eid", "igshid", "_hsenc", "_hsmi", "mkt_tok", "si", "spm",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+# Google Drive path shapes that embed the file/folder ID
+DRIVE_PATH_ID = re.compile(r"/(?:file/d|drive/(?:u/\d+/)?folders|folders|d)/([A-Za-z0-9_-]{10,})")
+
+# Placeholder sources that must never match each other
+UNKNOWN_SOURCES = {"", "unknown"}
+
+
+def is_url(source: str) -> bool:
+    """Check if the source looks like an http(s) URL."""
+    return source.lower().startswith(("http://", "https://"))
+
+
+def google_drive_id(url: str) -> Optional[str]:
+    """Extract the file or folder ID from a Google Drive URL."""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if not (host == "drive.google.com" or host.endswith(".drive.google.com") or host == "docs.google.com"):
+        return None
+    match = DRIVE_PATH_ID.search(parts.path)
+    if match:
+        return match.group(1)
+    for name, value in parse_qsl(parts.query):
+        if name == "id" and value:
+            return value
+    return None
+
+
+def _is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url: str) -> str:
+    """Canonicalize a URL: lowercase scheme/host, no default port, no
+    fragment, tracking parameters stripped and the rest sorted."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking_param(k))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def normalize_path(path: str) -> str:
+    """Canonicalize a local path: user expanded, absolute, symlinks resolved."""
+    return os.path.realpath(os.path.abspath(os.path.expanduser(path)))
+
+
+def normalize_source(source: Optional[str]) -> Optional[str]:
+    """Return the canonical index key for a source, or None if unknown."""
+    if source is None or source.strip() in UNKNOWN_SOURCES:
+        return None
+    source = source.strip()
+    if is_url(source):
+        drive_id = google_drive_id(source)
+        if drive_id:
+            return f"gdrive:{drive_id}"
+        return f"url:{normalize_url(source)}"
+    return f"file:{normalize_path(source)}"
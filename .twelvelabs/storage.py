@@ -0,0 +1,893 @@
+#!/usr/bin/env python3
+"""Pluggable storage backends for the TwelveLabs local state.
+
+The state is a small set of tables plus a handful of scalar meta values
+(such as default_index_id). Each table maps a key to a JSON record:
+
+    videos          video_id                    -> video record
+    pending_tasks   task_id                     -> task record
+    analysis_cache  (video_id, cache key)       -> cached analysis entry
+    source_index    normalized source key       -> {video_id, task_id}
+    fingerprint_index  content fingerprint      -> {video_id, task_id}
+    fingerprint_cache  dev:inode of a file      -> {mtime_ns, size, fingerprint}
+    probe_cache     dev:inode of a file         -> {mtime_ns, size, version, probe}
+    search_cache    (index_id, query key)       -> cached search entry
+    list_mirror     (listing, item id)          -> mirrored list-videos/list-indexes item
+    uploads         normalized source key       -> chunked upload in progress or done
+
+Three backends are provided:
+
+    sqlite   Indexed SQLite database (WAL mode) with one table per state
+             table and row-level upserts. This is the default.
+    json     The original whole-document config.json file.
+    journal  A snapshot plus an append-only log of changes, compacted
+             into a new snapshot in the background.
+
+ShardSet splits the per-video tables (SHARDED_TABLES) by index: each
+index's rows live in a backend of their own, next to a small root state.
+
+Backends hand out transaction objects with a row-level API (get, put,
+delete, rows, find, get_meta, set_meta) so callers never need to load or
+rewrite the whole state for a single change.
+
+Reads, writes and lock waits are added to the open hook metrics record,
+if any (see metrics.py).
+"""
+
+import copy
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import metrics
+import serializers
+
+try:
+    import sqlite3
+except ImportError:  # pragma: no cover - Python built without sqlite
+    sqlite3 = None
+
+# Key columns for every state table, in key order
+TABLES = {
+    "videos": ("video_id",),
+    "pending_tasks": ("task_id",),
+    "analysis_cache": ("video_id", "analysis_type"),
+    "source_index": ("source_key",),
+    "fingerprint_index": ("fingerprint",),
+    "fingerprint_cache": ("file_key",),
+    "probe_cache": ("file_key",),
+    "search_cache": ("index_id", "query_key"),
+    "list_mirror": ("listing", "item_id"),
+    "uploads": ("source_key",),
+}
+
+# Record fields that get a secondary index in the SQLite backend
+INDEXED_FIELDS = {
+    "videos": ("source",),
+    "pending_tasks": ("source",),
+    "uploads": ("url",),
+}
+
+# Tables kept per index by ShardSet; the rest stay in the root state
+SHARDED_TABLES = ("videos", "pending_tasks", "analysis_cache", "source_index", "fingerprint_index")
+
+# Journal backend: fold the log into a new snapshot once it grows past this many bytes
+JOURNAL_COMPACT_BYTES = int(os.environ.get("TWELVELABS_JOURNAL_COMPACT_BYTES", 1024 * 1024))
+# Journal backend: folded logs kept as an audit trail
+JOURNAL_KEEP = int(os.environ.get("TWELVELABS_JOURNAL_KEEP", 3))
+
+# Errors a backend may raise while reading or writing state
+STORAGE_ERRORS = (OSError, ValueError) + ((sqlite3.Error,) if sqlite3 else ())
+
+SCHEMA_VERSION = 1
+
+
+def _key_parts(table: str, key: Any) -> tuple:
+    """Normalize a key (string or tuple) to a tuple of key parts."""
+    parts = key if isinstance(key, tuple) else (key,)
+    if len(parts) > len(TABLES[table]):
+        raise ValueError(f"Key {key!r} has too many parts for table {table}")
+    return parts
+
+
+def _row_key(parts: tuple) -> Any:
+    """Turn key parts back into the form callers use (str or tuple)."""
+    return parts[0] if len(parts) == 1 else parts
+
+
+def _with_meta(doc: dict, current: dict) -> dict:
+    """doc plus the meta values of current that it doesn't set itself.
+
+    replace() swaps out the tables but keeps meta such as index_version on
+    every backend, so versioned caches never see a version go backwards.
+    """
+    merged = {name: value for name, value in current.items() if name not in TABLES}
+    merged.update(doc)
+    return merged
+
+
+@contextmanager
+def _exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive flock on a sidecar lock file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        with metrics.timer("lock_wait_ms"):
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Replace a file's contents atomically (temp file, fsync, os.replace)."""
+    import tempfile
+
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    tmp_path = Path(tmp_name)
+    try:
+        os.fchmod(fd, 0o644)
+        with open(fd, "wb") as f:
+            f.write(data)
+            metrics.add("config_write_bytes", f.tell())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class DocumentTransaction:
+    """Row-level view over an in-memory state document.
+
+    Tables live at the top level of the document as (nested) dicts; meta
+    values are plain top-level keys.
+    """
+
+    def __init__(self, doc: dict):
+        self.doc = doc
+        self.dirty = False
+
+    def _node(self, table: str, parts: tuple, create: bool = False) -> Optional[dict]:
+        node = self.doc.setdefault(table, {}) if create else self.doc.get(table, {})
+        for part in parts:
+            if create:
+                node = node.setdefault(part, {})
+            else:
+                node = node.get(part)
+                if not isinstance(node, dict):
+                    return None
+        return node
+
+    def get(self, table: str, key: Any) -> Optional[dict]:
+        parts = _key_parts(table, key)
+        node = self._node(table, parts[:-1])
+        return node.get(parts[-1]) if node is not None else None
+
+    def put(self, table: str, key: Any, value: dict) -> None:
+        parts = _key_parts(table, key)
+        self._node(table, parts[:-1], create=True)[parts[-1]] = value
+        self.dirty = True
+
+    def delete(self, table: str, key: Any) -> bool:
+        """Delete a row, or every row under a partial key."""
+        parts = _key_parts(table, key)
+        node = self._node(table, parts[:-1])
+        if node is None or parts[-1] not in node:
+            return False
+        del node[parts[-1]]
+        # Drop parents that became empty so nested tables stay tidy
+        for depth in range(len(parts) - 1, 0, -1):
+            parent = self._node(table, parts[:depth - 1])
+            if parent is not None and parent.get(parts[depth - 1]) == {}:
+                del parent[parts[depth - 1]]
+        self.dirty = True
+        return True
+
+    def clear(self, table: str) -> None:
+        self.doc[table] = {}
+        self.dirty = True
+
+    def rows(self, table: str, prefix: Any = ()) -> Iterator[tuple[Any, dict]]:
+        """Iterate (key, record) pairs, optionally under a key prefix."""
+        prefix = _key_parts(table, prefix) if prefix != () else ()
+        depth = len(TABLES[table]) - len(prefix)
+
+        def walk(node: dict, parts: tuple, remaining: int):
+            for name, value in list(node.items()):
+                if remaining == 1:
+                    yield _row_key(parts + (name,)), value
+                elif isinstance(value, dict):
+                    yield from walk(value, parts + (name,), remaining - 1)
+
+        node = self._node(table, prefix)
+        if node is not None:
+            yield from walk(node, prefix, depth)
+
+    def find(self, table: str, field: str, value: Any) -> Optional[dict]:
+        """Return the first record whose field equals value."""
+        for _, record in self.rows(table):
+            if isinstance(record, dict) and record.get(field) == value:
+                return record
+        return None
+
+    def get_meta(self, name: str, default: Any = None) -> Any:
+        return self.doc.get(name, default)
+
+    def set_meta(self, name: str, value: Any) -> None:
+        self.doc[name] = value
+        self.dirty = True
+
+
+class JsonBackend:
+    """Whole-document backend storing the state in config.json.
+
+    Writers serialize on a sidecar lock file (config.json.lock) held across
+    the whole read -> mutate -> write cycle, and replace the document
+    atomically (temp file, fsync, os.replace). Readers take no lock: they
+    always see either the previous or the next complete document.
+
+    The last document read or written is kept in memory and reused by
+    read() while the file's inode, mtime and size are unchanged, which
+    makes repeated reads free in a long-lived process such as the hook
+    server. Records returned from read() are shared and must not be
+    mutated; transactions always work on a private copy.
+    """
+
+    name = "json"
+
+    def __init__(self, path: Path, default: dict):
+        self.path = Path(path)
+        self.default = default
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._cached = None
+
+    def _signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _parse(self) -> dict:
+        """Read and decode the document; ValueError if it is corrupt."""
+        if not self.path.exists():
+            return copy.deepcopy(self.default)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        doc = serializers.loads_json(data)
+        if not isinstance(doc, dict):
+            raise ValueError(f"{self.path} does not hold a JSON object")
+        metrics.add("config_read_bytes", len(data))
+        metrics.note("state_bytes", len(data))
+        for key, value in self.default.items():
+            doc.setdefault(key, copy.deepcopy(value))
+        return doc
+
+    def load(self) -> dict:
+        try:
+            return self._parse()
+        except (ValueError, IOError):
+            return copy.deepcopy(self.default)
+
+    def _load_for_write(self) -> dict:
+        """Load the document to rewrite it. Caller must hold the lock.
+
+        A corrupt document is moved aside to config.json.corrupt-<time>
+        instead of being overwritten, so its contents can still be
+        recovered by hand; the write then starts from the default state.
+        Read errors propagate.
+        """
+        try:
+            return self._parse()
+        except ValueError:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.corrupt-{time.time_ns()}"))
+            return copy.deepcopy(self.default)
+
+    def _load_shared(self) -> dict:
+        """Load the document, reusing the in-memory copy if the file is unchanged."""
+        signature = self._signature()
+        if signature is not None:
+            metrics.note("state_bytes", signature[2])
+        if signature is not None and self._cached is not None and self._cached[0] == signature:
+            return self._cached[1]
+        doc = self.load()
+        self._cached = (signature, doc) if signature is not None else None
+        return doc
+
+    def lock(self):
+        """Hold the exclusive writer lock."""
+        return _exclusive_lock(self.lock_path)
+
+    def _write(self, doc: dict) -> None:
+        """Atomically replace the document. Caller must hold the lock."""
+        _atomic_write(self.path, serializers.dumps_json(doc) + b"\n")
+        self._cached = (self._signature(), doc)
+
+    def replace(self, doc: dict) -> None:
+        """Replace every table with doc's; meta doc doesn't set is kept."""
+        with self.lock():
+            self._write(_with_meta(doc, self._load_for_write()))
+        # The caller still owns doc, so don't share it with readers
+        self._cached = None
+
+    @contextmanager
+    def read(self) -> Iterator[DocumentTransaction]:
+        metrics.add("config_reads", 1)
+        with metrics.timer("config_read_ms"):
+            yield DocumentTransaction(self._load_shared())
+
+    @contextmanager
+    def transaction(self, event: Optional[str] = None) -> Iterator[DocumentTransaction]:
+        with self.lock():
+            metrics.add("config_writes", 1)
+            with metrics.timer("config_write_ms"):
+                txn = DocumentTransaction(self._load_for_write())
+                yield txn
+                if txn.dirty:
+                    self._write(txn.doc)
+
+    def compact(self) -> None:
+        """Rewrite the document without any stale formatting."""
+        with self.lock():
+            self._write(self._load_for_write())
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteTransaction:
+    """Row-level access to the SQLite state tables."""
+
+    def __init__(self, conn: "sqlite3.Connection"):
+        self.conn = conn
+
+    @staticmethod
+    def _where(table: str, parts: tuple) -> str:
+        columns = TABLES[table][:len(parts)]
+        return " AND ".join(f"{column} = ?" for column in columns) or "1"
+
+    def get(self, table: str, key: Any) -> Optional[dict]:
+        parts = _key_parts(table, key)
+        row = self.conn.execute(
+            f"SELECT data FROM {table} WHERE {self._where(table, parts)}", parts
+        ).fetchone()
+        if not row:
+            return None
+        metrics.add("config_read_bytes", len(row[0]))
+        return json.loads(row[0])
+
+    def put(self, table: str, key: Any, value: dict) -> None:
+        parts = _key_parts(table, key)
+        columns = TABLES[table]
+        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+        data = json.dumps(value)
+        metrics.add("config_write_bytes", len(data))
+        self.conn.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}, data) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(columns)}) DO UPDATE SET data = excluded.data",
+            parts + (data,),
+        )
+
+    def delete(self, table: str, key: Any) -> bool:
+        """Delete a row, or every row under a partial key."""
+        parts = _key_parts(table, key)
+        cursor = self.conn.execute(
+            f"DELETE FROM {table} WHERE {self._where(table, parts)}", parts
+        )
+        return cursor.rowcount > 0
+
+    def clear(self, table: str) -> None:
+        self.conn.execute(f"DELETE FROM {table}")
+
+    def rows(self, table: str, prefix: Any = ()) -> Iterator[tuple[Any, dict]]:
+        """Iterate (key, record) pairs, optionally under a key prefix."""
+        parts = _key_parts(table, prefix) if prefix != () else ()
+        columns = TABLES[table]
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(columns)}, data FROM {table} "
+            f"WHERE {self._where(table, parts)} ORDER BY {', '.join(columns)}",
+            parts,
+        )
+        for row in cursor:
+            metrics.add("config_read_bytes", len(row[-1]))
+            yield _row_key(tuple(row[:-1])), json.loads(row[-1])
+
+    def find(self, table: str, field: str, value: Any) -> Optional[dict]:
+        """Return the first record whose field equals value."""
+        row = self.conn.execute(
+            f"SELECT data FROM {table} WHERE json_extract(data, '$.{field}') = ? LIMIT 1",
+            (value,),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_meta(self, name: str, default: Any = None) -> Any:
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        if not row:
+            return default
+        metrics.add("config_read_bytes", len(row[0]))
+        return json.loads(row[0])
+
+    def set_meta(self, name: str, value: Any) -> None:
+        data = json.dumps(value)
+        metrics.add("config_write_bytes", len(data))
+        self.conn.execute(
+            "INSERT INTO meta (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            (name, data),
+        )
+
+
+class SQLiteBackend:
+    """Indexed SQLite backend with row-level upserts.
+
+    On first use the database is created next to config.json and any
+    existing config.json contents are migrated into it once.
+
+    Each thread gets a connection of its own, so threads serialize their
+    transactions through SQLite's locking just like separate processes.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, default: dict, legacy_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.default = default
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self._local = threading.local()
+        self._conns = []
+
+    @property
+    def conn(self) -> "sqlite3.Connection":
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Only the opening thread uses it; close() may run on another
+            conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+            self._conns.append(conn)
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: "sqlite3.Connection") -> None:
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        for table, columns in TABLES.items():
+            key_columns = ", ".join(f"{column} TEXT NOT NULL" for column in columns)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ({key_columns}, data TEXT NOT NULL, "
+                f"PRIMARY KEY ({', '.join(columns)})) WITHOUT ROWID"
+            )
+            for field in INDEXED_FIELDS.get(table, ()):
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {table}_{field} "
+                    f"ON {table} (json_extract(data, '$.{field}'))"
+                )
+        with self.transaction() as txn:
+            if txn.get_meta("schema_version") is None:
+                txn.set_meta("schema_version", SCHEMA_VERSION)
+                self._migrate_legacy(txn)
+
+    def _migrate_legacy(self, txn: SQLiteTransaction) -> None:
+        """Import an existing config.json the first time the database is created."""
+        if not self.legacy_path or not self.legacy_path.exists():
+            return
+        doc = JsonBackend(self.legacy_path, self.default).load()
+        self._import(txn, doc)
+        txn.set_meta("migrated_from", str(self.legacy_path))
+
+    @staticmethod
+    def _import(txn: SQLiteTransaction, doc: dict) -> None:
+        source = DocumentTransaction(doc)
+        for name, value in doc.items():
+            if name not in TABLES:
+                txn.set_meta(name, value)
+        for table in TABLES:
+            for key, record in source.rows(table):
+                txn.put(table, key, record)
+
+    def load(self) -> dict:
+        doc = copy.deepcopy(self.default)
+        with self.read() as txn:
+            for name, value in self.conn.execute("SELECT name, value FROM meta"):
+                if name not in ("schema_version", "migrated_from"):
+                    doc[name] = json.loads(value)
+            target = DocumentTransaction(doc)
+            for table in TABLES:
+                doc[table] = {}
+                for key, record in txn.rows(table):
+                    target.put(table, key, record)
+        return doc
+
+    def replace(self, doc: dict) -> None:
+        """Replace every table with doc's; meta doc doesn't set is kept."""
+        with self.transaction() as txn:
+            for table in TABLES:
+                txn.clear(table)
+            self._import(txn, doc)
+
+    def _note_size(self) -> None:
+        """Record the database size, WAL included, in the open metrics record."""
+        if metrics.active():
+            size = 0
+            for path in (self.path, self.path.with_name(self.path.name + "-wal")):
+                try:
+                    size += os.stat(path).st_size
+                except FileNotFoundError:
+                    pass
+            metrics.note("state_bytes", size)
+
+    @contextmanager
+    def read(self) -> Iterator[SQLiteTransaction]:
+        conn = self.conn
+        self._note_size()
+        metrics.add("config_reads", 1)
+        with metrics.timer("config_read_ms"):
+            yield SQLiteTransaction(conn)
+
+    @contextmanager
+    def transaction(self, event: Optional[str] = None) -> Iterator[SQLiteTransaction]:
+        conn = self.conn
+        self._note_size()
+        with metrics.timer("lock_wait_ms"):
+            conn.execute("BEGIN IMMEDIATE")
+        metrics.add("config_writes", 1)
+        with metrics.timer("config_write_ms"):
+            try:
+                yield SQLiteTransaction(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def compact(self) -> None:
+        """Fold the WAL into the database and reclaim free pages."""
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+
+    def close(self) -> None:
+        for conn in self._conns:
+            conn.close()
+        self._local = threading.local()
+        self._conns = []
+
+
+class JournalTransaction(DocumentTransaction):
+    """DocumentTransaction that also records each change as a journal op.
+
+    It works on the backend's cached state directly, so records are handed
+    out as copies and only reach the state through put().
+    """
+
+    def __init__(self, doc: dict):
+        super().__init__(doc)
+        self.ops = []
+
+    def get(self, table: str, key: Any) -> Optional[dict]:
+        return copy.deepcopy(super().get(table, key))
+
+    def rows(self, table: str, prefix: Any = ()) -> Iterator[tuple[Any, dict]]:
+        for key, record in super().rows(table, prefix):
+            yield key, copy.deepcopy(record)
+
+    def find(self, table: str, field: str, value: Any) -> Optional[dict]:
+        for _, record in super().rows(table):
+            if isinstance(record, dict) and record.get(field) == value:
+                return copy.deepcopy(record)
+        return None
+
+    def put(self, table: str, key: Any, value: dict) -> None:
+        super().put(table, key, value)
+        self.ops.append(["put", table, list(_key_parts(table, key)), value])
+
+    def delete(self, table: str, key: Any) -> bool:
+        deleted = super().delete(table, key)
+        if deleted:
+            self.ops.append(["delete", table, list(_key_parts(table, key))])
+        return deleted
+
+    def clear(self, table: str) -> None:
+        super().clear(table)
+        self.ops.append(["clear", table])
+
+    def set_meta(self, name: str, value: Any) -> None:
+        super().set_meta(name, value)
+        self.ops.append(["meta", name, value])
+
+
+def _replay(doc: dict, ops: list) -> None:
+    """Apply the ops of one journal record to a state document."""
+    txn = DocumentTransaction(doc)
+    for op in ops:
+        if op[0] == "put":
+            txn.put(op[1], tuple(op[2]), op[3])
+        elif op[0] == "delete":
+            txn.delete(op[1], tuple(op[2]))
+        elif op[0] == "clear":
+            txn.clear(op[1])
+        elif op[0] == "meta":
+            txn.set_meta(op[1], op[2])
+
+
+class JournalBackend:
+    """Append-only journal of changes on top of a periodic snapshot.
+
+    The journal directory holds:
+
+        snapshot        {"generation": N, "created_at": ..., "state": {...}},
+                        in any of the serializers.FORMATS
+        <N>.log         one JSON line per transaction committed since
+                        snapshot N: {"ts", "event", "ops": [...]}
+
+    A transaction appends a single line (O_APPEND, fsync) holding only the
+    rows it changed, labelled with the caller's event name, so a write
+    costs as much as the change rather than the whole state. The state is
+    the snapshot with its log replayed on top. It is kept in memory and
+    later reads replay only the lines appended since.
+
+    Once a log passes JOURNAL_COMPACT_BYTES, a detached process folds it
+    into snapshot N+1 and a new log starts. The last JOURNAL_KEEP folded
+    logs stay on disk as an audit trail (see events()), which also lets
+    a reader that loaded snapshot N finish reading its log. Writers and
+    compaction serialize on journal.lock; readers take no lock. Within a
+    process, threads take turns on the in-memory state.
+    """
+
+    name = "journal"
+
+    def __init__(self, dir: Path, default: dict, legacy_path: Optional[Path] = None):
+        self.dir = Path(dir)
+        self.path = self.dir / "snapshot"
+        self.lock_path = self.dir / "journal.lock"
+        self.default = default
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        # (snapshot signature, generation, bytes of its log replayed, state)
+        self._state = None
+        self._mutex = threading.RLock()
+
+    def _log_path(self, generation: int) -> Path:
+        return self.dir / f"{generation:08d}.log"
+
+    def _initial(self) -> dict:
+        """The state before the first snapshot: an existing config.json, or the default."""
+        if self.legacy_path and self.legacy_path.exists():
+            return JsonBackend(self.legacy_path, self.default).load()
+        return copy.deepcopy(self.default)
+
+    def _refresh(self) -> tuple[int, dict]:
+        """Bring the in-memory state up to date with the snapshot and log.
+
+        Returns the snapshot generation and the (shared) state.
+        """
+        try:
+            try:
+                f = open(self.path, "rb")
+            except FileNotFoundError:
+                if self._state is None or self._state[0] is not None:
+                    self._state = (None, 0, 0, self._initial())
+            else:
+                with f:
+                    st = os.fstat(f.fileno())
+                    signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+                    if self._state is None or self._state[0] != signature:
+                        snapshot = serializers.loads(f.read())
+                        metrics.add("config_read_bytes", st.st_size)
+                        self._state = (signature, snapshot["generation"], 0, snapshot["state"])
+            signature, generation, offset, doc = self._state
+            try:
+                with open(self._log_path(generation), "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                data = b""
+            # A line without its newline is an append still in progress (or torn)
+            end = data.rfind(b"\n") + 1
+            if end:
+                metrics.add("config_read_bytes", end)
+                for line in data[:end].splitlines():
+                    if line.strip():
+                        _replay(doc, json.loads(line)["ops"])
+                offset += end
+                self._state = (signature, generation, offset, doc)
+        except BaseException:
+            self._state = None
+            raise
+        metrics.note("state_bytes", (signature[2] if signature else 0) + offset)
+        return generation, doc
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the exclusive writer lock."""
+        with self._mutex, _exclusive_lock(self.lock_path):
+            yield
+
+    def _write_snapshot(self, generation: int, doc: dict) -> None:
+        """Write snapshot `generation` and drop logs past JOURNAL_KEEP. Caller must hold the lock."""
+        from datetime import datetime
+
+        snapshot = {"generation": generation, "created_at": datetime.utcnow().isoformat() + "Z", "state": doc}
+        _atomic_write(self.path, serializers.dumps(snapshot))
+        st = os.stat(self.path)
+        self._state = ((st.st_ino, st.st_mtime_ns, st.st_size), generation, 0, doc)
+        for old in range(generation - max(JOURNAL_KEEP, 1) - 1, 0, -1):
+            try:
+                self._log_path(old).unlink()
+            except FileNotFoundError:
+                break
+
+    def _append(self, generation: int, event: Optional[str], ops: list) -> int:
+        """Append one record to the log; returns the log's new size. Caller must hold the lock."""
+        from datetime import datetime
+
+        record = {"ts": datetime.utcnow().isoformat() + "Z", "event": event or "update", "ops": ops}
+        line = (json.dumps(record) + "\n").encode()
+        signature, _, offset, doc = self._state
+        fd = os.open(self._log_path(generation), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != offset:
+                # A writer died mid-append; drop its partial line
+                os.ftruncate(fd, offset)
+            if os.write(fd, line) != len(line):
+                raise OSError(f"Short write to {self._log_path(generation)}")
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        metrics.add("config_write_bytes", len(line))
+        self._state = (signature, generation, offset + len(line), doc)
+        return offset + len(line)
+
+    def _compact_in_background(self) -> None:
+        """Start a detached process that folds the log into a new snapshot."""
+        import subprocess
+        import sys
+
+        try:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "compact-journal", str(self.dir)],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError:
+            pass  # The next write past the threshold tries again
+
+    def load(self) -> dict:
+        with self.read() as txn:
+            return copy.deepcopy(txn.doc)
+
+    def replace(self, doc: dict) -> None:
+        """Replace every table with doc's; meta doc doesn't set is kept."""
+        with self.lock():
+            generation, current = self._refresh()
+            self._write_snapshot(generation + 1, _with_meta(doc, current))
+        # The caller still owns doc, so don't share it with readers
+        self._state = None
+
+    @contextmanager
+    def read(self) -> Iterator[DocumentTransaction]:
+        metrics.add("config_reads", 1)
+        with self._mutex, metrics.timer("config_read_ms"):
+            yield DocumentTransaction(self._refresh()[1])
+
+    @contextmanager
+    def transaction(self, event: Optional[str] = None) -> Iterator[JournalTransaction]:
+        """Write transaction; event names the change in the journal."""
+        log_size = 0
+        with self.lock():
+            metrics.add("config_writes", 1)
+            with metrics.timer("config_write_ms"):
+                if not self.path.exists():
+                    self._write_snapshot(1, self._initial())
+                generation, doc = self._refresh()
+                txn = JournalTransaction(doc)
+                try:
+                    yield txn
+                    if txn.ops:
+                        log_size = self._append(generation, event, txn.ops)
+                except BaseException:
+                    # The block may have changed the cached state; read it back from disk
+                    self._state = None
+                    raise
+        if log_size > JOURNAL_COMPACT_BYTES:
+            self._compact_in_background()
+
+    def compact(self, min_bytes: int = 1) -> None:
+        """Fold the log into a new snapshot if it holds at least min_bytes."""
+        if not self.path.exists():
+            return
+        with self.lock():
+            generation, doc = self._refresh()
+            if self._state[2] >= min_bytes:
+                self._write_snapshot(generation + 1, doc)
+
+    def events(self) -> Iterator[dict]:
+        """Iterate the journal records still on disk, oldest first."""
+        for path in sorted(self.dir.glob("*.log")):
+            with open(path, "rb") as f:
+                for line in f:
+                    if line.endswith(b"\n") and line.strip():
+                        yield json.loads(line)
+
+    def close(self) -> None:
+        self._state = None
+
+
+BACKENDS = ("sqlite", "json", "journal")
+
+
+def shard_name(index_id: Optional[str]) -> str:
+    """Directory name of an index's shard; "unassigned" holds records without an index."""
+    if not index_id:
+        return "unassigned"
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", index_id)
+    if safe != index_id:
+        import hashlib
+
+        safe += "-" + hashlib.sha1(index_id.encode()).hexdigest()[:8]
+    return f"index-{safe}"
+
+
+class ShardSet:
+    """Per-index shards of the state.
+
+    Each index gets a backend of its own under <state_dir>/shards/<shard
+    name>/ holding that index's rows of SHARDED_TABLES, so writes to
+    different indexes take different locks and a reader loads only the
+    index it needs. Shards are opened on first use and kept open.
+    """
+
+    def __init__(self, name: str, state_dir: Path, default: dict):
+        self.name = name
+        self.dir = Path(state_dir) / "shards"
+        self.default = default
+        self._open = {}
+
+    def get(self, index_id: Optional[str]):
+        """Get the backend for an index's shard (None or "" for unassigned)."""
+        key = index_id or ""
+        if key not in self._open:
+            self._open[key] = open_backend(self.name, self.dir / shard_name(key), self.default)
+        return self._open[key]
+
+    def close(self) -> None:
+        for backend in self._open.values():
+            backend.close()
+        self._open.clear()
+
+
+def open_backend(name: str, state_dir: Path, default: dict):
+    """Create the named backend rooted at state_dir.
+
+    Falls back to the json backend when SQLite is not available.
+    """
+    state_dir = Path(state_dir)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown state backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    if name == "sqlite" and sqlite3 is not None:
+        return SQLiteBackend(state_dir / "state.db", default, legacy_path=state_dir / "config.json")
+    if name == "journal":
+        return JournalBackend(state_dir / "journal", default, legacy_path=state_dir / "config.json")
+    return JsonBackend(state_dir / "config.json", default)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 3 and sys.argv[1] == "compact-journal":
+        # Started by JournalBackend once a log passes the threshold
+        JournalBackend(Path(sys.argv[2]), {}).compact(min_bytes=JOURNAL_COMPACT_BYTES)
+    else:
+        print("Usage: storage.py compact-journal <journal dir>")
+        sys.exit(2)
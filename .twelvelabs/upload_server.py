@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Local stand-in for a chunked upload endpoint.
+
+Speaks the protocol uploader.py uses, keeps uploads on disk under a
+directory of its own and serves assembled files back by URL, so the
+upload manager can be exercised end to end without a network. Faults can
+be injected to test retries and resumption:
+
+    --failure-rate R   answer this fraction of chunk requests with 503
+    --corrupt-rate R   damage this fraction of received chunks, so their
+                       checksum no longer matches and they are rejected
+    --latency S        sleep S seconds before answering each request
+
+Usage:
+    python upload_server.py [--port 8765] [--dir DIR] [fault options]
+
+The server prints its base URL; point TWELVELABS_UPLOAD_URL at it.
+start_server() runs one in a background thread for scripts.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote, unquote
+
+COPY_SIZE = 1024 * 1024
+
+UPLOAD_PATH = re.compile(r"^/uploads/([0-9a-f]{32})$")
+CHUNK_PATH = re.compile(r"^/uploads/([0-9a-f]{32})/chunks/(\d+)$")
+COMPLETE_PATH = re.compile(r"^/uploads/([0-9a-f]{32})/complete$")
+FILE_PATH = re.compile(r"^/files/([0-9a-f]{32})/([^/]+)$")
+
+
+class UploadServer(ThreadingHTTPServer):
+    """HTTP server holding uploads in root, with optional injected faults."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, root: Path, failure_rate: float = 0.0,
+                 corrupt_rate: float = 0.0, latency: float = 0.0):
+        super().__init__(address, UploadHandler)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.failure_rate = failure_rate
+        self.corrupt_rate = corrupt_rate
+        self.latency = latency
+        self.stats = {"requests": 0, "chunks": 0, "rejected": 0, "failed": 0, "completed": 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def load(self, upload_id: str) -> Optional[dict]:
+        try:
+            return json.loads((self.root / upload_id / "upload.json").read_text())
+        except FileNotFoundError:
+            return None
+
+    def save(self, upload: dict) -> None:
+        path = self.root / upload["upload_id"] / "upload.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(upload))
+        os.replace(tmp, path)
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    server: UploadServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, code: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def error(self, code: int, message: str) -> None:
+        self.reply(code, {"error": message})
+
+    def body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def start(self) -> None:
+        self.server.count("requests")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def do_POST(self):
+        self.start()
+        try:
+            request = json.loads(self.body() or b"{}")
+        except ValueError:
+            return self.error(400, "Body must be JSON")
+        if self.path == "/uploads":
+            return self.create(request)
+        match = COMPLETE_PATH.match(self.path)
+        if match:
+            return self.complete(match.group(1), request)
+        self.error(404, "Not found")
+
+    def do_PUT(self):
+        self.start()
+        match = CHUNK_PATH.match(self.path)
+        if not match:
+            self.body()
+            return self.error(404, "Not found")
+        self.put_chunk(match.group(1), int(match.group(2)))
+
+    def do_GET(self):
+        self.start()
+        match = UPLOAD_PATH.match(self.path)
+        if match:
+            upload = self.server.load(match.group(1))
+            if upload is None:
+                return self.error(404, "Unknown upload")
+            return self.reply(200, upload)
+        match = FILE_PATH.match(self.path)
+        if match:
+            return self.send_file(match.group(1), unquote(match.group(2)))
+        self.error(404, "Not found")
+
+    def create(self, request: dict) -> None:
+        try:
+            filename = os.path.basename(str(request["filename"])) or "video"
+            size = int(request["size"])
+            chunk_size = int(request["chunk_size"])
+        except (KeyError, TypeError, ValueError):
+            return self.error(400, "filename, size and chunk_size are required")
+        if size < 0 or chunk_size <= 0:
+            return self.error(400, "size must be >= 0 and chunk_size > 0")
+        upload_id = uuid.uuid4().hex
+        (self.server.root / upload_id).mkdir()
+        upload = {"upload_id": upload_id, "filename": filename, "size": size,
+                  "chunk_size": chunk_size, "received": {}, "url": None}
+        self.server.save(upload)
+        self.reply(201, upload)
+
+    def put_chunk(self, upload_id: str, index: int) -> None:
+        data = self.body()
+        with self.server.lock:
+            upload = self.server.load(upload_id)
+        if upload is None:
+            return self.error(404, "Unknown upload")
+        count = -(-upload["size"] // upload["chunk_size"])
+        if index >= count:
+            return self.error(400, f"Chunk {index} is past the end of the file ({count} chunks)")
+        expected = min(upload["chunk_size"], upload["size"] - index * upload["chunk_size"])
+        if len(data) != expected:
+            return self.error(400, f"Chunk {index} should be {expected} bytes, got {len(data)}")
+        if random.random() < self.server.failure_rate:
+            self.server.count("failed")
+            return self.error(503, "Simulated failure")
+        if data and random.random() < self.server.corrupt_rate:
+            data = bytes([data[0] ^ 0xFF]) + data[1:]
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != self.headers.get("X-Chunk-SHA256"):
+            self.server.count("rejected")
+            return self.error(422, f"Checksum mismatch for chunk {index}")
+
+        part = self.server.root / upload_id / f"{index}.part"
+        tmp = part.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, part)
+        with self.server.lock:
+            upload = self.server.load(upload_id)
+            upload["received"][str(index)] = digest
+            self.server.save(upload)
+        self.server.count("chunks")
+        self.reply(200, {"index": index, "sha256": digest, "size": len(data)})
+
+    def complete(self, upload_id: str, request: dict) -> None:
+        upload = self.server.load(upload_id)
+        if upload is None:
+            return self.error(404, "Unknown upload")
+        count = -(-upload["size"] // upload["chunk_size"])
+        checksums = request.get("checksums") or []
+        received = upload["received"]
+        missing = [i for i in range(count) if str(i) not in received]
+        if missing:
+            return self.error(409, f"{len(missing)} chunks are missing, starting with chunk {missing[0]}")
+        if [received[str(i)] for i in range(count)] != checksums:
+            return self.error(409, "Chunk checksums don't match the uploaded chunks")
+
+        directory = self.server.root / upload_id
+        target = directory / upload["filename"]
+        with open(target.with_suffix(".assembling"), "wb") as out:
+            for i in range(count):
+                with open(directory / f"{i}.part", "rb") as part:
+                    shutil.copyfileobj(part, out, COPY_SIZE)
+        os.replace(target.with_suffix(".assembling"), target)
+        for i in range(count):
+            (directory / f"{i}.part").unlink()
+        upload["url"] = f"{self.server.url}/files/{upload_id}/{quote(upload['filename'])}"
+        self.server.save(upload)
+        self.server.count("completed")
+        self.reply(200, {"upload_id": upload_id, "url": upload["url"], "size": upload["size"]})
+
+    def send_file(self, upload_id: str, filename: str) -> None:
+        upload = self.server.load(upload_id)
+        if upload is None or not upload.get("url") or filename != upload["filename"]:
+            return self.error(404, "No such file")
+        path = self.server.root / upload_id / filename
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, COPY_SIZE)
+
+
+def start_server(root: Optional[Path] = None, host: str = "127.0.0.1", port: int = 0,
+                 **faults) -> UploadServer:
+    """Start an UploadServer in a daemon thread and return it.
+
+    Args:
+        root: Directory for uploads (default: a new temporary directory)
+        host: Interface to listen on
+        port: Port to listen on; 0 picks a free one
+        **faults: failure_rate, corrupt_rate and latency (see UploadServer)
+
+    Returns:
+        The running server; its url attribute is the base URL. Call
+        shutdown() to stop it.
+    """
+    server = UploadServer((host, port), root or Path(tempfile.mkdtemp(prefix="twelvelabs-uploads-")), **faults)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the chunked upload endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dir", help="directory for uploads (default: a new temporary directory)")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--corrupt-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    root = Path(args.dir) if args.dir else Path(tempfile.mkdtemp(prefix="twelvelabs-uploads-"))
+    server = UploadServer((args.host, args.port), root, failure_rate=args.failure_rate,
+                          corrupt_rate=args.corrupt_rate, latency=args.latency)
+    print(f"Serving uploads at {server.url} from {root}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats))
+
+
+if __name__ == "__main__":
+    main()
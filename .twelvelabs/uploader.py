@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""Chunked, resumable uploads of local video files.
+
+Large files are not sent to the indexing API in one request. The upload
+manager splits a file into CHUNK_SIZE chunks and sends them to an upload
+endpoint with up to WORKERS requests in flight. Each chunk carries its
+SHA-256, which the server checks before it acknowledges the chunk. The
+server then assembles the file and serves it at a URL, and the indexing
+task is started from that URL (videoUrl) instead of the local path.
+
+Progress is kept in the local state's uploads table, next to
+pending_tasks, keyed by the file's normalized path. Every acknowledged
+chunk is recorded with its checksum as soon as it arrives, so an upload
+that is interrupted resumes from where it stopped: running it again
+checks with the server which chunks it still holds and sends only the
+rest. If the file changed since (size or mtime), or the server no longer
+knows the upload, it starts over.
+
+Protocol (see upload_server.py for a local stand-in):
+    POST /uploads {filename, size, chunk_size}
+        -> {upload_id}
+    PUT  /uploads/<upload_id>/chunks/<index>, header X-Chunk-SHA256
+        -> {index, sha256}; 422 if the checksum doesn't match the body
+    GET  /uploads/<upload_id>
+        -> {received: {"<index>": sha256}}; 404 for an unknown upload
+    POST /uploads/<upload_id>/complete {checksums: [sha256, ...]}
+        -> {url}
+
+Anything with the same methods as HttpTransport can stand in for it (see
+load_transport).
+
+Usage:
+    python uploader.py upload <file> [--transport SPEC] [--workers N] [--chunk-size BYTES]
+    python uploader.py status            # uploads in the local state
+    python uploader.py forget <file>     # drop a recorded upload
+
+Configuration (environment variables):
+- TWELVELABS_UPLOAD_URL: base URL of the upload endpoint
+- TWELVELABS_UPLOAD_TOKEN: bearer token sent to it, if it needs one
+- TWELVELABS_UPLOAD_CHUNK_BYTES: chunk size (default 8 MiB)
+- TWELVELABS_UPLOAD_WORKERS: chunks in flight per file (default 4)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Optional
+
+from api_client import CLIENT_ERRORS
+from config_helper import (
+    ack_upload_chunks,
+    complete_upload,
+    get_all_uploads,
+    get_upload,
+    remove_upload,
+    start_upload,
+)
+
+UPLOAD_URL = os.environ.get("TWELVELABS_UPLOAD_URL")
+UPLOAD_TOKEN = os.environ.get("TWELVELABS_UPLOAD_TOKEN")
+CHUNK_SIZE = int(os.environ.get("TWELVELABS_UPLOAD_CHUNK_BYTES", 8 * 1024 * 1024))
+WORKERS = int(os.environ.get("TWELVELABS_UPLOAD_WORKERS", 4))
+REQUEST_TIMEOUT = 60
+
+# Attempts per chunk before giving up, with exponential backoff between them
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 0.5
+
+UPLOAD_ERRORS = CLIENT_ERRORS
+
+
+class ChecksumError(ValueError):
+    """The server's checksum of a chunk doesn't match the one sent."""
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    return -(-size // chunk_size)
+
+
+def _retryable(error: Exception) -> bool:
+    """Whether a failed chunk request is worth sending again."""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in (408, 422, 429) or error.code >= 500
+    return True
+
+
+class HttpTransport:
+    """Client for the upload endpoint using only the standard library."""
+
+    def __init__(self, base_url: Optional[str] = UPLOAD_URL, token: Optional[str] = UPLOAD_TOKEN):
+        if not base_url:
+            raise ValueError("TWELVELABS_UPLOAD_URL is not set")
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+
+    def request(self, method: str, path: str, body: Optional[dict] = None,
+                data: Optional[bytes] = None, headers: Optional[dict] = None) -> dict:
+        """Make a request and return the decoded JSON response."""
+        headers = dict(headers or {})
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        req = urllib.request.Request(f"{self.base_url}{path}", data=data, method=method, headers=headers)
+        with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
+            return json.load(resp)
+
+    def create(self, filename: str, size: int, chunk_size: int) -> str:
+        """Start an upload; returns its ID."""
+        result = self.request("POST", "/uploads", body={"filename": filename, "size": size, "chunk_size": chunk_size})
+        if not result.get("upload_id"):
+            raise ValueError(f"No upload ID in response: {result}")
+        return result["upload_id"]
+
+    def put_chunk(self, upload_id: str, index: int, data: bytes, sha256: str) -> str:
+        """Send one chunk; returns the checksum the server computed."""
+        result = self.request("PUT", f"/uploads/{urllib.parse.quote(upload_id)}/chunks/{index}", data=data,
+                              headers={"Content-Type": "application/octet-stream", "X-Chunk-SHA256": sha256})
+        return result.get("sha256")
+
+    def received(self, upload_id: str) -> Optional[dict[int, str]]:
+        """Chunks the server holds, as {index: sha256}; None if it doesn't know the upload."""
+        try:
+            result = self.request("GET", f"/uploads/{urllib.parse.quote(upload_id)}")
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+        return {int(index): digest for index, digest in (result.get("received") or {}).items()}
+
+    def complete(self, upload_id: str, checksums: list[str]) -> str:
+        """Finish an upload; returns the URL the assembled file is served at."""
+        result = self.request("POST", f"/uploads/{urllib.parse.quote(upload_id)}/complete",
+                              body={"checksums": checksums})
+        if not result.get("url"):
+            raise ValueError(f"No URL in response: {result}")
+        return result["url"]
+
+
+def load_transport(spec: Optional[str] = None):
+    """Create an upload transport from a spec.
+
+    Args:
+        spec: "http" (the default) for HttpTransport on TWELVELABS_UPLOAD_URL,
+            or "module:factory", where factory is a class or function that
+            takes no arguments
+
+    Returns:
+        A transport instance
+    """
+    if not spec or spec == "http":
+        return HttpTransport()
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Transport spec must be 'module:factory', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+def send_chunk(transport, path: str, upload_id: str, index: int, chunk_size: int) -> str:
+    """Read one chunk of path and upload it, retrying with backoff.
+
+    Returns:
+        The chunk's SHA-256, once the server has acknowledged it
+    """
+    with open(path, "rb") as f:
+        f.seek(index * chunk_size)
+        data = f.read(chunk_size)
+    digest = hashlib.sha256(data).hexdigest()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            echoed = transport.put_chunk(upload_id, index, data, digest)
+            if echoed != digest:
+                raise ChecksumError(f"Server has checksum {echoed} for chunk {index}, expected {digest}")
+            return digest
+        except UPLOAD_ERRORS as e:
+            if attempt == MAX_ATTEMPTS or not _retryable(e):
+                raise
+            time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+
+async def upload(path: str, transport, chunk_size: int = CHUNK_SIZE, workers: int = WORKERS,
+                 log=None) -> dict:
+    """Upload a local file in chunks, resuming a recorded upload if there is one.
+
+    Chunks are read and sent in worker threads; state writes stay on the
+    event loop thread (the storage backend isn't shared across threads).
+
+    Args:
+        path: The local file
+        transport: Upload endpoint client (see HttpTransport)
+        chunk_size: Chunk size for a new upload; a resumed upload keeps its own
+        workers: Chunks in flight at a time
+        log: Optional callable for progress lines
+
+    Returns:
+        The upload record, with its "url", plus "sent" and "reused" chunk counts
+
+    Raises:
+        OSError, ValueError or urllib.error.URLError (UPLOAD_ERRORS): If the
+            server can't be reached or keeps rejecting a chunk. Acknowledged
+            chunks stay recorded, so calling it again resumes.
+    """
+    from fingerprint import file_identity
+
+    path = os.path.abspath(path)
+    _, stat = file_identity(path)
+    record = get_upload(path)
+    if record and (record["size"], record["mtime_ns"]) != (stat["size"], stat["mtime_ns"]):
+        if log:
+            log(f"restarting {path}: the file changed since its upload started")
+        record = None
+    if record and record.get("url"):
+        return dict(record, sent=0, reused=chunk_count(record["size"], record["chunk_size"]))
+
+    acked = {}
+    if record:
+        received = await asyncio.to_thread(transport.received, record["upload_id"])
+        if received is None:
+            if log:
+                log(f"restarting {path}: the server no longer has upload {record['upload_id']}")
+            record = None
+        else:
+            acked = {int(index): digest for index, digest in record["chunks"].items()
+                     if received.get(int(index)) == digest}
+    if not record:
+        upload_id = await asyncio.to_thread(transport.create, os.path.basename(path), stat["size"], chunk_size)
+        record = start_upload(path, upload_id, stat["size"], stat["mtime_ns"], chunk_size)
+        if record is None:
+            raise OSError(f"Could not record upload {upload_id} in the local state")
+
+    upload_id, chunk_size = record["upload_id"], record["chunk_size"]
+    count = chunk_count(record["size"], chunk_size)
+    todo = [index for index in range(count) if index not in acked]
+    if log and acked:
+        log(f"resuming  {path}: {len(acked)} of {count} chunks already uploaded")
+
+    queue = asyncio.Queue()
+    for index in todo:
+        queue.put_nowait(index)
+
+    async def worker() -> None:
+        while not queue.empty():
+            index = queue.get_nowait()
+            digest = await asyncio.to_thread(send_chunk, transport, path, upload_id, index, chunk_size)
+            acked[index] = digest
+            ack_upload_chunks(path, {index: digest})
+
+    tasks = [asyncio.create_task(worker()) for _ in range(max(1, min(workers, len(todo))))]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    url = await asyncio.to_thread(transport.complete, upload_id, [acked[index] for index in range(count)])
+    complete_upload(path, url)
+    if log:
+        log(f"uploaded  {path} ({len(todo)} chunks sent, {count - len(todo)} reused)")
+    return dict(record, chunks={str(index): digest for index, digest in acked.items()},
+                status="complete", url=url, sent=len(todo), reused=count - len(todo))
+
+
+def upload_file(path: str, transport=None, chunk_size: int = CHUNK_SIZE, workers: int = WORKERS,
+                log=None) -> dict:
+    """Blocking wrapper around upload(); transport defaults to load_transport()."""
+    return asyncio.run(upload(path, transport or load_transport(), chunk_size, workers, log))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload local videos in resumable chunks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upload_parser = commands.add_parser("upload", help="upload a file, resuming an earlier attempt")
+    upload_parser.add_argument("file")
+    upload_parser.add_argument("--transport", default=os.environ.get("TWELVELABS_UPLOAD_TRANSPORT"),
+                               help='"http" (TWELVELABS_UPLOAD_URL) or module:factory')
+    upload_parser.add_argument("--workers", type=int, default=WORKERS)
+    upload_parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    upload_parser.add_argument("--quiet", action="store_true")
+    commands.add_parser("status", help="list recorded uploads")
+    forget_parser = commands.add_parser("forget", help="drop the recorded upload of a file")
+    forget_parser.add_argument("file")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        uploads = get_all_uploads()
+        for upload_record in uploads.values():
+            upload_record["acknowledged"] = len(upload_record.pop("chunks"))
+            upload_record["total_chunks"] = chunk_count(upload_record["size"], upload_record["chunk_size"])
+        print(json.dumps(uploads, indent=2))
+        return
+    if args.command == "forget":
+        if not remove_upload(os.path.abspath(args.file)):
+            sys.exit(1)
+        return
+
+    if not os.path.isfile(args.file):
+        print(f"No such file: {args.file}", file=sys.stderr)
+        sys.exit(2)
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    try:
+        result = upload_file(args.file, load_transport(args.transport), args.chunk_size, args.workers, log)
+    except UPLOAD_ERRORS as e:
+        print(f"Upload failed: {e}. Run the same command again to resume.", file=sys.stderr)
+        sys.exit(1)
+    result.pop("chunks")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
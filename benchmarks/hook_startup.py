@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Startup benchmark for the plugin hooks.
+
+Runs each hook through hooks/dispatch.py in a fresh interpreter with a
+representative payload, against a throwaway state directory, and reports:
+
+- wall-clock time per invocation (median and max over --runs), and
+- import time and the slowest imports, from one `python -X importtime` run.
+
+Exits with status 1 if any hook's median wall-clock time exceeds the budget,
+so it can gate changes that make hooks slower to start.
+
+Usage:
+    python benchmarks/hook_startup.py [--runs N] [--budget-ms MS] [--top N] [--json]
+
+The budget defaults to TWELVELABS_HOOK_STARTUP_BUDGET_MS or 200 ms.
+The hook server is bypassed so every run measures a cold start.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+DISPATCH = PLUGIN_ROOT / "hooks" / "dispatch.py"
+DEFAULT_BUDGET_MS = float(os.environ.get("TWELVELABS_HOOK_STARTUP_BUDGET_MS", 200))
+
+
+def scenarios(video_path: str) -> list[tuple[str, str, dict]]:
+    """(label, hook name, payload) for each benchmarked hook path."""
+    return [
+        ("pre-index-video (invalid input)", "pre-index-video", {
+            "tool_input": {"videoFilePath": "/nonexistent/video.mp4"}
+        }),
+        ("pre-index-video (local file)", "pre-index-video", {
+            "tool_input": {"videoFilePath": video_path}
+        }),
+        ("pre-index-video (url)", "pre-index-video", {
+            "tool_input": {"videoUrl": "https://example.com/video.mp4?utm_source=x"}
+        }),
+        ("post-index-video", "post-index-video", {
+            "tool_input": {"videoFilePath": video_path},
+            "tool_result": {"task_id": "bench-task"}
+        }),
+        ("post-check-status", "post-check-status", {
+            "tool_input": {"taskId": "bench-task"},
+            "tool_result": {"task_id": "bench-task", "status": "indexing"}
+        }),
+        ("pre-analyze", "pre-analyze", {
+            "tool_input": {"videoId": "bench-video", "type": "summary"}
+        }),
+        ("post-analyze", "post-analyze", {
+            "tool_input": {"videoId": "bench-video", "type": "summary"},
+            "tool_result": {"data": "A short summary."}
+        }),
+        ("pre-search", "pre-search", {
+            "tool_input": {"query": "a person walking", "indexId": "bench-index"}
+        }),
+        ("post-search", "post-search", {
+            "tool_input": {"query": "a person walking", "indexId": "bench-index"},
+            "tool_result": {"data": [{"video_id": "bench-video", "start": 12.0, "end": 28.0}]}
+        }),
+        ("pre-list", "pre-list", {
+            "tool_name": "mcp__twelvelabs-mcp__list-videos",
+            "tool_input": {"indexId": "bench-index"}
+        }),
+        ("post-list", "post-list", {
+            "tool_name": "mcp__twelvelabs-mcp__list-videos",
+            "tool_input": {"indexId": "bench-index"},
+            "tool_result": {
+                "data": [{"_id": "bench-video", "created_at": "2026-01-01T00:00:00Z"}],
+                "page_info": {"page": 1, "limit_per_page": 10, "total_page": 1, "total_results": 1}
+            }
+        }),
+    ]
+
+
+def run_hook(hook: str, payload: bytes, env: dict, importtime: bool = False) -> tuple[float, str]:
+    """Run one hook invocation. Returns (wall-clock ms, stderr)."""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += [str(DISPATCH), hook]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, input=payload, env=env, capture_output=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{hook} exited with {proc.returncode}: {proc.stderr.decode()[-500:]}")
+    return elapsed, proc.stderr.decode()
+
+
+def parse_importtime(stderr: str) -> tuple[float, list[tuple[float, str]]]:
+    """Parse -X importtime output into (total ms, [(self ms, module)])."""
+    total_us = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us) / 1000, name.strip()))
+        # Top-level imports are not indented; their cumulative times add up to the total
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative_us)
+    modules.sort(reverse=True)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="invocations per hook (default 10)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum median wall-clock time per hook")
+    parser.add_argument("--top", type=int, default=5, help="slowest imports to list per hook")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        video_path = os.path.join(state_dir, "bench.mp4")
+        with open(video_path, "wb") as f:
+            f.write(os.urandom(256 * 1024))
+
+        env = dict(os.environ)
+        env.update({
+            "CLAUDE_PLUGIN_ROOT": str(PLUGIN_ROOT),
+            "TWELVELABS_STATE_DIR": state_dir,
+            "TWELVELABS_HOOKD_SOCKET": os.path.join(state_dir, "no-server.sock"),
+        })
+
+        results = []
+        for label, hook, payload in scenarios(video_path):
+            data = json.dumps(payload).encode()
+            # Warm-up run creates the state and fills the OS file cache
+            run_hook(hook, data, env)
+            times = [run_hook(hook, data, env)[0] for _ in range(args.runs)]
+            _, stderr = run_hook(hook, data, env, importtime=True)
+            import_ms, modules = parse_importtime(stderr)
+            median = statistics.median(times)
+            results.append({
+                "hook": label,
+                "median_ms": round(median, 1),
+                "max_ms": round(max(times), 1),
+                "import_ms": round(import_ms, 1),
+                "slowest_imports": [[name, round(ms, 1)] for ms, name in modules[:args.top]],
+                "over_budget": median > args.budget_ms,
+            })
+
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "runs": args.runs, "results": results}, indent=2))
+    else:
+        print(f"{'hook':<34} {'median':>8} {'max':>8} {'imports':>8}   (ms, budget {args.budget_ms:g})")
+        for r in results:
+            flag = "  OVER BUDGET" if r["over_budget"] else ""
+            print(f"{r['hook']:<34} {r['median_ms']:>8} {r['max_ms']:>8} {r['import_ms']:>8}{flag}")
+            slowest = ", ".join(f"{name} {ms}" for name, ms in r["slowest_imports"])
+            print(f"    slowest imports: {slowest}")
+
+    if any(r["over_budget"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Benchmark the local state and hooks at realistic scale.
+
+For each storage backend and state size, seeds a throwaway state directory
+with a synthetic state of N videos, N cached analyses and N/10 pending
+tasks, then times:
+
+- config_helper operations in-process: read_config, get_video_by_source,
+  cache_analysis, get_cached_analysis and complete_task;
+- every hook end to end through hooks/dispatch.py in a fresh interpreter,
+  with a stdin payload that refers to the seeded state;
+- a burst of concurrent hook invocations started from a multiprocessing
+  pool, reporting wall time, throughput and latency percentiles.
+
+Results are printed (or written with --output) as JSON. Pass --compare
+with the JSON of an earlier revision to see the change in each median.
+
+Usage:
+    python benchmarks/scale.py [--sizes 10,1000,100000] [--backends sqlite,json,journal]
+                               [--runs N] [--burst N] [--processes N]
+                               [--payloads DIR] [--output FILE] [--compare FILE]
+
+--payloads replays recorded hook contexts: DIR/<hook-name>.json replaces
+the synthetic payload for that hook. The analysis cache budget is raised
+above N so the seeded entries are not evicted on the first write.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from hook_startup import PLUGIN_ROOT, run_hook
+
+SIZES = (10, 1000, 100000)
+BACKENDS = ("sqlite", "json", "journal")
+RUNS = 5
+BURST = 32
+PROCESSES = 8
+
+SUMMARY = (
+    "The presenter walks through the quarterly results, then demos the new "
+    "dashboard and answers questions from the audience about pricing."
+)
+
+
+def synthetic_state(size: int, runs: int) -> dict:
+    """Build a state with size videos and cached analyses and size/10 pending tasks."""
+    now = datetime.utcnow().isoformat() + "Z"
+    entry_size = len(json.dumps(SUMMARY))
+    videos, cache, pending = {}, {}, {}
+    for i in range(size):
+        video_id = f"video-{i:06d}"
+        videos[video_id] = {
+            "video_id": video_id,
+            "task_id": f"task-{i:06d}",
+            "source": f"/bench/videos/clip-{i:06d}.mp4",
+            "filename": f"clip-{i:06d}.mp4",
+            "status": "ready",
+            "indexed_at": now,
+            "fingerprint": f"full:1048576:{i:032x}",
+            "index_id": "bench-index",
+        }
+        cache[video_id] = {"summary": {
+            "analysis_type": "summary",
+            "cached_at": now,
+            "last_accessed": now,
+            "size": entry_size,
+            "result": SUMMARY,
+        }}
+    # Enough pending tasks for every complete_task run
+    for i in range(max(size // 10, runs)):
+        task_id = f"pending-{i:06d}"
+        pending[task_id] = {
+            "task_id": task_id,
+            "source": f"https://example.com/bench/{i:06d}.mp4",
+            "status": "indexing",
+            "started_at": now,
+            "index_id": "bench-index",
+        }
+    return {
+        "default_index_id": "bench-index",
+        "videos": videos,
+        "pending_tasks": pending,
+        "analysis_cache": cache,
+        "analysis_cache_usage": {"entries": size, "bytes": size * entry_size},
+    }
+
+
+def hook_payloads(video_path: str, pending: int) -> dict:
+    """A stdin payload per hook, referring to the seeded state."""
+    return {
+        "pre-index-video": {"tool_input": {"videoUrl": "https://example.com/bench/000000.mp4"}},
+        "post-index-video": {
+            "tool_input": {"videoFilePath": video_path},
+            "tool_result": {"task_id": "bench-new-task"},
+        },
+        "post-check-status": {
+            "tool_input": {},
+            "tool_result": {"data": [
+                {"_id": f"pending-{i:06d}", "status": "indexing"} for i in range(min(pending, 50))
+            ]},
+        },
+        "pre-analyze": {"tool_input": {"videoId": "video-000000", "type": "summary"}},
+        "post-analyze": {
+            "tool_input": {"videoId": "video-000001", "type": "summary", "prompt": "What is shown?"},
+            "tool_result": {"data": SUMMARY},
+        },
+        "pre-search": {"tool_input": {"query": "quarterly results", "indexId": "bench-index"}},
+        "post-search": {
+            "tool_input": {"query": "quarterly results", "indexId": "bench-index"},
+            "tool_result": {"data": [{"video_id": "video-000000", "start": 12.0, "end": 28.0}]},
+        },
+        "pre-list": {
+            "tool_name": "mcp__twelvelabs-mcp__list-videos",
+            "tool_input": {"indexId": "bench-index"},
+        },
+        "post-list": {
+            "tool_name": "mcp__twelvelabs-mcp__list-videos",
+            "tool_input": {"indexId": "bench-index"},
+            "tool_result": {
+                "data": [{"_id": f"video-{i:06d}", "created_at": "2026-01-01T00:00:00Z"} for i in range(10)],
+                "page_info": {"page": 1, "limit_per_page": 10, "total_page": 1, "total_results": 10},
+            },
+        },
+    }
+
+
+def summarize(times: list[float]) -> dict:
+    """Timing summary in milliseconds."""
+    ordered = sorted(times)
+    return {
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def time_calls(fn, args_list: list) -> dict:
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        times.append((time.perf_counter() - start) * 1000)
+    return summarize(times)
+
+
+def worker(size: int, runs: int) -> dict:
+    """Seed the state (from the environment) and time config_helper in-process."""
+    sys.path.insert(0, str(PLUGIN_ROOT / ".twelvelabs"))
+    import config_helper
+
+    rng = random.Random(size)
+    start = time.perf_counter()
+    if not config_helper.write_config(synthetic_state(size, runs)):
+        raise RuntimeError("Failed to seed the state")
+    seed_ms = (time.perf_counter() - start) * 1000
+
+    picks = [rng.randrange(size) for _ in range(runs)]
+    return {
+        "seed_ms": round(seed_ms, 1),
+        "state_bytes": config_helper.get_config_path().stat().st_size,
+        "operations": {
+            "read_config": time_calls(config_helper.read_config, [()] * runs),
+            "get_video_by_source": time_calls(
+                config_helper.get_video_by_source,
+                [(f"/bench/videos/clip-{i:06d}.mp4",) for i in picks]),
+            "cache_analysis": time_calls(
+                config_helper.cache_analysis,
+                [(f"video-{i:06d}", "summary", SUMMARY, f"bench prompt {n}") for n, i in enumerate(picks)]),
+            "get_cached_analysis": time_calls(
+                config_helper.get_cached_analysis,
+                [(f"video-{i:06d}", "summary") for i in picks]),
+            "complete_task": time_calls(
+                config_helper.complete_task,
+                [(f"pending-{n:06d}", f"completed-{n:06d}") for n in range(runs)]),
+        },
+    }
+
+
+def _burst_call(job: tuple) -> float:
+    hook, data, env = job
+    return run_hook(hook, data, env)[0]
+
+
+def time_burst(payloads: dict, env: dict, invocations: int, processes: int) -> dict:
+    """Start invocations hook runs (reads and writes mixed) from a process pool."""
+    hooks = ["pre-analyze", "post-analyze", "post-check-status", "pre-index-video"]
+    jobs = [(hook, json.dumps(payloads[hook]).encode(), env)
+            for hook in (hooks[i % len(hooks)] for i in range(invocations))]
+    with multiprocessing.Pool(processes) as pool:
+        start = time.perf_counter()
+        latencies = pool.map(_burst_call, jobs, chunksize=1)
+        wall_ms = (time.perf_counter() - start) * 1000
+    return {
+        "processes": processes,
+        "invocations": invocations,
+        "hooks": hooks,
+        "wall_ms": round(wall_ms, 1),
+        "throughput_per_s": round(invocations / (wall_ms / 1000), 1),
+        "latency": summarize(latencies),
+    }
+
+
+def bench(backend: str, size: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as state_dir:
+        env = dict(os.environ)
+        env.update({
+            "CLAUDE_PLUGIN_ROOT": str(PLUGIN_ROOT),
+            "TWELVELABS_STATE_DIR": state_dir,
+            "TWELVELABS_STATE_BACKEND": backend,
+            "TWELVELABS_HOOKD_SOCKET": os.path.join(state_dir, "no-server.sock"),
+            "TWELVELABS_ANALYSIS_CACHE_MAX_ENTRIES": str(size * 2 + 1000),
+            "TWELVELABS_ANALYSIS_CACHE_MAX_BYTES": str(size * 2048 + 20 * 1024 * 1024),
+        })
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", str(size), "--runs", str(args.runs)],
+            env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Worker failed for {backend}/{size}: {proc.stderr[-1000:]}")
+        result = json.loads(proc.stdout)
+
+        video_path = os.path.join(state_dir, "bench.mp4")
+        with open(video_path, "wb") as f:
+            f.write(os.urandom(256 * 1024))
+        payloads = hook_payloads(video_path, max(size // 10, args.runs))
+        if args.payloads:
+            for path in Path(args.payloads).glob("*.json"):
+                payloads[path.stem] = json.loads(path.read_text())
+
+        result["hooks"] = {}
+        for hook, payload in payloads.items():
+            data = json.dumps(payload).encode()
+            run_hook(hook, data, env)
+            result["hooks"][hook] = summarize([run_hook(hook, data, env)[0] for _ in range(args.runs)])
+
+        result["burst"] = time_burst(payloads, env, args.burst, args.processes)
+        return result
+
+
+def flatten(results: dict) -> dict:
+    """Map "backend/size/section/name" to median ms for comparison."""
+    flat = {}
+    for backend, sizes in results.items():
+        for size, result in sizes.items():
+            for section in ("operations", "hooks"):
+                for name, timing in result.get(section, {}).items():
+                    flat[f"{backend}/{size}/{section}/{name}"] = timing["median_ms"]
+            if "burst" in result:
+                flat[f"{backend}/{size}/burst/wall"] = result["burst"]["wall_ms"]
+    return flat
+
+
+def compare(old: dict, new: dict) -> None:
+    """Print the change in every median between two result files."""
+    before, after = flatten(old["results"]), flatten(new["results"])
+    print(f"{'benchmark':<52} {'before':>10} {'after':>10} {'change':>8}")
+    for key in sorted(set(before) & set(after)):
+        change = (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+        print(f"{key:<52} {before[key]:>10.2f} {after[key]:>10.2f} {change:>+7.1f}%")
+
+
+def revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PLUGIN_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated state sizes (default 10,1000,100000)")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends")
+    parser.add_argument("--runs", type=int, default=RUNS, help="runs per operation and hook (default 5)")
+    parser.add_argument("--burst", type=int, default=BURST, help="hook invocations per burst (default 32)")
+    parser.add_argument("--processes", type=int, default=PROCESSES, help="burst concurrency (default 8)")
+    parser.add_argument("--payloads", help="directory of recorded <hook-name>.json payloads")
+    parser.add_argument("--output", help="write the results to this file instead of stdout")
+    parser.add_argument("--compare", help="results of an earlier run to compare against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(worker(args.worker, args.runs)))
+        return
+
+    results = {}
+    for backend in args.backends.split(","):
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(f"benchmarking {backend} with {size} videos...", file=sys.stderr)
+            results.setdefault(backend, {})[str(size)] = bench(backend, size, args)
+
+    report = {
+        "revision": revision(),
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"runs": args.runs, "burst": args.burst, "processes": args.processes},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Stress the local state with concurrent writers and check its invariants.
+
+Starts N worker processes at the same moment against one throwaway state
+directory. Each runs a random, interleaved mix of add_pending_task,
+complete_task and cache_analysis, the writes the hooks make when Claude
+polls status and analyzes in parallel. Tasks are spread over --indexes
+indexes (one state shard each). Some pending tasks are shared, so workers
+race to complete the same task. Workers also re-read the raw state
+file between writes to catch torn (truncated) documents.
+
+When all workers are done the state is checked against what they report
+they did:
+
+- lost_tasks: a task added and not completed is not pending
+- lost_completions: a completed task has no video record
+- pending_and_video: a task is both pending and a video
+- double_completions: a shared task was completed by more than one worker
+- lost_cache_entries: a cached analysis is missing
+- cache_usage: the running analysis cache totals don't match the entries
+- stale_source_index: a pending task's source doesn't resolve to it
+- failed_writes: a write returned False (a storage error under load)
+- torn_reads: a worker read an unparseable state file
+- integrity: the state file doesn't parse, fails PRAGMA integrity_check,
+  or temp files were left behind
+
+Throughput, per-operation latency and lock contention (time waiting for
+the state writer lock, from the hook metrics records) are reported per
+backend. Exits with status 1 if any invariant is violated.
+
+Usage:
+    python benchmarks/stress.py [--backends sqlite,json,journal] [--processes N]
+                                [--operations N] [--shared N] [--indexes N] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from hook_startup import PLUGIN_ROOT
+
+BACKENDS = ("sqlite", "json", "journal")
+PROCESSES = 8
+OPERATIONS = 200
+SHARED_TASKS = 20
+INDEXES = 1
+
+# Relative frequency of each operation in a worker's mix
+MIX = (("add_pending_task", 40), ("complete_task", 25), ("complete_shared", 10), ("cache_analysis", 25))
+
+# Workers re-read the raw state file after every this many operations
+READ_EVERY = 5
+
+# Lock waits longer than this count as contended
+CONTENDED_MS = 1.0
+
+RESULT = "Scene at {start}s: a speaker presents the results to the team."
+
+
+def shared_task_id(n: int) -> str:
+    return f"shared-{n:04d}"
+
+
+def seed(shared: int) -> dict:
+    """Add the pending tasks that every worker races to complete."""
+    import config_helper
+
+    for n in range(shared):
+        if not config_helper.add_pending_task(shared_task_id(n), f"https://example.com/shared/{n}.mp4",
+                                              status="indexing"):
+            raise RuntimeError("Failed to seed the state")
+    return {"shared": shared}
+
+
+def read_raw(backend) -> bool:
+    """Read the state file the way a concurrent reader would; False if it is torn."""
+    try:
+        if backend.name == "json":
+            if backend.path.exists():
+                json.loads(backend.path.read_text())
+        else:
+            backend.load()
+        return True
+    except Exception:
+        return False
+
+
+def worker(index: int, operations: int, shared: int, indexes: int, start_at: float) -> dict:
+    """Run a random mix of writes and report what succeeded."""
+    import config_helper
+    import metrics
+
+    rng = random.Random(index)
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    report = {
+        "added": [], "completed": {}, "shared_won": [], "cached": [],
+        "failed_writes": [], "torn_reads": 0,
+    }
+    pending = []
+    backend = config_helper.get_backend()
+
+    time.sleep(max(0.0, start_at - time.time()))
+    for n in range(operations):
+        op = rng.choices(names, weights)[0]
+        if op == "complete_task" and not pending:
+            op = "add_pending_task"
+
+        metrics.begin(f"stress:{op}")
+        start = time.perf_counter()
+        if op == "add_pending_task":
+            task_id = f"w{index}-task-{n}"
+            ok = config_helper.add_pending_task(task_id, f"/stress/w{index}/clip-{n}.mp4",
+                                                index_id=f"stress-index-{n % indexes}")
+            if ok:
+                report["added"].append(task_id)
+                pending.append(task_id)
+        elif op == "complete_task":
+            task_id = pending.pop(rng.randrange(len(pending)))
+            video_id = f"video-{task_id}"
+            ok = config_helper.complete_task(task_id, video_id, f"{task_id}.mp4")
+            if ok:
+                report["completed"][task_id] = video_id
+        elif op == "complete_shared":
+            task_id = shared_task_id(rng.randrange(shared))
+            # Losing the race returns False; that is expected, not a failed write
+            if config_helper.complete_task(task_id, f"video-{task_id}-w{index}"):
+                report["shared_won"].append(task_id)
+            ok = True
+        else:
+            video_id = f"video-hot-{rng.randrange(4)}"
+            prompt = f"worker {index} question {n}"
+            ok = config_helper.cache_analysis(video_id, "summary", RESULT.format(start=n), prompt=prompt)
+            if ok:
+                report["cached"].append([video_id, config_helper.analysis_cache_key("summary", prompt)])
+        metrics.end(op_ms=(time.perf_counter() - start) * 1000, ok=bool(ok))
+
+        if not ok:
+            report["failed_writes"].append(op)
+        if n % READ_EVERY == 0 and not read_raw(backend):
+            report["torn_reads"] += 1
+    return report
+
+
+def check(reports: list[dict], shared: int) -> dict:
+    """Check the final state against the workers' reports."""
+    import config_helper
+    import serializers
+
+    violations = {}
+
+    def violation(name: str, detail) -> None:
+        violations.setdefault(name, []).append(detail)
+
+    backend = config_helper.get_backend()
+    if backend.name == "json":
+        try:
+            json.loads(backend.path.read_text())
+        except ValueError as e:
+            violation("integrity", f"config.json does not parse: {e}")
+        for tmp in backend.path.parent.glob(f".{backend.path.name}.*.tmp"):
+            violation("integrity", f"temp file left behind: {tmp.name}")
+    elif backend.name == "journal":
+        for journal in [backend.dir] + sorted(config_helper.CONFIG_DIR.glob("shards/*/journal")):
+            try:
+                serializers.loads((journal / "snapshot").read_bytes())
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                violation("integrity", f"{journal / 'snapshot'} does not parse: {e}")
+            for path in sorted(journal.glob("*.log")):
+                data = path.read_bytes()
+                if data and not data.endswith(b"\n"):
+                    violation("integrity", f"{path} ends in a partial record")
+                try:
+                    for line in data.splitlines():
+                        json.loads(line)
+                except ValueError as e:
+                    violation("integrity", f"{path} does not parse: {e}")
+            for tmp in journal.glob(".snapshot.*.tmp"):
+                violation("integrity", f"temp file left behind: {tmp}")
+    else:
+        (result,) = backend.conn.execute("PRAGMA integrity_check").fetchone()
+        if result != "ok":
+            violation("integrity", f"integrity_check: {result}")
+
+    config = config_helper.read_config()
+    pending = config["pending_tasks"]
+    videos = config["videos"]
+    video_tasks = {video.get("task_id"): video_id for video_id, video in videos.items()}
+
+    for report in reports:
+        for task_id in report["added"]:
+            if task_id not in report["completed"] and task_id not in pending:
+                violation("lost_tasks", task_id)
+        for task_id, video_id in report["completed"].items():
+            if videos.get(video_id, {}).get("task_id") != task_id:
+                violation("lost_completions", task_id)
+        for video_id, key in report["cached"]:
+            if key not in config["analysis_cache"].get(video_id, {}):
+                violation("lost_cache_entries", f"{video_id}/{key}")
+        for op in report["failed_writes"]:
+            violation("failed_writes", op)
+        if report["torn_reads"]:
+            violation("torn_reads", report["torn_reads"])
+
+    for task_id in sorted(set(pending) & set(video_tasks)):
+        violation("pending_and_video", task_id)
+
+    wins = {}
+    for report in reports:
+        for task_id in report["shared_won"]:
+            wins[task_id] = wins.get(task_id, 0) + 1
+    for task_id, count in sorted(wins.items()):
+        if count > 1:
+            violation("double_completions", f"{task_id} x{count}")
+    for n in range(shared):
+        task_id = shared_task_id(n)
+        if task_id not in wins and task_id not in pending:
+            violation("lost_tasks", task_id)
+
+    entries = [entry for cache in config["analysis_cache"].values() for entry in cache.values()]
+    usage = config.get("analysis_cache_usage") or {}
+    actual = {"entries": len(entries), "bytes": sum(entry.get("size", 0) for entry in entries)}
+    if {key: usage.get(key) for key in actual} != actual:
+        violation("cache_usage", {"recorded": usage, "actual": actual})
+
+    for task_id, task in pending.items():
+        found = config_helper.lookup_source(task["source"]).get("pending_task") or {}
+        if found.get("task_id") != task_id:
+            violation("stale_source_index", task_id)
+
+    return {
+        "pending": len(pending),
+        "videos": len(videos),
+        "cache_entries": len(entries),
+        "violations": violations,
+    }
+
+
+def run_worker(mode: str, env: dict, *args) -> dict:
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", mode, *map(str, args)],
+        env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Worker {mode} failed: {proc.stderr[-1000:]}")
+    return json.loads(proc.stdout)
+
+
+def stress(backend: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as state_dir:
+        env = dict(os.environ)
+        env.update({
+            "TWELVELABS_STATE_DIR": state_dir,
+            "TWELVELABS_STATE_BACKEND": backend,
+            # Keep every entry so lost cache writes are detectable
+            "TWELVELABS_ANALYSIS_CACHE_MAX_ENTRIES": str(args.processes * args.operations + 1000),
+            "TWELVELABS_METRICS": "1",
+            "TWELVELABS_METRICS_MAX_BYTES": str(1 << 40),
+            "PYTHONPATH": str(PLUGIN_ROOT / ".twelvelabs"),
+        })
+        run_worker("seed", env, args.shared)
+
+        # Give every worker time to import before they all start writing
+        start_at = time.time() + 1.0 + 0.05 * args.processes
+        procs = [
+            subprocess.Popen(
+                [sys.executable, __file__, "--worker", str(i), str(args.operations), str(args.shared),
+                 str(args.indexes), str(start_at)],
+                env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            for i in range(args.processes)
+        ]
+        reports = []
+        for proc in procs:
+            stdout, stderr = proc.communicate()
+            if proc.returncode != 0:
+                raise RuntimeError(f"Worker failed: {stderr[-1000:]}")
+            reports.append(json.loads(stdout))
+
+        path = os.path.join(state_dir, "reports.json")
+        Path(path).write_text(json.dumps(reports))
+        result = run_worker("check", env, path, args.shared)
+
+        sys.path.insert(0, str(PLUGIN_ROOT / ".twelvelabs"))
+        import metrics
+
+        records = [r for r in metrics.iter_records(os.path.join(state_dir, "metrics.jsonl"))
+                   if str(r.get("hook", "")).startswith("stress:")]
+        result.update(summarize(records))
+        return result
+
+
+def summarize(records: list[dict]) -> dict:
+    """Throughput, latency per operation and lock contention from the metrics records."""
+    import metrics
+
+    if not records:
+        return {"operations": 0}
+    wall = max(r["ts"] for r in records) - min(r["ts"] for r in records)
+    waits = sorted(r.get("lock_wait_ms", 0) for r in records)
+    latency = {}
+    for op in sorted({r["hook"] for r in records}):
+        values = sorted(r["op_ms"] for r in records if r["hook"] == op)
+        latency[op.split(":", 1)[1]] = {
+            "count": len(values),
+            **{f"p{q}_ms": round(metrics.percentile(values, q), 3) for q in metrics.PERCENTILES},
+            "max_ms": round(values[-1], 3),
+        }
+    return {
+        "operations": len(records),
+        "wall_s": round(wall, 3),
+        "ops_per_s": round(len(records) / wall, 1) if wall else None,
+        "latency": latency,
+        "lock_wait": {
+            **{f"p{q}_ms": round(metrics.percentile(waits, q), 3) for q in metrics.PERCENTILES},
+            "max_ms": round(waits[-1], 3),
+            "total_ms": round(sum(waits), 1),
+            "contended": round(sum(1 for w in waits if w > CONTENDED_MS) / len(waits), 3),
+        },
+    }
+
+
+def print_result(backend: str, result: dict) -> None:
+    print(f"{backend}: {result['operations']} ops in {result.get('wall_s', 0):.2f}s "
+          f"({result.get('ops_per_s') or 0:.0f} ops/s); final state {result['pending']} pending, "
+          f"{result['videos']} videos, {result['cache_entries']} cached analyses")
+    for op, timing in result.get("latency", {}).items():
+        print(f"  {op:<18} n={timing['count']:<5} p50 {timing['p50_ms']:8.2f} ms  "
+              f"p95 {timing['p95_ms']:8.2f} ms  max {timing['max_ms']:8.2f} ms")
+    wait = result.get("lock_wait")
+    if wait:
+        print(f"  lock wait          p50 {wait['p50_ms']:.2f} ms  p95 {wait['p95_ms']:.2f} ms  "
+              f"max {wait['max_ms']:.2f} ms  contended {wait['contended']:.0%} of ops")
+    if result["violations"]:
+        for name, details in result["violations"].items():
+            print(f"  VIOLATION {name}: {len(details)} ({', '.join(map(str, details[:5]))})")
+    else:
+        print("  invariants: ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends")
+    parser.add_argument("--processes", type=int, default=PROCESSES, help="concurrent workers (default 8)")
+    parser.add_argument("--operations", type=int, default=OPERATIONS, help="operations per worker (default 200)")
+    parser.add_argument("--shared", type=int, default=SHARED_TASKS,
+                        help="pending tasks all workers race to complete (default 20)")
+    parser.add_argument("--indexes", type=int, default=INDEXES,
+                        help="indexes the workers' tasks are spread over (default 1)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--worker", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, *rest = args.worker
+        if mode == "seed":
+            print(json.dumps(seed(int(rest[0]))))
+        elif mode == "check":
+            print(json.dumps(check(json.loads(Path(rest[0]).read_text()), int(rest[1]))))
+        else:
+            print(json.dumps(worker(int(mode), int(rest[0]), int(rest[1]), int(rest[2]), float(rest[3]))))
+        return
+
+    results = {backend: stress(backend, args) for backend in args.backends.split(",")}
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for backend, result in results.items():
+            print_result(backend, result)
+    if any(result["violations"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Single entry point for all plugin hooks.
+
+hooks.json runs every hook through this module:
+
+    python dispatch.py <hook-name>
+
+Only the matched hook module is imported, and hooks import config_helper
+(and with it the storage backend) lazily, so paths that never touch the
+local state, such as rejecting invalid input, don't pay for it.
+
+Hooks that can receive large tool results define handle_stream(stream),
+which parses the context incrementally; when one runs in this process it
+reads stdin directly, so the raw payload is never held in memory whole.
+Other hooks define handle(input_data).
+
+If the optional hook server (hook_server.py) is running, the payload is
+forwarded to it over a Unix socket instead; otherwise, or if the server
+can't be reached, the hook runs in this process. Once the payload has been
+handed to the server the hook is never run again here, even if no answer
+comes: the server may already have applied it.
+
+Every invocation run here or in the server appends a record (timings,
+payload size, state I/O, cache hits) to the metrics log; see metrics.py.
+"""
+
+import io
+import json
+import os
+import sys
+import time
+
+START = time.perf_counter()
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Add plugin root to path for imports
+# When installed as a plugin, CLAUDE_PLUGIN_ROOT points to the cached plugin directory
+PLUGIN_ROOT = os.environ.get("CLAUDE_PLUGIN_ROOT", os.path.dirname(HOOKS_DIR))
+sys.path.insert(0, os.path.join(PLUGIN_ROOT, ".twelvelabs"))
+
+# Hook name -> module file in this directory
+HOOKS = {
+    "pre-index-video": "pre-index-video.py",
+    "post-index-video": "post-index-video.py",
+    "post-check-status": "post-check-status.py",
+    "pre-analyze": "pre-analyze.py",
+    "post-analyze": "post-analyze.py",
+    "pre-search": "pre-search.py",
+    "post-search": "post-search.py",
+    "pre-list": "pre-list.py",
+    "post-list": "post-list.py",
+}
+
+# Give up on the hook server quickly if nothing is listening
+CONNECT_TIMEOUT = 0.05
+# Stay under the 10 second hook timeout in hooks.json
+RESPONSE_TIMEOUT = 8.0
+
+_modules = {}
+
+
+def socket_path() -> str:
+    """Get the hook server socket path for this plugin root and state dir.
+
+    Returns:
+        TWELVELABS_HOOKD_SOCKET if set, otherwise a per-user path in the
+        temp directory
+    """
+    explicit = os.environ.get("TWELVELABS_HOOKD_SOCKET")
+    if explicit:
+        return explicit
+    import zlib
+    state_dir = os.environ.get("TWELVELABS_STATE_DIR", "")
+    tag = zlib.crc32(f"{PLUGIN_ROOT}\0{state_dir}".encode())
+    tmp_dir = os.environ.get("TMPDIR") or "/tmp"
+    return os.path.join(tmp_dir, f"twelvelabs-hookd-{os.getuid()}-{tag:08x}.sock")
+
+
+def load_hook(name: str):
+    """Import a hook module by name, once.
+
+    Args:
+        name: Hook name, a key of HOOKS
+
+    Returns:
+        The hook module, which defines handle(input_data) -> dict and
+        optionally handle_stream(stream) -> dict
+    """
+    if name not in _modules:
+        import importlib.util
+        path = os.path.join(HOOKS_DIR, HOOKS[name])
+        spec = importlib.util.spec_from_file_location(f"hook_{name.replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return _modules[name]
+
+
+def run(name: str, payload: bytes | str | io.TextIOBase) -> dict:
+    """Run a hook on a raw stdin payload.
+
+    Args:
+        name: Hook name, a key of HOOKS
+        payload: The hook context as JSON, or a text stream of it
+
+    Returns:
+        The hook's JSON response. On hook errors, the tool call is allowed
+        to continue and the error is reported in the message.
+    """
+    import metrics
+
+    metrics.begin(name)
+    start = time.perf_counter()
+    error = False
+    try:
+        module = load_hook(name)
+        if isinstance(payload, (bytes, str)):
+            metrics.add("payload_bytes", len(payload))
+        if isinstance(payload, bytes):
+            payload = payload.decode()
+        if hasattr(module, "handle_stream"):
+            response = module.handle_stream(payload)
+        else:
+            if not isinstance(payload, str):
+                payload = payload.read()
+            response = module.handle(json.loads(payload))
+    except Exception as e:
+        error = True
+        response = {
+            "continue": True,
+            "message": f"Hook error: {str(e)}"
+        }
+    fields = {"hook_ms": (time.perf_counter() - start) * 1000, "response_bytes": len(json.dumps(response))}
+    if error:
+        fields["error"] = True
+    # Only meaningful when dispatch.py is the process, not imported by the hook server
+    if __name__ == "__main__":
+        fields["process_ms"] = (time.perf_counter() - START) * 1000
+    metrics.end(**fields)
+    return response
+
+
+def forward(name: str, payload: bytes) -> bytes | None:
+    """Send a hook invocation to the hook server.
+
+    Args:
+        name: Hook name, a key of HOOKS
+        payload: The raw hook context read from stdin
+
+    Returns:
+        The server's JSON response, or None if the server couldn't be
+        reached or didn't take the whole payload, so the hook can safely
+        run locally instead. If the payload was sent but no response
+        arrives, an error response is returned instead of None.
+    """
+    import socket
+
+    path = socket_path()
+    header = json.dumps({"hook": name, "cwd": os.getcwd()}).encode()
+    chunks = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.settimeout(RESPONSE_TIMEOUT)
+            sock.sendall(header + b"\n" + payload)
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            return None
+        try:
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+        except OSError as e:
+            chunks = []
+            error = e
+        else:
+            error = "connection closed without a response"
+    if chunks:
+        return b"".join(chunks)
+    return json.dumps({
+        "continue": True,
+        "message": f"Hook error: the hook server did not answer {name} ({error})"
+    }).encode()
+
+
+def main():
+    """Main entry point: read the context from stdin and print the hook's response."""
+    name = sys.argv[1] if len(sys.argv) > 1 else None
+    if name not in HOOKS:
+        print(json.dumps({
+            "continue": True,
+            "message": f"Hook error: unknown hook {name!r}"
+        }))
+        return
+
+    if not os.path.exists(socket_path()):
+        # No hook server: let the hook read stdin as it parses
+        from metrics import CountingReader
+        stdin = io.TextIOWrapper(io.BufferedReader(CountingReader(sys.stdin.buffer)), encoding="utf-8")
+        print(json.dumps(run(name, stdin)))
+        return
+
+    payload = sys.stdin.buffer.read()
+    response = forward(name, payload)
+    if response is not None:
+        print(response.decode())
+    else:
+        print(json.dumps(run(name, payload)))
+
+
+if __name__ == "__main__":
+    main()
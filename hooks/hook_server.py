@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Optional long-lived hook server.
+
+Launching a new interpreter for every PreToolUse/PostToolUse event means
+re-importing config_helper and reopening the state each time. This server
+imports every hook once, keeps the storage backend open (SQLite connection,
+or the parsed config.json kept in memory until the file changes) and
+handles hook invocations forwarded by dispatch.py over a Unix socket.
+All writes still go straight through to disk.
+
+Usage:
+    python hook_server.py start     # start in the background
+    python hook_server.py run       # run in the foreground
+    python hook_server.py status
+    python hook_server.py stop
+
+The server handles one request at a time and exits after
+TWELVELABS_HOOKD_IDLE_TIMEOUT seconds without requests (default 1800).
+Environment variables such as TWELVELABS_STATE_BACKEND are read once when
+the server starts; restart it after changing them.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from dispatch import HOOKS, load_hook, run, socket_path
+
+IDLE_TIMEOUT = float(os.environ.get("TWELVELABS_HOOKD_IDLE_TIMEOUT", 1800))
+START_TIMEOUT = 5.0
+
+
+class HookServer:
+    """Serve hook invocations from preloaded hook modules."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started_at = time.time()
+        self.requests = 0
+        self.running = True
+
+    def preload(self) -> None:
+        """Import every hook and open the state so the first request is fast."""
+        for name in HOOKS:
+            load_hook(name)
+        import config_helper
+        import metrics
+        config_helper.get_default_index_id()
+        metrics.set_context(server=True)
+
+    def handle_request(self, data: bytes) -> dict:
+        """Dispatch one request: a JSON header line followed by the payload."""
+        header, _, payload = data.partition(b"\n")
+        meta = json.loads(header)
+
+        command = meta.get("command")
+        if command == "status":
+            return {
+                "pid": os.getpid(),
+                "uptime": round(time.time() - self.started_at, 1),
+                "requests": self.requests,
+                "hooks": sorted(HOOKS)
+            }
+        if command == "stop":
+            self.running = False
+            return {"stopped": True}
+
+        name = meta.get("hook")
+        if name not in HOOKS:
+            return {"continue": True, "message": f"Hook error: unknown hook {name!r}"}
+
+        self.requests += 1
+        # Relative paths in tool input are relative to the caller's directory
+        if meta.get("cwd") and os.path.isdir(meta["cwd"]):
+            os.chdir(meta["cwd"])
+        return run(name, payload)
+
+    def serve(self) -> None:
+        """Accept connections until stopped or idle for IDLE_TIMEOUT seconds."""
+        if os.path.exists(self.path):
+            if request(self.path, {"command": "status"}) is not None:
+                print(f"Hook server already running on {self.path}", file=sys.stderr)
+                return
+            os.unlink(self.path)
+
+        self.preload()
+        old_umask = os.umask(0o077)
+        try:
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        server.listen(16)
+        server.settimeout(IDLE_TIMEOUT)
+        try:
+            while self.running:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    break
+                with conn:
+                    conn.settimeout(5)
+                    chunks = []
+                    while chunk := conn.recv(65536):
+                        chunks.append(chunk)
+                    try:
+                        response = self.handle_request(b"".join(chunks))
+                    except ValueError as e:
+                        response = {"continue": True, "message": f"Hook error: bad request: {e}"}
+                    conn.sendall(json.dumps(response).encode())
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+def request(path: str, header: dict) -> dict | None:
+    """Send a control command to a running server.
+
+    Returns:
+        The server's response, or None if no server is listening
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(path)
+            sock.sendall(json.dumps(header).encode() + b"\n")
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+        return json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+
+
+def start(path: str) -> bool:
+    """Start the server in the background and wait for it to answer."""
+    if request(path, {"command": "status"}) is not None:
+        return True
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "run"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        if request(path, {"command": "status"}) is not None:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    """Command-line entry point."""
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    path = socket_path()
+
+    if command == "run":
+        HookServer(path).serve()
+    elif command == "start":
+        if not start(path):
+            print("Hook server did not start", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(request(path, {"command": "status"})))
+    elif command == "stop":
+        print(json.dumps(request(path, {"command": "stop"}) or {"stopped": False, "message": "not running"}))
+    elif command == "status":
+        status = request(path, {"command": "status"})
+        print(json.dumps(status or {"running": False}))
+        if status is None:
+            sys.exit(1)
+    else:
+        print(f"Unknown command: {command}", file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
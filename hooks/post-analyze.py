@@ -1,23 +1,30 @@
-#!/usr/bin/env python3
 """Post-hook for analyse-video MCP tool.
 
 This hook runs after the MCP tool completes and caches the analysis result
-to avoid redundant API calls for the same video and analysis type.
+to avoid redundant API calls for the same video, analysis type, prompt
+and model parameters.
 
 Hook type: PostToolUse
 Matcher: mcp__twelvelabs-mcp__analyse-video
 """
 
-import json
-import sys
-import os
+from typing import TextIO
 
-# Add plugin root to path for imports
-# When installed as a plugin, CLAUDE_PLUGIN_ROOT points to the cached plugin directory
-plugin_root = os.environ.get("CLAUDE_PLUGIN_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.insert(0, os.path.join(plugin_root, ".twelvelabs"))
+# Tool input fields that identify the request; anything else is a model parameter
+REQUEST_FIELDS = {"videoId", "type", "prompt"}
 
-from config_helper import cache_analysis
+
+def extract_request_params(tool_input: dict) -> tuple[str | None, dict]:
+    """Extract the prompt and model parameters that make up the cache key.
+
+    Args:
+        tool_input: The input parameters passed to the MCP tool
+
+    Returns:
+        Tuple of (prompt, params)
+    """
+    params = {k: v for k, v in tool_input.items() if k not in REQUEST_FIELDS}
+    return tool_input.get("prompt"), params
 
 
 def extract_analysis_info(tool_input: dict, tool_result: dict) -> tuple[str | None, str | None, any]:
@@ -56,74 +63,82 @@ def extract_analysis_info(tool_input: dict, tool_result: dict) -> tuple[str | No
     return video_id, analysis_type, result
 
 
-def main():
-    """Main entry point for the hook.
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
 
-    Reads hook context from stdin as JSON:
+    Receives the hook context (read from stdin as JSON):
     {
         "tool_name": "mcp__twelvelabs-mcp__analyse-video",
         "tool_input": {...},
         "tool_result": {...}
     }
 
-    Outputs JSON response:
+    Returns the JSON response:
     {
         "continue": true,
         "message": "..." (optional status message)
     }
     """
-    try:
-        # Read input from stdin
-        input_data = json.load(sys.stdin)
-
-        tool_input = input_data.get("tool_input", {})
-        tool_result = input_data.get("tool_result", {})
-
-        # Extract analysis information
-        video_id, analysis_type, result = extract_analysis_info(tool_input, tool_result)
-
-        if video_id and analysis_type and result is not None:
-            # Cache the analysis result
-            success = cache_analysis(
-                video_id=video_id,
-                analysis_type=analysis_type,
-                result=result
-            )
-
-            if success:
-                response = {
-                    "continue": True,
-                    "message": f"Cached {analysis_type} analysis for video {video_id}"
-                }
-            else:
-                response = {
-                    "continue": True,
-                    "message": f"Warning: Failed to cache {analysis_type} analysis for video {video_id}"
-                }
-        elif video_id and analysis_type:
-            # Have video_id and type but no result (analysis might have failed)
+    tool_input = input_data.get("tool_input", {})
+    tool_result = input_data.get("tool_result", {})
+
+    # Extract analysis information
+    video_id, analysis_type, result = extract_analysis_info(tool_input, tool_result)
+
+    if video_id and analysis_type and result is not None:
+        from config_helper import cache_analysis, is_error_result
+
+        # A failed call must be retried, not replayed from the cache
+        if is_error_result(tool_result) or is_error_result(result):
+            return {
+                "continue": True,
+                "message": f"Not caching {analysis_type} analysis for video {video_id}: the tool returned an error"
+            }
+
+        # Cache the analysis result under its prompt-aware key
+        prompt, params = extract_request_params(tool_input)
+        success = cache_analysis(
+            video_id=video_id,
+            analysis_type=analysis_type,
+            result=result,
+            prompt=prompt,
+            params=params
+        )
+
+        if success:
             response = {
                 "continue": True,
-                "message": f"No result to cache for {analysis_type} analysis of video {video_id}"
+                "message": f"Cached {analysis_type} analysis for video {video_id}"
             }
         else:
-            # Could not extract required information
             response = {
                 "continue": True,
-                "message": "Warning: Could not extract video_id/type from analysis response"
+                "message": f"Warning: Failed to cache {analysis_type} analysis for video {video_id}"
             }
-
-        # Output response
-        print(json.dumps(response))
-
-    except Exception as e:
-        # Always allow continuation even if hook fails
+    elif video_id and analysis_type:
+        # Have video_id and type but no result (analysis might have failed)
         response = {
             "continue": True,
-            "message": f"Hook error: {str(e)}"
+            "message": f"No result to cache for {analysis_type} analysis of video {video_id}"
         }
-        print(json.dumps(response))
+    else:
+        # Could not extract required information
+        response = {
+            "continue": True,
+            "message": "Warning: Could not extract video_id/type from analysis response"
+        }
+
+    # Output response
+    return response
+
 
+def handle_stream(stream: TextIO | str) -> dict:
+    """Handle one hook invocation, parsing the context incrementally.
+
+    Only tool_input and tool_result are decoded, one at a time, so a large
+    analysis result is parsed once without first holding the raw payload.
+    """
+    from json_stream import iter_values
 
-if __name__ == "__main__":
-    main()
+    input_data = dict(iter_values(stream, ["tool_input", "tool_result"]))
+    return handle(input_data)
@@ -1,4 +1,3 @@
-#!/usr/bin/env python3
 """Post-hook for get-video-indexing-tasks MCP tool.
 
 This hook runs after the MCP tool completes and updates local config
@@ -9,79 +8,75 @@ Matcher: mcp__twelvelabs-mcp__get-video-indexing-tasks
 """
 
 import json
-import sys
-import os
+from itertools import islice
+from typing import Iterator, TextIO
 
-# Add plugin root to path for imports
-# When installed as a plugin, CLAUDE_PLUGIN_ROOT points to the cached plugin directory
-plugin_root = os.environ.get("CLAUDE_PLUGIN_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.insert(0, os.path.join(plugin_root, ".twelvelabs"))
+# tool_result fields holding a list of tasks, or a single task object
+TASK_LIST_FIELDS = ("data", "tasks", "result")
+SINGLE_TASK_FIELDS = ("data", "result")
 
-from config_helper import (
-    complete_task,
-    fail_task,
-    update_pending_task_status,
-    get_pending_task,
-    get_all_pending_tasks
-)
+# Tasks reconciled per transaction
+APPLY_BATCH_SIZE = 500
 
 
-def extract_tasks_from_result(tool_result: dict | str) -> list[dict]:
-    """Extract task information from the MCP tool result.
+def _path(base: str, key: str) -> str:
+    return f"{base}.{key}" if base else key
+
+
+def iter_task_objects(source: TextIO | str, base: str = "tool_result") -> Iterator[dict]:
+    """Yield raw task objects from the MCP tool result as they are parsed.
+
+    Handles a task list (the result itself, or its 'data', 'tasks' or
+    'result' field), a single task object in the result or its 'data' or
+    'result' field, and the same shapes delivered as a JSON string. Once a
+    task list has been found, only its elements are tasks; the envelope
+    around it ({"status": "ok", "data": [...]}) is not one, and neither is
+    any object without a task ID.
 
     Args:
-        tool_result: The result from the MCP tool
+        source: The hook context as a text stream or JSON string
+        base: Path of the tool result within source
 
-    Returns:
-        List of task dictionaries with task_id, status, video_id, filename
+    Yields:
+        Task dictionaries as returned by the API
+    """
+    from json_stream import iter_values
+
+    list_items = {_path(base, "item")} | {_path(_path(base, key), "item") for key in TASK_LIST_FIELDS}
+    singles = [base] + [_path(base, key) for key in SINGLE_TASK_FIELDS]
+    listed = False
+    for path, value in iter_values(source, list_items, collect=singles):
+        if isinstance(value, dict):
+            if path in list_items:
+                listed = True
+                yield value
+            elif not listed and "status" in value and normalize_task(value)["task_id"]:
+                yield value
+        elif isinstance(value, str) and path == base:
+            # Result delivered as JSON text
+            try:
+                yield from iter_task_objects(value, base="")
+            except ValueError:
+                return
+
+
+def iter_tasks(source: TextIO | str) -> Iterator[dict]:
+    """Yield normalized tasks from the hook context, each task_id once.
+
+    Args:
+        source: The hook context as a text stream or JSON string
+
+    Yields:
+        Normalized task dictionaries with task_id, status, video_id, filename
     """
-    tasks = []
-
-    # Handle string result (might be JSON)
-    if isinstance(tool_result, str):
-        try:
-            tool_result = json.loads(tool_result)
-        except json.JSONDecodeError:
-            return tasks
-
-    if not isinstance(tool_result, dict):
-        return tasks
-
-    # Check for tasks in various response formats
-    # Format 1: Direct task object (single task query)
-    if "status" in tool_result and ("task_id" in tool_result or "taskId" in tool_result or "id" in tool_result):
-        tasks.append(normalize_task(tool_result))
-        return tasks
-
-    # Format 2: Array of tasks in 'data' field
-    if "data" in tool_result:
-        data = tool_result["data"]
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    tasks.append(normalize_task(item))
-        elif isinstance(data, dict) and "status" in data:
-            tasks.append(normalize_task(data))
-
-    # Format 3: Array of tasks in 'tasks' field
-    if "tasks" in tool_result:
-        task_list = tool_result["tasks"]
-        if isinstance(task_list, list):
-            for item in task_list:
-                if isinstance(item, dict):
-                    tasks.append(normalize_task(item))
-
-    # Format 4: Array of tasks in 'result' field
-    if "result" in tool_result:
-        result = tool_result["result"]
-        if isinstance(result, list):
-            for item in result:
-                if isinstance(item, dict):
-                    tasks.append(normalize_task(item))
-        elif isinstance(result, dict) and "status" in result:
-            tasks.append(normalize_task(result))
-
-    return tasks
+    seen = set()
+    for item in iter_task_objects(source):
+        task = normalize_task(item)
+        if task["task_id"] in seen:
+            continue
+        if task["task_id"]:
+            seen.add(task["task_id"])
+        yield task
 
 
 def normalize_task(task: dict) -> dict:
@@ -101,109 +96,41 @@ def normalize_task(task: dict) -> dict:
     }
 
 
-def process_task_status(task: dict) -> dict:
-    """Process a task status update.
-
-    Args:
-        task: Normalized task dictionary
-
-    Returns:
-        Result dictionary with action taken and success status
-    """
-    task_id = task.get("task_id")
-    status = task.get("status")
-    video_id = task.get("video_id")
-    filename = task.get("filename")
-
-    if not task_id:
-        return {"action": "skipped", "reason": "no task_id"}
-
-    # Check if this task is in our pending tasks
-    pending = get_pending_task(task_id)
-    if not pending:
-        return {"action": "skipped", "reason": "not tracked locally", "task_id": task_id}
-
-    # Handle based on status
-    if status == "ready":
-        # Task complete - move to videos
-        if video_id:
-            success = complete_task(task_id, video_id, filename)
-            return {
-                "action": "completed",
-                "task_id": task_id,
-                "video_id": video_id,
-                "success": success
-            }
-        else:
-            return {
-                "action": "ready_but_no_video_id",
-                "task_id": task_id,
-                "success": False
-            }
-
-    elif status == "failed":
-        # Task failed - remove from pending
-        success = fail_task(task_id)
-        return {
-            "action": "failed",
-            "task_id": task_id,
-            "success": success
-        }
-
-    else:
-        # Still in progress - update status
-        success = update_pending_task_status(task_id, status)
-        return {
-            "action": "updated",
-            "task_id": task_id,
-            "status": status,
-            "success": success
-        }
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation from an already parsed context."""
+    return handle_stream(json.dumps(input_data))
 
 
-def main():
-    """Main entry point for the hook.
+def handle_stream(stream: TextIO | str) -> dict:
+    """Handle one hook invocation, parsing the context incrementally.
 
-    Reads hook context from stdin as JSON:
+    Receives the hook context (read from stdin as JSON):
     {
         "tool_name": "mcp__twelvelabs-mcp__get-video-indexing-tasks",
         "tool_input": {...},
         "tool_result": {...}
     }
 
-    Outputs JSON response:
+    Tasks are reconciled in batches as they are parsed, so a page with
+    thousands of tasks is never held in memory as a whole.
+
+    Returns the JSON response:
     {
         "continue": true,
         "message": "..." (optional status message)
     }
     """
-    try:
-        # Read input from stdin
-        input_data = json.load(sys.stdin)
-
-        tool_result = input_data.get("tool_result", {})
-
-        # Extract tasks from the result
-        tasks = extract_tasks_from_result(tool_result)
-
-        if not tasks:
-            response = {
-                "continue": True,
-                "message": "No task status information found in response"
-            }
-            print(json.dumps(response))
-            return
-
-        # Process each task
-        results = []
-        completed_count = 0
-        failed_count = 0
-        updated_count = 0
+    task_count = 0
+    completed_count = 0
+    failed_count = 0
+    updated_count = 0
 
-        for task in tasks:
-            result = process_task_status(task)
-            results.append(result)
+    tasks = iter_tasks(stream)
+    while batch := list(islice(tasks, APPLY_BATCH_SIZE)):
+        from config_helper import apply_task_updates
 
+        task_count += len(batch)
+        for result in apply_task_updates(batch):
             if result.get("action") == "completed" and result.get("success"):
                 completed_count += 1
             elif result.get("action") == "failed" and result.get("success"):
@@ -211,30 +138,26 @@ def main():
             elif result.get("action") == "updated" and result.get("success"):
                 updated_count += 1
 
-        # Build response message
-        messages = []
-        if completed_count > 0:
-            messages.append(f"{completed_count} task(s) completed and moved to videos")
-        if failed_count > 0:
-            messages.append(f"{failed_count} task(s) failed and removed from pending")
-        if updated_count > 0:
-            messages.append(f"{updated_count} task(s) status updated")
-
+    if not task_count:
         response = {
             "continue": True,
-            "message": "; ".join(messages) if messages else "Task status processed"
+            "message": "No task status information found in response"
         }
+        return response
+
+    # Build response message
+    messages = []
+    if completed_count > 0:
+        messages.append(f"{completed_count} task(s) completed and moved to videos")
+    if failed_count > 0:
+        messages.append(f"{failed_count} task(s) failed and removed from pending")
+    if updated_count > 0:
+        messages.append(f"{updated_count} task(s) status updated")
+
+    response = {
+        "continue": True,
+        "message": "; ".join(messages) if messages else "Task status processed"
+    }
 
-        print(json.dumps(response))
-
-    except Exception as e:
-        # Always allow continuation even if hook fails
-        response = {
-            "continue": True,
-            "message": f"Hook error: {str(e)}"
-        }
-        print(json.dumps(response))
-
+    return response
 
-if __name__ == "__main__":
-    main()
@@ -1,23 +1,15 @@
-#!/usr/bin/env python3
 """Post-hook for start-video-indexing-task MCP tool.
 
 This hook runs after the MCP tool completes and extracts task information
-from the response to track in local config.
+from the response to track in local config. A videoUrl that points at a
+file sent through the chunked uploader (uploader.py) is tracked under the
+local file it was uploaded from.
 
 Hook type: PostToolUse
 Matcher: mcp__twelvelabs-mcp__start-video-indexing-task
 """
 
 import json
-import sys
-import os
-
-# Add plugin root to path for imports
-# When installed as a plugin, CLAUDE_PLUGIN_ROOT points to the cached plugin directory
-plugin_root = os.environ.get("CLAUDE_PLUGIN_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.insert(0, os.path.join(plugin_root, ".twelvelabs"))
-
-from config_helper import add_pending_task
 
 
 def extract_task_info(tool_input: dict, tool_result: dict) -> tuple[str | None, str | None]:
@@ -66,79 +58,100 @@ def extract_task_info(tool_input: dict, tool_result: dict) -> tuple[str | None,
     return task_id, source
 
 
-def main():
-    """Main entry point for the hook.
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
 
-    Reads hook context from stdin as JSON:
+    Receives the hook context (read from stdin as JSON):
     {
         "tool_name": "mcp__twelvelabs-mcp__start-video-indexing-task",
         "tool_input": {...},
         "tool_result": {...}
     }
 
-    Outputs JSON response:
+    Returns the JSON response:
     {
         "continue": true,
         "message": "..." (optional status message)
     }
     """
-    try:
-        # Read input from stdin
-        input_data = json.load(sys.stdin)
-
-        tool_input = input_data.get("tool_input", {})
-        tool_result = input_data.get("tool_result", {})
-
-        # Extract task information
-        task_id, source = extract_task_info(tool_input, tool_result)
-
-        if task_id and source:
-            # Save task to local config
-            success = add_pending_task(
-                task_id=task_id,
-                source=source,
-                status="pending"
-            )
-
-            if success:
-                response = {
-                    "continue": True,
-                    "message": f"Task {task_id} tracked for {source}"
-                }
-            else:
-                response = {
-                    "continue": True,
-                    "message": f"Warning: Failed to save task {task_id} to local config"
-                }
-        elif task_id:
-            # Have task_id but no source - still track it
-            success = add_pending_task(
-                task_id=task_id,
-                source="unknown",
-                status="pending"
-            )
+    tool_input = input_data.get("tool_input", {})
+    tool_result = input_data.get("tool_result", {})
+
+    # Extract task information
+    task_id, source = extract_task_info(tool_input, tool_result)
+
+    if task_id:
+        from config_helper import (
+            add_pending_task,
+            get_cached_full_fingerprint,
+            get_default_index_id,
+            get_file_fingerprint,
+        )
+
+        # Recorded so the index's cached search results are dropped when the video is ready
+        index_id = tool_input.get("indexId") or get_default_index_id()
+
+    upload = None
+    if task_id and tool_input.get("videoUrl") and not tool_input.get("videoFilePath"):
+        from config_helper import find_upload_by_url
+        upload = find_upload_by_url(tool_input["videoUrl"])
+        if upload:
+            source = upload["source"]
+
+    if task_id and source:
+        # Fingerprint local files so copies are recognized later
+        fingerprint = full_fingerprint = None
+        if tool_input.get("videoFilePath") or upload:
+            try:
+                fingerprint = get_file_fingerprint(source)
+            except OSError:
+                pass
+            # Known if the pre-hook had to confirm a sampled match
+            full_fingerprint = get_cached_full_fingerprint(source)
+
+        # Save task to local config
+        success = add_pending_task(
+            task_id=task_id,
+            source=source,
+            status="pending",
+            fingerprint=fingerprint,
+            index_id=index_id,
+            full_fingerprint=full_fingerprint
+        )
+
+        if success and upload:
+            from config_helper import remove_upload
+            remove_upload(source)
+
+        if success:
             response = {
                 "continue": True,
-                "message": f"Task {task_id} tracked (source unknown)"
+                "message": f"Task {task_id} tracked for {source}"
             }
         else:
-            # Could not extract task information
             response = {
                 "continue": True,
-                "message": "Warning: Could not extract task_id from indexing response"
+                "message": f"Warning: Failed to save task {task_id} to local config"
             }
-
-        # Output response
-        print(json.dumps(response))
-
-    except Exception as e:
-        # Always allow continuation even if hook fails
+    elif task_id:
+        # Have task_id but no source - still track it
+        success = add_pending_task(
+            task_id=task_id,
+            source="unknown",
+            status="pending",
+            index_id=index_id
+        )
+        response = {
+            "continue": True,
+            "message": f"Task {task_id} tracked (source unknown)"
+        }
+    else:
+        # Could not extract task information
         response = {
             "continue": True,
-            "message": f"Hook error: {str(e)}"
+            "message": "Warning: Could not extract task_id from indexing response"
         }
-        print(json.dumps(response))
 
+    # Output response
+    return response
 
-if __name__ == "__main__":
-    main()
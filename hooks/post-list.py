@@ -0,0 +1,106 @@
+"""Post-hook for list-videos and list-indexes MCP tools.
+
+This hook runs after the MCP tool completes and mirrors the returned page
+into the local state, so pre-list.py can serve repeated listings without
+another API call.
+
+Hook type: PostToolUse
+Matcher: mcp__twelvelabs-mcp__list-videos|mcp__twelvelabs-mcp__list-indexes
+"""
+
+import json
+from typing import TextIO
+
+# Tool input fields the mirror understands; listings with any other option
+# (filters, sorting) are not mirrored
+LISTING_FIELDS = {"indexId", "page", "pageLimit", "page_limit"}
+
+# Result fields that may hold the page's items
+ITEM_FIELDS = ("data", "videos", "indexes", "items", "result")
+
+
+def extract_page(tool_result) -> tuple[list | None, dict | None]:
+    """Extract the items and page_info from a listing result.
+
+    Args:
+        tool_result: The result from the MCP tool
+
+    Returns:
+        Tuple of (items, page_info), or (None, None) if the result holds no list
+    """
+    if isinstance(tool_result, str):
+        try:
+            tool_result = json.loads(tool_result)
+        except json.JSONDecodeError:
+            return None, None
+    if isinstance(tool_result, list):
+        return tool_result, None
+    if not isinstance(tool_result, dict):
+        return None, None
+    for field in ITEM_FIELDS:
+        if isinstance(tool_result.get(field), list):
+            page_info = tool_result.get("page_info") or tool_result.get("pageInfo")
+            return tool_result[field], page_info if isinstance(page_info, dict) else None
+    return None, None
+
+
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
+
+    Receives the hook context (read from stdin as JSON):
+    {
+        "tool_name": "mcp__twelvelabs-mcp__list-videos",
+        "tool_input": {...},
+        "tool_result": {"data": [...], "page_info": {...}}
+    }
+
+    Returns the JSON response:
+    {
+        "continue": true,
+        "message": "..." (optional status message)
+    }
+    """
+    tool_input = input_data.get("tool_input", {})
+    tool_name = input_data.get("tool_name", "")
+    kind = "indexes" if tool_name.endswith("list-indexes") else "videos"
+
+    if set(tool_input) - LISTING_FIELDS:
+        return {"continue": True}
+
+    items, page_info = extract_page(input_data.get("tool_result"))
+    if items is None:
+        return {
+            "continue": True,
+            "message": f"Warning: Could not extract the {kind} listing to mirror"
+        }
+
+    from config_helper import get_default_index_id, mirror_listing_page
+
+    index_id = (tool_input.get("indexId") or get_default_index_id()) if kind == "videos" else None
+    try:
+        page = int((page_info or {}).get("page") or tool_input.get("page") or 1)
+    except (TypeError, ValueError):
+        page = 1
+
+    changed = mirror_listing_page(kind, index_id, page, items, page_info)
+    if changed is None:
+        return {
+            "continue": True,
+            "message": f"Warning: Failed to mirror the {kind} listing"
+        }
+    return {
+        "continue": True,
+        "message": f"Mirrored {kind} page {page} ({changed} new or changed)"
+    }
+
+
+def handle_stream(stream: TextIO | str) -> dict:
+    """Handle one hook invocation, parsing the context incrementally.
+
+    Only tool_name, tool_input and tool_result are decoded, so a large
+    listing is parsed once without first holding the raw payload.
+    """
+    from json_stream import iter_values
+
+    input_data = dict(iter_values(stream, ["tool_name", "tool_input", "tool_result"]))
+    return handle(input_data)
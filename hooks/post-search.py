@@ -0,0 +1,99 @@
+"""Post-hook for search MCP tool.
+
+This hook runs after the MCP tool completes and caches the search results,
+with their page_info, so the same query against the same index is answered
+locally until a video is added to that index.
+
+Hook type: PostToolUse
+Matcher: mcp__twelvelabs-mcp__search
+"""
+
+from typing import TextIO
+
+# Tool input fields that identify the request; anything else is a search option
+REQUEST_FIELDS = {"indexId", "query"}
+
+
+def extract_search_result(tool_result):
+    """Extract the search results from the tool result.
+
+    The whole payload is kept, not just its "data" list, so a result served
+    from the cache still carries page_info and the token for the next page.
+
+    Args:
+        tool_result: The result from the MCP tool
+
+    Returns:
+        The search results, or None if there are none
+    """
+    if isinstance(tool_result, dict):
+        if "data" in tool_result:
+            return tool_result if tool_result["data"] is not None else None
+        if "result" in tool_result:
+            return tool_result["result"]
+    return tool_result
+
+
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
+
+    Receives the hook context (read from stdin as JSON):
+    {
+        "tool_name": "mcp__twelvelabs-mcp__search",
+        "tool_input": {...},
+        "tool_result": {...}
+    }
+
+    Returns the JSON response:
+    {
+        "continue": true,
+        "message": "..." (optional status message)
+    }
+    """
+    tool_input = input_data.get("tool_input", {})
+    query = tool_input.get("query")
+    result = extract_search_result(input_data.get("tool_result"))
+
+    if not isinstance(query, str) or not query.strip():
+        return {
+            "continue": True,
+            "message": "Warning: Could not extract query from search response"
+        }
+    if result is None:
+        return {
+            "continue": True,
+            "message": f"No search results to cache for {query!r}"
+        }
+
+    from config_helper import cache_search, get_default_index_id, is_error_result
+
+    # A failed search must be retried, not replayed from the cache
+    if is_error_result(input_data.get("tool_result")) or is_error_result(result):
+        return {
+            "continue": True,
+            "message": f"Not caching search results for {query!r}: the tool returned an error"
+        }
+
+    index_id = tool_input.get("indexId") or get_default_index_id() or ""
+    options = {k: v for k, v in tool_input.items() if k not in REQUEST_FIELDS}
+    if cache_search(index_id, query, options, result):
+        return {
+            "continue": True,
+            "message": f"Cached search results for {query!r}"
+        }
+    return {
+        "continue": True,
+        "message": f"Warning: Failed to cache search results for {query!r}"
+    }
+
+
+def handle_stream(stream: TextIO | str) -> dict:
+    """Handle one hook invocation, parsing the context incrementally.
+
+    Only tool_input and tool_result are decoded, so a large result list is
+    parsed once without first holding the raw payload.
+    """
+    from json_stream import iter_values
+
+    input_data = dict(iter_values(stream, ["tool_input", "tool_result"]))
+    return handle(input_data)
@@ -0,0 +1,100 @@
+"""Pre-hook for analyse-video MCP tool.
+
+This hook runs before the MCP tool and serves the analysis from the local
+cache (written by post-analyze.py) when a fresh enough result exists, so a
+repeated request does not make another slow, billed generative call.
+
+Cache entries are keyed by video, analysis type, normalized prompt and
+model parameters, so open-ended questions are only answered from cache
+when the same question was asked before.
+
+Configuration (environment variables):
+- TWELVELABS_ANALYSIS_CACHE_TTL: freshness window in seconds (default 7 days),
+  enforced by the cache itself in config_helper
+- TWELVELABS_ANALYSIS_CACHE_BYPASS: set to 1 to always call the API
+
+Hook type: PreToolUse
+Matcher: mcp__twelvelabs-mcp__analyse-video
+"""
+
+import json
+import os
+
+# Skip the cache entirely
+CACHE_BYPASS = os.environ.get("TWELVELABS_ANALYSIS_CACHE_BYPASS", "") not in ("", "0", "false")
+
+# Tool input fields that identify the request; anything else is a model parameter
+REQUEST_FIELDS = {"videoId", "type", "prompt"}
+
+
+def format_result(result) -> str:
+    """Format a cached result for display to the model.
+
+    Args:
+        result: The cached analysis result
+
+    Returns:
+        The result as text
+    """
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, indent=2)
+
+
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
+
+    Receives the hook context (read from stdin as JSON):
+    {
+        "tool_name": "mcp__twelvelabs-mcp__analyse-video",
+        "tool_input": {
+            "videoId": "...",
+            "type": "...",
+            "prompt": "..." (optional)
+        }
+    }
+
+    Returns the JSON response. On a cache hit the tool call is blocked and the
+    cached result is returned to the model as the reason:
+    {
+        "continue": true,
+        "decision": "block",
+        "reason": "<cached analysis>",
+        "message": "..."
+    }
+
+    On a miss:
+    {
+        "continue": true
+    }
+    """
+    tool_input = input_data.get("tool_input", {})
+    video_id = tool_input.get("videoId")
+    analysis_type = tool_input.get("type")
+
+    response = {"continue": True}
+
+    if CACHE_BYPASS or not video_id or not analysis_type:
+        return response
+
+    from config_helper import get_cached_analysis, is_error_result
+
+    prompt = tool_input.get("prompt")
+    params = {k: v for k, v in tool_input.items() if k not in REQUEST_FIELDS}
+    entry = get_cached_analysis(video_id, analysis_type, prompt=prompt, params=params)
+
+    # An error cached before errors were filtered out is never served
+    if entry and entry.get("result") is not None and not is_error_result(entry["result"]):
+        response = {
+            "continue": True,
+            "decision": "block",
+            "reason": (
+                f"Served from local cache ({analysis_type} analysis of video {video_id}, "
+                f"cached at {entry['cached_at']}). This is the analysis result:\n\n"
+                f"{format_result(entry['result'])}"
+            ),
+            "message": f"Served cached {analysis_type} analysis for video {video_id}"
+        }
+
+    return response
+
@@ -1,29 +1,29 @@
-#!/usr/bin/env python3
 """Pre-hook for start-video-indexing-task MCP tool.
 
 This hook runs before the MCP tool and validates the input:
-- For local files: validates file exists and has a video extension
+- For local files: validates file exists and has a video extension, then
+  reads its container headers and rejects files that are empty, truncated
+  or outside the platform limits (duration, resolution, size) before upload
 - For URLs: validates URL format
-- Warns if the video is already indexed
+- Warns if the video is already indexed, including copies or renamed files
+  with the same content (or blocks, with TWELVELABS_DUPLICATE_POLICY=block)
 
 Hook type: PreToolUse
 Matcher: mcp__twelvelabs-mcp__start-video-indexing-task
 """
 
-import json
-import sys
 import os
 import re
 
-# Add plugin root to path for imports
-# When installed as a plugin, CLAUDE_PLUGIN_ROOT points to the cached plugin directory
-plugin_root = os.environ.get("CLAUDE_PLUGIN_ROOT", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.insert(0, os.path.join(plugin_root, ".twelvelabs"))
+# What to do when a local file's content is already indexed: "warn" or "block"
+DUPLICATE_POLICY = os.environ.get("TWELVELABS_DUPLICATE_POLICY", "warn")
 
-from config_helper import is_video_indexed, get_video_by_source, get_all_pending_tasks
+# What to do when a local file's headers show it can't be indexed: "block", "warn" or "off"
+PROBE_POLICY = os.environ.get("TWELVELABS_PROBE_POLICY", "block")
 
-# Supported video extensions
-VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+# Largest file hashed in full to confirm a duplicate; larger files are only
+# reported as possible duplicates, so the hook finishes within its timeout
+FULL_HASH_MAX_BYTES = int(os.environ.get("TWELVELABS_FULL_HASH_MAX_BYTES", 256 * 1024 * 1024))
 
 
 def is_video_extension(file_path: str) -> bool:
@@ -35,6 +35,8 @@ def is_video_extension(file_path: str) -> bool:
     Returns:
         True if the file has a video extension, False otherwise
     """
+    from sources import VIDEO_EXTENSIONS
+
     if not file_path:
         return False
     _, ext = os.path.splitext(file_path.lower())
@@ -76,22 +78,6 @@ def is_google_drive_url(url: str) -> bool:
     return "drive.google.com" in url.lower()
 
 
-def is_video_pending(source: str) -> tuple[bool, str | None]:
-    """Check if a video source has a pending indexing task.
-
-    Args:
-        source: The file path or URL of the video
-
-    Returns:
-        Tuple of (is_pending, task_id) where task_id is the pending task ID if found
-    """
-    pending_tasks = get_all_pending_tasks()
-    for task_id, task in pending_tasks.items():
-        if task.get("source") == source:
-            return True, task_id
-    return False, None
-
-
 def validate_local_file(file_path: str) -> tuple[bool, str | None]:
     """Validate a local file path.
 
@@ -114,12 +100,89 @@ def validate_local_file(file_path: str) -> tuple[bool, str | None]:
 
     # Check extension
     if not is_video_extension(file_path):
+        from sources import VIDEO_EXTENSIONS
+
         _, ext = os.path.splitext(file_path)
         return False, f"Unsupported video format '{ext}'. Supported formats: {', '.join(sorted(VIDEO_EXTENSIONS))}"
 
+    if PROBE_POLICY == "block":
+        problem = probe_local_file(file_path)
+        if problem:
+            return False, problem
+
     return True, None
 
 
+def probe_local_file(file_path: str) -> str | None:
+    """Read the file's container headers and check them against the platform limits.
+
+    Only the headers are read, and results are cached until the file changes.
+
+    Args:
+        file_path: The path to the local file
+
+    Returns:
+        Why indexing the file would fail, or None if it looks indexable
+    """
+    from config_helper import probe_video_file
+    from probe import describe, limit_violations
+
+    name = os.path.basename(file_path)
+    try:
+        info = probe_video_file(file_path)
+    except OSError as e:
+        return f"Cannot read '{name}': {e.strerror or e}"
+    if "error" in info:
+        return f"'{name}' is not a playable video: {info['error']}"
+    if "unprobed" in info:
+        # Headers too large to read say nothing about the file; let the API decide
+        return None
+    problems = limit_violations(info)
+    if problems:
+        return f"'{name}' ({describe(info)}) can't be indexed: {'; '.join(problems)}"
+    return None
+
+
+def check_content_duplicate(file_path: str, index_id: str | None = None) -> tuple[str | None, bool]:
+    """Check if a file with the same content is already indexed or pending.
+
+    A match on a sampled fingerprint is confirmed against a full hash of
+    both files (see config_helper.lookup_file_content). Files over
+    FULL_HASH_MAX_BYTES aren't hashed in full, so a match on one is only
+    confirmed if both full hashes are already known.
+
+    Args:
+        file_path: The path to the local file
+        index_id: The index the file is going to (None searches every index)
+
+    Returns:
+        Tuple of (description of the existing video or task, or None if
+        there is none; whether the match was confirmed)
+    """
+    from config_helper import lookup_file_content
+
+    try:
+        found = lookup_file_content(file_path, index_id, max_full_bytes=FULL_HASH_MAX_BYTES)
+    except OSError:
+        return None, False
+
+    name = os.path.basename(file_path)
+    same = "has the same content as" if found["confirmed"] else "may have the same content as"
+    if found["video"]:
+        video = found["video"]
+        return (
+            f"Video '{name}' {same} already indexed video "
+            f"{video.get('video_id', 'unknown')} (source: {video.get('source', 'unknown')})."
+        ), found["confirmed"]
+    if found["pending_task"]:
+        task = found["pending_task"]
+        return (
+            f"Video '{name}' {same} pending indexing task "
+            f"{task.get('task_id', 'unknown')} (source: {task.get('source', 'unknown')})."
+        ), found["confirmed"]
+    return None, False
+
+
 def validate_url(url: str) -> tuple[bool, str | None]:
     """Validate a URL.
 
@@ -138,19 +201,20 @@ def validate_url(url: str) -> tuple[bool, str | None]:
     return True, None
 
 
-def main():
-    """Main entry point for the hook.
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
 
-    Reads hook context from stdin as JSON:
+    Receives the hook context (read from stdin as JSON):
     {
         "tool_name": "mcp__twelvelabs-mcp__start-video-indexing-task",
         "tool_input": {
             "videoFilePath": "..." (optional),
-            "videoUrl": "..." (optional)
+            "videoUrl": "..." (optional),
+            "indexId": "..." (optional, defaults to the default index)
         }
     }
 
-    Outputs JSON response:
+    Returns the JSON response:
     {
         "continue": true/false,
         "message": "..." (validation result or warning)
@@ -159,103 +223,106 @@ def main():
     Note: This hook is informational and provides warnings, but generally
     allows continuation unless the input is clearly invalid.
     """
-    try:
-        # Read input from stdin
-        input_data = json.load(sys.stdin)
-
-        tool_input = input_data.get("tool_input", {})
-        video_file_path = tool_input.get("videoFilePath")
-        video_url = tool_input.get("videoUrl")
-
-        messages = []
-        should_continue = True
-
-        # Determine which source is being used
-        if video_file_path:
-            # Validate local file
-            is_valid, error_msg = validate_local_file(video_file_path)
-            if not is_valid:
-                messages.append(f"Validation error: {error_msg}")
-                should_continue = False
-            else:
-                # Normalize path for checking
-                abs_path = os.path.abspath(video_file_path)
-                source = abs_path
-
-                # Check if already indexed
-                if is_video_indexed(abs_path) or is_video_indexed(video_file_path):
-                    video = get_video_by_source(abs_path) or get_video_by_source(video_file_path)
-                    video_id = video.get("video_id", "unknown") if video else "unknown"
-                    messages.append(
-                        f"Warning: Video '{os.path.basename(video_file_path)}' is already indexed "
-                        f"(video_id: {video_id}). Proceeding will create a duplicate."
-                    )
-
-                # Check if indexing is pending
-                is_pending, task_id = is_video_pending(abs_path)
-                if not is_pending:
-                    is_pending, task_id = is_video_pending(video_file_path)
-                if is_pending:
-                    messages.append(
-                        f"Warning: Video '{os.path.basename(video_file_path)}' has a pending indexing task "
-                        f"(task_id: {task_id}). Use /twelvelabs:status to check progress."
-                    )
-
-        elif video_url:
-            # Validate URL
-            is_valid, error_msg = validate_url(video_url)
-            if not is_valid:
-                messages.append(f"Validation error: {error_msg}")
-                should_continue = False
-            else:
-                # Add info for Google Drive URLs
-                if is_google_drive_url(video_url):
-                    messages.append(
-                        "Google Drive link detected. For folder links, all MP4 videos will be indexed."
-                    )
-
-                # Check if already indexed
-                if is_video_indexed(video_url):
-                    video = get_video_by_source(video_url)
-                    video_id = video.get("video_id", "unknown") if video else "unknown"
-                    messages.append(
-                        f"Warning: This URL is already indexed (video_id: {video_id}). "
-                        f"Proceeding will create a duplicate."
-                    )
-
-                # Check if indexing is pending
-                is_pending, task_id = is_video_pending(video_url)
-                if is_pending:
-                    messages.append(
-                        f"Warning: This URL has a pending indexing task (task_id: {task_id}). "
-                        f"Use /twelvelabs:status to check progress."
-                    )
-
+    tool_input = input_data.get("tool_input", {})
+    video_file_path = tool_input.get("videoFilePath")
+    video_url = tool_input.get("videoUrl")
+
+    messages = []
+    should_continue = True
+
+    # Determine which source is being used
+    if video_file_path:
+        # Validate local file
+        is_valid, error_msg = validate_local_file(video_file_path)
+        if not is_valid:
+            messages.append(f"Validation error: {error_msg}")
+            should_continue = False
         else:
-            # Neither file path nor URL provided
-            messages.append(
-                "Validation error: Either videoFilePath or videoUrl must be provided"
-            )
+            # Local state is only loaded once the input is known to be valid
+            from config_helper import get_default_index_id, lookup_source
+
+            # One lookup covers both indexed and pending; the source is
+            # normalized so relative, absolute and symlinked paths match.
+            # Only the target index's shard is read.
+            index_id = tool_input.get("indexId") or get_default_index_id()
+            if PROBE_POLICY == "warn":
+                problem = probe_local_file(video_file_path)
+                if problem:
+                    messages.append(f"Warning: {problem}.")
+            found = lookup_source(video_file_path, index_id)
+            video = found["video"]
+            if video:
+                video_id = video.get("video_id", "unknown")
+                messages.append(
+                    f"Warning: Video '{os.path.basename(video_file_path)}' is already indexed "
+                    f"(video_id: {video_id}). Proceeding will create a duplicate."
+                )
+
+            task = found["pending_task"]
+            if task:
+                messages.append(
+                    f"Warning: Video '{os.path.basename(video_file_path)}' has a pending indexing task "
+                    f"(task_id: {task.get('task_id')}). Use /twelvelabs:status to check progress."
+                )
+
+            # Same content under another path (copied or renamed file)
+            if not video and not task:
+                duplicate_msg, confirmed = check_content_duplicate(video_file_path, index_id)
+                if duplicate_msg:
+                    # Only a match confirmed by a full hash is enough to block
+                    if DUPLICATE_POLICY == "block" and confirmed:
+                        messages.append(f"Duplicate blocked: {duplicate_msg}")
+                        should_continue = False
+                    else:
+                        messages.append(f"Warning: {duplicate_msg} Proceeding will create a duplicate.")
+
+    elif video_url:
+        # Validate URL
+        is_valid, error_msg = validate_url(video_url)
+        if not is_valid:
+            messages.append(f"Validation error: {error_msg}")
             should_continue = False
+        else:
+            # Add info for Google Drive URLs
+            if is_google_drive_url(video_url):
+                messages.append(
+                    "Google Drive link detected. For folder links, all MP4 videos will be indexed."
+                )
+
+            from config_helper import get_default_index_id, lookup_source
+
+            # One lookup covers both indexed and pending; tracking
+            # parameters and Drive link shapes are normalized away
+            found = lookup_source(video_url, tool_input.get("indexId") or get_default_index_id())
+            video = found["video"]
+            if video:
+                video_id = video.get("video_id", "unknown")
+                messages.append(
+                    f"Warning: This URL is already indexed (video_id: {video_id}). "
+                    f"Proceeding will create a duplicate."
+                )
+
+            task = found["pending_task"]
+            if task:
+                messages.append(
+                    f"Warning: This URL has a pending indexing task (task_id: {task.get('task_id')}). "
+                    f"Use /twelvelabs:status to check progress."
+                )
+
+    else:
+        # Neither file path nor URL provided
+        messages.append(
+            "Validation error: Either videoFilePath or videoUrl must be provided"
+        )
+        should_continue = False
+
+    # Build response
+    response = {
+        "continue": should_continue
+    }
 
-        # Build response
-        response = {
-            "continue": should_continue
-        }
-
-        if messages:
-            response["message"] = " ".join(messages)
-
-        print(json.dumps(response))
-
-    except Exception as e:
-        # On hook errors, allow continuation but report the error
-        response = {
-            "continue": True,
-            "message": f"Hook error: {str(e)}"
-        }
-        print(json.dumps(response))
+    if messages:
+        response["message"] = " ".join(messages)
 
+    return response
 
-if __name__ == "__main__":
-    main()
@@ -0,0 +1,102 @@
+"""Pre-hook for list-videos and list-indexes MCP tools.
+
+This hook runs before the MCP tool and serves the page from the local
+mirror of the listing (written by post-list.py and list_mirror.py refresh)
+while it is fresh, so picking a video to analyze or paging through a large
+index does not make another round trip.
+
+A videos listing stops being served once a video is added to its index.
+
+Configuration (environment variables):
+- TWELVELABS_LIST_MIRROR_TTL: seconds a synced listing is served (default 600),
+  enforced by the mirror itself in config_helper
+- TWELVELABS_LIST_MIRROR_BYPASS: set to 1 to always call the API
+
+Hook type: PreToolUse
+Matcher: mcp__twelvelabs-mcp__list-videos|mcp__twelvelabs-mcp__list-indexes
+"""
+
+import json
+import os
+
+# Skip the mirror entirely
+MIRROR_BYPASS = os.environ.get("TWELVELABS_LIST_MIRROR_BYPASS", "") not in ("", "0", "false")
+
+# Tool input fields the mirror understands; listings with any other option
+# (filters, sorting) are not mirrored
+LISTING_FIELDS = {"indexId", "page", "pageLimit", "page_limit"}
+
+
+def listing_request(input_data: dict) -> tuple[str | None, dict]:
+    """Get the listing kind and paging from the hook context.
+
+    Args:
+        input_data: The hook context
+
+    Returns:
+        Tuple of ("videos" | "indexes", tool_input), or (None, tool_input)
+        if the call can't be served from the mirror
+    """
+    tool_input = input_data.get("tool_input", {})
+    tool_name = input_data.get("tool_name", "")
+    kind = "indexes" if tool_name.endswith("list-indexes") else "videos"
+    if set(tool_input) - LISTING_FIELDS:
+        return None, tool_input
+    return kind, tool_input
+
+
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
+
+    Receives the hook context (read from stdin as JSON):
+    {
+        "tool_name": "mcp__twelvelabs-mcp__list-videos",
+        "tool_input": {
+            "indexId": "..." (optional),
+            "page": 1 (optional)
+        }
+    }
+
+    Returns the JSON response. When the page can be served from the mirror
+    the tool call is blocked and the page is returned to the model as the
+    reason:
+    {
+        "continue": true,
+        "decision": "block",
+        "reason": "<mirrored page>",
+        "message": "..."
+    }
+
+    Otherwise:
+    {
+        "continue": true
+    }
+    """
+    response = {"continue": True}
+    kind, tool_input = listing_request(input_data)
+    if MIRROR_BYPASS or kind is None:
+        return response
+
+    from config_helper import get_default_index_id, get_mirrored_listing
+
+    index_id = (tool_input.get("indexId") or get_default_index_id()) if kind == "videos" else None
+    try:
+        page = int(tool_input.get("page") or 1)
+        page_limit = int(tool_input.get("pageLimit") or tool_input.get("page_limit") or 0) or None
+    except (TypeError, ValueError):
+        return response
+
+    listing = get_mirrored_listing(kind, index_id, page, page_limit)
+    if listing is None:
+        return response
+
+    synced_at = listing.pop("synced_at")
+    return {
+        "continue": True,
+        "decision": "block",
+        "reason": (
+            f"Served from local mirror (page {page} of the {kind} listing, synced at {synced_at}). "
+            f"This is the listing:\n\n{json.dumps(listing, indent=2)}"
+        ),
+        "message": f"Served {kind} page {page} from the local mirror"
+    }
@@ -0,0 +1,98 @@
+"""Pre-hook for search MCP tool.
+
+This hook runs before the MCP tool and serves the results from the local
+cache (written by post-search.py) when the same search was run before, so
+re-running a query while refining how results are displayed returns
+instantly instead of making another round trip.
+
+Cache entries are keyed by index, normalized query (whitespace collapsed,
+case folded) and the remaining search options. They are dropped once a
+video is added to the index, since the results may have changed.
+
+Configuration (environment variables):
+- TWELVELABS_SEARCH_CACHE_TTL: freshness window in seconds (default 1 hour),
+  enforced by the cache itself in config_helper
+- TWELVELABS_SEARCH_CACHE_BYPASS: set to 1 to always call the API
+
+Hook type: PreToolUse
+Matcher: mcp__twelvelabs-mcp__search
+"""
+
+import json
+import os
+
+# Skip the cache entirely
+CACHE_BYPASS = os.environ.get("TWELVELABS_SEARCH_CACHE_BYPASS", "") not in ("", "0", "false")
+
+# Tool input fields that identify the request; anything else is a search option
+REQUEST_FIELDS = {"indexId", "query"}
+
+
+def format_result(result) -> str:
+    """Format cached search results for display to the model.
+
+    Args:
+        result: The cached search result
+
+    Returns:
+        The result as text
+    """
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, indent=2)
+
+
+def handle(input_data: dict) -> dict:
+    """Handle one hook invocation.
+
+    Receives the hook context (read from stdin as JSON):
+    {
+        "tool_name": "mcp__twelvelabs-mcp__search",
+        "tool_input": {
+            "query": "...",
+            "indexId": "..." (optional)
+        }
+    }
+
+    Returns the JSON response. On a cache hit the tool call is blocked and the
+    cached results are returned to the model as the reason:
+    {
+        "continue": true,
+        "decision": "block",
+        "reason": "<cached search results>",
+        "message": "..."
+    }
+
+    On a miss:
+    {
+        "continue": true
+    }
+    """
+    tool_input = input_data.get("tool_input", {})
+    query = tool_input.get("query")
+
+    response = {"continue": True}
+
+    if CACHE_BYPASS or not isinstance(query, str) or not query.strip():
+        return response
+
+    from config_helper import get_cached_search, get_default_index_id, is_error_result
+
+    index_id = tool_input.get("indexId") or get_default_index_id() or ""
+    options = {k: v for k, v in tool_input.items() if k not in REQUEST_FIELDS}
+    entry = get_cached_search(index_id, query, options)
+
+    # An error cached before errors were filtered out is never served
+    if entry and entry.get("result") is not None and not is_error_result(entry["result"]):
+        response = {
+            "continue": True,
+            "decision": "block",
+            "reason": (
+                f"Served from local cache (search for {query!r}, cached at {entry['cached_at']}; "
+                f"no videos have been added to the index since). These are the search results:\n\n"
+                f"{format_result(entry['result'])}"
+            ),
+            "message": f"Served cached search results for {query!r}"
+        }
+
+    return response
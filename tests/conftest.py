@@ -0,0 +1,37 @@
+"""Shared fixtures: plugin modules on sys.path and a throwaway state per test."""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+
+# config_helper and metrics read these at import time
+os.environ.setdefault("TWELVELABS_STATE_DIR", tempfile.mkdtemp(prefix="twelvelabs-tests-"))
+os.environ["TWELVELABS_METRICS"] = "0"
+sys.path.insert(0, str(PLUGIN_ROOT / ".twelvelabs"))
+sys.path.insert(0, str(PLUGIN_ROOT / "hooks"))
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Point config_helper at an empty state directory for the test."""
+    import config_helper
+
+    state = tmp_path / "state"
+    state.mkdir()
+    monkeypatch.setattr(config_helper, "CONFIG_DIR", state)
+    monkeypatch.setattr(config_helper, "CONFIG_FILE", state / "config.json")
+    monkeypatch.setattr(config_helper, "BLOB_DIR", state / "cache", raising=False)
+    monkeypatch.setattr(config_helper, "SEGMENT_INDEX_PATH", state / "segments.db", raising=False)
+    for name in ("_backend", "_shards", "_blob_store", "_segment_index"):
+        monkeypatch.setattr(config_helper, name, None, raising=False)
+    monkeypatch.setattr(config_helper, "_known_shards", set(), raising=False)
+    yield state
+    for name in ("_backend", "_shards"):
+        opened = getattr(config_helper, name)
+        if opened is not None:
+            opened.close()
@@ -0,0 +1,57 @@
+import pytest
+
+import config_helper
+import dispatch
+from config_helper import analysis_cache_key
+
+
+def test_prompt_whitespace_and_case_are_normalized():
+    key = analysis_cache_key("open_ended", "What are the main topics?")
+    assert analysis_cache_key("open_ended", "  what ARE the\tmain\n topics?  ") == key
+    assert analysis_cache_key("open_ended", "What are the main topics") != key
+
+
+def test_parameter_order_does_not_matter():
+    params = {"model": "pegasus1.2", "temperature": 0.2, "options": {"a": 1, "b": 2}}
+    reordered = {"options": {"b": 2, "a": 1}, "temperature": 0.2, "model": "pegasus1.2"}
+    assert analysis_cache_key("summary", "Sum up", params) == analysis_cache_key("summary", "Sum up", reordered)
+
+
+@pytest.mark.parametrize("change", [
+    {"model": "pegasus1.1"},
+    {"temperature": 0.7},
+    {"max_tokens": 100},
+])
+def test_model_changes_miss(change):
+    params = {"model": "pegasus1.2", "temperature": 0.2}
+    assert analysis_cache_key("summary", "Sum up", params) != analysis_cache_key("summary", "Sum up", {**params, **change})
+
+
+def test_type_alone_without_prompt_or_params():
+    assert analysis_cache_key("summary") == "summary"
+    assert analysis_cache_key("summary", "", {}) == "summary"
+    assert analysis_cache_key("summary", "x") != analysis_cache_key("chapter", "x")
+    assert analysis_cache_key("summary", None, {"model": "pegasus1.2"}).startswith("summary:")
+
+
+def test_pre_analyze_serves_a_cached_analysis():
+    pre, post = dispatch.load_hook("pre-analyze"), dispatch.load_hook("post-analyze")
+    tool_input = {"videoId": "v1", "type": "open_ended", "prompt": "What are the main topics?"}
+    assert pre.handle({"tool_input": tool_input}) == {"continue": True}
+
+    post.handle({"tool_input": tool_input, "tool_result": {"data": "Cooking and gardening."}})
+    served = pre.handle({"tool_input": dict(tool_input, prompt="what are the MAIN topics?")})
+    assert served["decision"] == "block"
+    assert served["reason"].endswith("Cooking and gardening.")
+    assert config_helper.get_analysis_cache_stats()["hits"] == 1
+
+    assert pre.handle({"tool_input": dict(tool_input, prompt="Who is speaking?")}) == {"continue": True}
+    assert pre.handle({"tool_input": dict(tool_input, videoId="v2")}) == {"continue": True}
+
+
+def test_pre_analyze_does_not_serve_errors():
+    pre, post = dispatch.load_hook("pre-analyze"), dispatch.load_hook("post-analyze")
+    tool_input = {"videoId": "v1", "type": "summary"}
+    post.handle({"tool_input": tool_input, "tool_result": {"isError": True, "content": [
+        {"type": "text", "text": "Error: video not ready"}]}})
+    assert pre.handle({"tool_input": tool_input}) == {"continue": True}
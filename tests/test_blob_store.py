@@ -0,0 +1,96 @@
+import gzip
+import os
+import time
+
+import pytest
+
+import config_helper
+from blob_store import GC_GRACE_SECONDS, BlobStore, decompress
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_garbage_collection_spares_recent_and_referenced_blobs(tmp_path):
+    store = BlobStore(tmp_path)
+    old = store.put(b"old")["sha256"]
+    used = store.put(b"used")["sha256"]
+    fresh = store.put(b"fresh")["sha256"]
+    for digest in (old, used):
+        age(store.path(digest), GC_GRACE_SECONDS * 2)
+
+    assert store.collect_garbage([used]) == 1
+    assert not store.path(old).exists()
+    assert store.path(used).exists()
+    # Not referenced yet, but its writer may be about to commit the pointer
+    assert store.path(fresh).exists()
+
+
+def test_reusing_a_blob_protects_it(tmp_path):
+    store = BlobStore(tmp_path)
+    digest = store.put(b"payload")["sha256"]
+    age(store.path(digest), GC_GRACE_SECONDS * 2)
+    store.put(b"payload")
+    assert store.collect_garbage([]) == 0
+
+
+def test_compact_keeps_blobs_written_while_it_runs(monkeypatch):
+    monkeypatch.setattr(config_helper, "BLOB_THRESHOLD", 16)
+    result = {"summary": "x" * 100}
+    assert config_helper.cache_analysis("v1", "summary", result)
+    store = config_helper._get_blob_store()
+    cached = next(store.root.iterdir())
+    age(cached, GC_GRACE_SECONDS * 2)
+    pending = store.put(b"stored by a writer that hasn't committed yet")["sha256"]
+
+    assert config_helper.compact()["blobs_removed"] == 0
+    assert store.path(pending).exists()
+    assert config_helper.get_cached_analysis("v1", "summary")["result"] == result
+
+
+def test_corrupt_blob_is_a_miss_and_dropped(monkeypatch):
+    monkeypatch.setattr(config_helper, "BLOB_THRESHOLD", 16)
+    assert config_helper.cache_analysis("v1", "summary", {"summary": "x" * 100})
+    store = config_helper._get_blob_store()
+    path = next(store.root.iterdir())
+    data = path.read_bytes()
+    path.write_bytes(data[:4] + b"\0" * (len(data) - 4))
+
+    assert config_helper.get_cached_analysis("v1", "summary") is None
+    assert config_helper.get_analysis_cache_stats()["entries"] == 0
+
+
+def test_corrupt_gzip_blob_raises_value_error():
+    with pytest.raises(ValueError):
+        decompress(gzip.compress(b"payload")[:-6])
+
+
+def test_evicted_entries_take_their_blobs_along(monkeypatch):
+    monkeypatch.setattr(config_helper, "BLOB_THRESHOLD", 16)
+    monkeypatch.setattr(config_helper, "ANALYSIS_CACHE_MAX_ENTRIES", 2)
+    store = config_helper._get_blob_store()
+    for video_id in ("v1", "v2"):
+        assert config_helper.cache_analysis(video_id, "summary", {"summary": video_id * 100})
+    for path in store.root.iterdir():
+        age(path, GC_GRACE_SECONDS * 2)
+
+    # The third entry puts the cache over budget and evicts the oldest
+    assert config_helper.cache_analysis("v3", "summary", {"summary": "v3" * 100})
+    assert config_helper.get_analysis_cache_stats()["entries"] == 1
+    assert len(list(store.root.iterdir())) == 1
+
+
+def test_shared_blob_outlives_one_of_its_entries(monkeypatch):
+    monkeypatch.setattr(config_helper, "BLOB_THRESHOLD", 16)
+    result = {"summary": "same" * 100}
+    assert config_helper.cache_analysis("v1", "summary", result)
+    assert config_helper.cache_analysis("v2", "summary", result)
+    for path in config_helper._get_blob_store().root.iterdir():
+        age(path, GC_GRACE_SECONDS * 2)
+
+    assert config_helper.clear_analysis_cache("v1")
+    assert config_helper.get_cached_analysis("v2", "summary")["result"] == result
+    assert config_helper.clear_analysis_cache()
+    assert list(config_helper._get_blob_store().root.iterdir()) == []
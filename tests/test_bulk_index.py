@@ -0,0 +1,129 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+import bulk_index
+import config_helper
+from api_client import FakeClient
+from bulk_index import MAX_ATTEMPTS, collect_sources, index_sources
+
+INDEX_ID = "index-1"
+
+
+def run(sources, client, **options):
+    options.setdefault("rate", 1000)
+    options.setdefault("burst", 100)
+    return asyncio.run(asyncio.wait_for(index_sources(sources, client, INDEX_ID, **options), timeout=30))
+
+
+def pending_sources():
+    return sorted(task["source"] for task in config_helper.get_all_pending_tasks().values())
+
+
+def fingerprint_cache_size():
+    with config_helper.get_backend().read() as txn:
+        return len(list(txn.rows("fingerprint_cache")))
+
+
+@pytest.fixture
+def videos(tmp_path):
+    directory = tmp_path / "videos"
+    directory.mkdir()
+    for name in ("a.mp4", "b.mov"):
+        (directory / name).write_bytes(os.urandom(4096))
+    (directory / "copy-of-a.mp4").write_bytes((directory / "a.mp4").read_bytes())
+    (directory / "notes.txt").write_text("not a video")
+    return directory
+
+
+def test_indexes_new_videos_once(videos):
+    client = FakeClient()
+    summary = run(collect_sources(str(videos)), client)
+    assert summary["submitted"] == 2
+    assert summary["duplicate"] == 1
+    assert summary["not_video"] == 1
+    assert summary["failed"] == 0
+    assert pending_sources() == [str(videos / "a.mp4"), str(videos / "b.mov")]
+    assert all(task["index_id"] == INDEX_ID for task in config_helper.get_all_pending_tasks().values())
+
+    # A second run finds every video already pending
+    requests = client.requests
+    summary = run(collect_sources(str(videos)), client)
+    assert summary["submitted"] == 0
+    assert summary["duplicate"] == 3
+    assert client.requests == requests
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json", "journal"])
+def test_plans_off_the_event_loop(videos, monkeypatch, backend):
+    monkeypatch.setattr(config_helper, "STATE_BACKEND", backend)
+    planned_on = set()
+    plan_source = bulk_index.plan_source
+
+    def record_thread(*args, **kwargs):
+        planned_on.add(threading.get_ident())
+        return plan_source(*args, **kwargs)
+
+    monkeypatch.setattr(bulk_index, "plan_source", record_thread)
+    summary = run(collect_sources(str(videos)), FakeClient())
+    assert threading.get_ident() not in planned_on
+    assert (summary["submitted"], summary["duplicate"]) == (2, 1)
+    assert pending_sources() == [str(videos / "a.mp4"), str(videos / "b.mov")]
+
+
+def test_manifest_sources(tmp_path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text("# comment\n\nclip.mp4\nhttps://example.com/v.mp4\n")
+    assert collect_sources(str(manifest)) == [str(tmp_path / "clip.mp4"), "https://example.com/v.mp4"]
+
+
+def test_missing_source(tmp_path):
+    summary = run([str(tmp_path / "gone.mp4")], FakeClient())
+    assert summary["missing"] == 1
+    assert summary["submitted"] == 0
+
+
+def test_retries_then_reports_failure(videos, monkeypatch):
+    monkeypatch.setattr(bulk_index, "RETRY_DELAY", 0)
+    client = FakeClient(failure_rate=1.0)
+    summary = run([str(videos / "a.mp4")], client)
+    assert summary["failed"] == 1
+    assert summary["failures"][0]["source"] == str(videos / "a.mp4")
+    assert client.requests == MAX_ATTEMPTS
+    assert pending_sources() == []
+
+
+def test_unrecorded_task_is_a_failure(videos, monkeypatch):
+    monkeypatch.setattr(bulk_index, "add_pending_task", lambda *args, **kwargs: False)
+    summary = run([str(videos / "a.mp4")], FakeClient())
+    assert summary["submitted"] == 0
+    assert summary["failed"] == 1
+    assert "couldn't be recorded" in summary["failures"][0]["error"]
+
+
+def test_unexpected_error_fails_only_that_source(videos):
+    class BrokenClient(FakeClient):
+        def create_task(self, index_id, source):
+            if source.endswith("a.mp4"):
+                raise KeyError("task_id")
+            return super().create_task(index_id, source)
+
+    sources = [str(videos / name) for name in ("a.mp4", "b.mov")]
+    summary = run(sources, BrokenClient(), concurrency=1)
+    assert summary["submitted"] == 1
+    assert summary["failed"] == 1
+    assert summary["failures"] == [{"source": sources[0], "error": "'task_id'"}]
+    assert pending_sources() == [sources[1]]
+
+
+def test_dry_run_leaves_state_untouched(videos):
+    run([str(videos / "a.mp4")], FakeClient())
+    cached = fingerprint_cache_size()
+
+    summary = run(collect_sources(str(videos)), None, dry_run=True)
+    assert summary["submitted"] == 1
+    assert summary["duplicate"] == 2
+    assert pending_sources() == [str(videos / "a.mp4")]
+    assert fingerprint_cache_size() == cached
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+import dispatch
+
+TASKS = [{"_id": "t1", "status": "ready", "video_id": "v1"}, {"_id": "t2", "status": "pending"}]
+
+
+def task_ids(tool_result):
+    hook = dispatch.load_hook("post-check-status")
+    return [task["task_id"] for task in hook.iter_tasks(json.dumps({"tool_result": tool_result}))]
+
+
+@pytest.mark.parametrize("tool_result", [
+    {"status": "ok", "data": TASKS},
+    {"status": "ok", "data": TASKS, "page_info": {"page": 1}},
+    TASKS,
+    json.dumps({"status": "ok", "data": TASKS}),
+    json.dumps(TASKS),
+])
+def test_only_list_elements_are_tasks(tool_result):
+    assert task_ids(tool_result) == ["t1", "t2"]
+
+
+def test_single_task_shapes():
+    assert task_ids(TASKS[0]) == ["t1"]
+    assert task_ids({"status": "ok", "data": TASKS[0]}) == ["t1"]
+    assert task_ids({"status": "ok", "data": []}) == []
@@ -0,0 +1,47 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import dispatch
+
+
+@pytest.fixture
+def hook_socket(tmp_path, monkeypatch):
+    path = str(tmp_path / "hookd.sock")
+    monkeypatch.setenv("TWELVELABS_HOOKD_SOCKET", path)
+    return path
+
+
+def test_unreachable_server_runs_hook_locally(hook_socket):
+    # A socket file nobody listens on: connect fails with ECONNREFUSED
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(hook_socket)
+    sock.close()
+    assert dispatch.forward("pre-list", b"{}") is None
+
+
+def test_slow_server_is_not_retried_locally(hook_socket, monkeypatch):
+    monkeypatch.setattr(dispatch, "RESPONSE_TIMEOUT", 0.2)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(hook_socket)
+    server.listen()
+
+    def accept_and_stall():
+        conn, _ = server.accept()
+        time.sleep(1)
+        conn.close()
+
+    thread = threading.Thread(target=accept_and_stall)
+    thread.start()
+    try:
+        response = dispatch.forward("post-index-video", b"{}")
+    finally:
+        thread.join()
+        server.close()
+    assert response is not None
+    response = json.loads(response)
+    assert response["continue"] is True
+    assert "did not answer" in response["message"]
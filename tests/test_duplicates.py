@@ -0,0 +1,43 @@
+import os
+import shutil
+
+import pytest
+
+import config_helper
+import dispatch
+import fingerprint
+
+
+@pytest.fixture
+def copies(tmp_path, monkeypatch):
+    """An indexed video and a renamed copy, both large enough to be sampled."""
+    monkeypatch.setattr(fingerprint, "SAMPLE_SIZE", 64)
+    monkeypatch.setattr(fingerprint, "FULL_HASH_LIMIT", 64 * fingerprint.SAMPLE_COUNT)
+    original = tmp_path / "original.mp4"
+    original.write_bytes(os.urandom(4096))
+    copy = tmp_path / "copy.mp4"
+    shutil.copy(original, copy)
+
+    sampled = config_helper.get_file_fingerprint(str(original))
+    assert sampled.startswith("sample:")
+    config_helper.add_pending_task("t1", str(original), fingerprint=sampled, index_id="i1")
+    config_helper.complete_task("t1", "v1")
+    return str(original), str(copy)
+
+
+def test_match_is_confirmed_by_full_hash(copies):
+    found = config_helper.lookup_file_content(copies[1], "i1")
+    assert found["video"]["video_id"] == "v1"
+    assert found["confirmed"]
+
+
+def test_large_file_is_not_hashed_in_full(copies, monkeypatch):
+    def refuse(path):
+        raise AssertionError(f"hashed {path} in full")
+
+    monkeypatch.setattr(fingerprint, "full_fingerprint", refuse)
+    hook = dispatch.load_hook("pre-index-video")
+    monkeypatch.setattr(hook, "FULL_HASH_MAX_BYTES", 1024)
+    message, confirmed = hook.check_content_duplicate(copies[1], "i1")
+    assert not confirmed
+    assert "may have the same content as already indexed video v1" in message
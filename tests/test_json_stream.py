@@ -0,0 +1,70 @@
+import io
+import json
+
+import pytest
+
+import json_stream
+from json_stream import iter_values
+
+DOCUMENT = {
+    "tool_input": {"query": "say \"hi\" \\ é中 🎬"},
+    "tool_result": {
+        "data": [
+            {"_id": "t1", "tags": [["a", "b"], [], [["c"]]], "note": "[not] {an} \"array\""},
+            {"_id": "t2", "tags": [], "note": "line\nbreak\ttab \\\" ]}"},
+            [1, [2, [3, {"deep": [4.5e3, -0.25, None, True]}]]],
+        ],
+        "page_info": {"total": 1234567890123, "next": None},
+    },
+}
+
+
+def values(source, targets, collect=()):
+    return list(iter_values(source, targets, collect))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_chunk_boundaries_anywhere(monkeypatch, chunk_size):
+    monkeypatch.setattr(json_stream, "CHUNK_SIZE", chunk_size)
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+    targets = ["tool_input", "tool_result.data.item", "tool_result.page_info.total"]
+    streamed = values(io.StringIO(text), targets)
+    assert streamed == values(text, targets)
+    assert [value for _, value in streamed] == [
+        DOCUMENT["tool_input"], *DOCUMENT["tool_result"]["data"], 1234567890123,
+    ]
+
+
+def test_nested_arrays():
+    text = json.dumps(DOCUMENT)
+    assert values(text, ["tool_result.data.item.tags.item"]) == [
+        ("tool_result.data.item.tags.item", ["a", "b"]),
+        ("tool_result.data.item.tags.item", []),
+        ("tool_result.data.item.tags.item", [["c"]]),
+    ]
+    # Arrays nested in arrays are walked element by element
+    assert values(text, ["tool_result.data.item.item.item"]) == [
+        ("tool_result.data.item.item.item", 2),
+        ("tool_result.data.item.item.item", [3, {"deep": [4500.0, -0.25, None, True]}]),
+    ]
+
+
+def test_escaped_strings_do_not_end_values():
+    text = json.dumps(DOCUMENT)
+    assert values(text, ["tool_result.data.item.note"]) == [
+        ("tool_result.data.item.note", "[not] {an} \"array\""),
+        ("tool_result.data.item.note", "line\nbreak\ttab \\\" ]}"),
+    ]
+    assert values(text, ["tool_input.query"])[0][1] == DOCUMENT["tool_input"]["query"]
+
+
+def test_collect_keeps_members_off_the_target_paths():
+    text = json.dumps(DOCUMENT)
+    collected = values(text, ["tool_result.data.item"], collect=["tool_result"])
+    assert collected[-1] == ("tool_result", {"page_info": DOCUMENT["tool_result"]["page_info"]})
+
+
+@pytest.mark.parametrize("text", ['{"a": [1, 2', '{"a": "open', '{"a": 1,'])
+def test_truncated_input_is_value_error(text):
+    with pytest.raises(ValueError):
+        values(text, ["a.item", "b"])
@@ -0,0 +1,29 @@
+from config_helper import get_list_mirror_state, mirror_listing_page
+
+
+def videos(start, stop):
+    return [{"_id": f"v{i}"} for i in range(start, stop)]
+
+
+def page_info(page, limit, total=100):
+    return {"page": page, "limit_per_page": limit, "total_page": -(-total // limit), "total_results": total}
+
+
+def test_pages_of_one_size_complete_the_listing():
+    mirror_listing_page("videos", "i1", 1, videos(0, 50), page_info(1, 50))
+    assert not get_list_mirror_state("videos", "i1")["complete"]
+    mirror_listing_page("videos", "i1", 2, videos(50, 100), page_info(2, 50))
+    assert get_list_mirror_state("videos", "i1")["complete"]
+
+
+def test_page_size_change_restarts_the_sync():
+    mirror_listing_page("videos", "i1", 1, videos(0, 10), page_info(1, 10))
+    mirror_listing_page("videos", "i1", 2, videos(50, 100), page_info(2, 50))
+    state = get_list_mirror_state("videos", "i1")
+    assert not state["complete"]
+    assert state["pages"] == [2]
+    assert state["limit_per_page"] == 50
+
+    mirror_listing_page("videos", "i1", 1, videos(0, 50), page_info(1, 50))
+    mirror_listing_page("videos", "i1", 2, videos(50, 100), page_info(2, 50))
+    assert get_list_mirror_state("videos", "i1")["complete"]
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    path = str(tmp_path / "metrics.jsonl")
+    monkeypatch.setattr(metrics, "METRICS_FILE", path)
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "MAX_BYTES", 200)
+    monkeypatch.setattr(metrics, "BACKUPS", 2)
+    return path
+
+
+def record(n: int) -> str:
+    return json.dumps({"ts": 1000 + n, "hook": "pre-search", "hook_ms": n, "pad": "x" * 40}) + "\n"
+
+
+def test_log_rotates_and_keeps_backups(log):
+    for n in range(12):
+        metrics.append(record(n), log)
+    assert os.path.getsize(log) <= metrics.MAX_BYTES
+    assert os.path.exists(log + ".1") and os.path.exists(log + ".2")
+    assert not os.path.exists(log + ".3")
+
+    # Oldest first, with the records of the dropped backup gone
+    seen = [r["hook_ms"] for r in metrics.iter_records(log)]
+    assert seen == sorted(seen)
+    assert seen[-1] == 11
+    assert 0 not in seen
+
+
+def test_records_are_summarized_per_hook(log):
+    for n in range(1, 5):
+        metrics.begin("pre-analyze")
+        metrics.add("config_reads", 1)
+        metrics.note("cache_analysis", "hit" if n % 2 else "miss")
+        metrics.end(hook_ms=float(n))
+    with open(log, "a") as f:
+        f.write("{torn line\n")
+
+    summary = metrics.summarize(metrics.iter_records(log))
+    assert summary["records"] == 4
+    hook = summary["hooks"]["pre-analyze"]
+    assert hook["count"] == 4
+    assert hook["hook_ms"] == {"p50": 2.0, "p95": 4.0, "p99": 4.0, "max": 4.0}
+    assert summary["caches"]["analysis"] == {"hits": 2, "misses": 2, "hit_rate": 0.5}
+
+
+def test_nothing_is_recorded_when_disabled(log, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics.begin("pre-analyze")
+    metrics.end(hook_ms=1.0)
+    assert not os.path.exists(log)
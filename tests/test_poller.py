@@ -0,0 +1,74 @@
+import pytest
+
+import config_helper
+import poller
+from poller import BASE_INTERVALS, due_tasks, next_schedule, poll_once
+
+
+class StatusClient:
+    """Reports whatever status the test sets for each task."""
+
+    def __init__(self, statuses: dict):
+        self.statuses = statuses
+        self.polled = []
+
+    def get_tasks(self, task_ids):
+        self.polled.append(list(task_ids))
+        return [{"task_id": task_id, **self.statuses[task_id]} for task_id in task_ids]
+
+
+@pytest.fixture(autouse=True)
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(poller, "JITTER", 0)
+
+
+def test_interval_doubles_while_status_is_unchanged(monkeypatch):
+    monkeypatch.setattr(poller, "MAX_INTERVAL", 100)
+    poll = next_schedule(None, None, "indexing", 0)
+    intervals = [poll["interval"]]
+    for _ in range(4):
+        poll = next_schedule(poll, "indexing", "indexing", 0)
+        intervals.append(poll["interval"])
+    assert intervals == [30, 60, 100, 100, 100]
+    assert poll["count"] == 5
+
+    # A status change starts over from the new status's base interval
+    poll = next_schedule(poll, "indexing", "queued", 1000)
+    assert (poll["interval"], poll["next_at"]) == (BASE_INTERVALS["queued"], 1000 + BASE_INTERVALS["queued"])
+
+
+def test_tasks_coming_due_soon_are_coalesced():
+    pending = {
+        "due": {"poll": {"interval": 60, "next_at": 100}},
+        "soon": {"poll": {"interval": 60, "next_at": 110}},
+        "later": {"poll": {"interval": 60, "next_at": 200}},
+        "new": {},
+    }
+    assert sorted(due_tasks(pending, 100)) == ["due", "new", "soon"]
+    assert due_tasks({"soon": pending["soon"], "later": pending["later"]}, 100) == []
+
+
+def test_poll_once_backs_off_and_completes(monkeypatch):
+    config_helper.add_pending_task("t1", "/videos/a.mp4", index_id="i1")
+    client = StatusClient({"t1": {"status": "indexing"}})
+    clock = [1000.0]
+    monkeypatch.setattr(poller.time, "time", lambda: clock[0])
+
+    summary = poll_once(client)
+    assert (summary["polled"], summary["pending"]) == (1, 1)
+    assert config_helper.get_pending_task("t1")["poll"]["interval"] == BASE_INTERVALS["indexing"]
+    assert summary["next_poll_in"] == BASE_INTERVALS["indexing"]
+
+    # Not due yet: nothing is sent
+    assert poll_once(client)["polled"] == 0
+    assert len(client.polled) == 1
+
+    clock[0] += BASE_INTERVALS["indexing"]
+    poll_once(client)
+    assert config_helper.get_pending_task("t1")["poll"]["interval"] == 2 * BASE_INTERVALS["indexing"]
+
+    clock[0] += 2 * BASE_INTERVALS["indexing"]
+    client.statuses["t1"] = {"status": "ready", "video_id": "v1"}
+    summary = poll_once(client)
+    assert (summary["completed"], summary["pending"], summary["next_poll_in"]) == (1, 0, None)
+    assert config_helper.get_video("v1")["index_id"] == "i1"
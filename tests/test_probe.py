@@ -0,0 +1,46 @@
+import struct
+
+import pytest
+
+import config_helper
+import probe
+from probe import (
+    MKV_CLUSTER, MKV_DURATION, MKV_INFO, MKV_SEEK, MKV_SEEK_HEAD, MKV_SEEK_ID, MKV_SEEK_POSITION, MKV_SEGMENT,
+    ProbeError, ProbeLimitError, probe_file,
+)
+
+
+def element(element_id: int, data: bytes) -> bytes:
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + b"\x01" + len(data).to_bytes(7, "big") + data
+
+
+def matroska(tmp_path, segment: bytes):
+    path = tmp_path / "video.mkv"
+    path.write_bytes(element(0x1A45DFA3, element(0x4282, b"matroska")) + element(MKV_SEGMENT, segment))
+    return str(path)
+
+
+def test_matroska_duration(tmp_path):
+    info = element(MKV_INFO, element(MKV_DURATION, struct.pack(">d", 12000.0)))
+    assert probe_file(matroska(tmp_path, info))["duration"] == 12.0
+
+
+def test_seek_past_segment_end_is_probe_error(tmp_path):
+    seek = element(MKV_SEEK_ID, MKV_INFO.to_bytes(4, "big")) + element(MKV_SEEK_POSITION, (10 ** 6).to_bytes(4, "big"))
+    segment = element(MKV_SEEK_HEAD, element(MKV_SEEK, seek)) + element(MKV_CLUSTER, bytes(16))
+    with pytest.raises(ProbeError, match="SeekHead"):
+        probe_file(matroska(tmp_path, segment))
+
+
+def test_empty_duration_is_probe_error(tmp_path):
+    with pytest.raises(ProbeError, match="Duration"):
+        probe_file(matroska(tmp_path, element(MKV_INFO, element(MKV_DURATION, b""))))
+
+
+def test_header_budget_is_not_a_probe_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(probe, "MAX_HEADER_BYTES", 16)
+    path = matroska(tmp_path, element(MKV_INFO, element(MKV_DURATION, struct.pack(">d", 12000.0))))
+    with pytest.raises(ProbeLimitError):
+        probe_file(path)
+    assert not issubclass(ProbeLimitError, ProbeError)
+    assert "unprobed" in config_helper.probe_video_file(path)
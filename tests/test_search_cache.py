@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+
+import config_helper
+import dispatch
+
+RESULT = {"data": [{"video_id": "v1", "start": 1.0, "end": 4.0}]}
+
+
+@contextmanager
+def no_writes(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("the lookup took the write lock")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(config_helper, "config_transaction", refuse)
+        yield
+
+
+def test_miss_takes_no_write_lock(monkeypatch):
+    config_helper.cache_search("i1", "cooking", None, RESULT)
+    with no_writes(monkeypatch):
+        assert config_helper.get_cached_search("i1", "baking") is None
+        assert config_helper.get_cached_search("i2", "cooking") is None
+    assert config_helper.get_search_cache_stats()["misses"] == 1
+
+
+def test_hit_and_stale_entry_are_written():
+    config_helper.cache_search("i1", "cooking", None, RESULT)
+    entry = config_helper.get_cached_search("i1", "  Cooking ")
+    assert entry["result"] == RESULT
+    assert entry["hits"] == 1
+    assert config_helper.get_search_cache_stats()["hits"] == 1
+
+    # A video added to the index drops the entry
+    config_helper.add_pending_task("t1", "/videos/a.mp4", index_id="i1")
+    config_helper.complete_task("t1", "v2")
+    assert config_helper.get_cached_search("i1", "cooking") is None
+    assert config_helper.get_search_cache_stats()["entries"] == 0
+
+
+def test_cached_search_keeps_page_info():
+    payload = {
+        "data": [{"video_id": "v1", "start": 1.0, "end": 4.0, "rank": 1}],
+        "page_info": {"limit_per_page": 10, "total_results": 25, "next_page_token": "token-2"},
+    }
+    tool_input = {"indexId": "i1", "query": "cooking"}
+    posted = dispatch.load_hook("post-search").handle({"tool_input": tool_input, "tool_result": payload})
+    assert posted["message"].startswith("Cached")
+
+    served = dispatch.load_hook("pre-search").handle({"tool_input": tool_input})
+    assert served["decision"] == "block"
+    assert '"next_page_token": "token-2"' in served["reason"]
+    assert config_helper.search_segments("cooking")[0]["video_id"] == "v1"
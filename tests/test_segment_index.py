@@ -0,0 +1,61 @@
+import config_helper
+from segment_index import SegmentIndex, extract_segments
+
+CHAPTERS = {
+    "summary": "A cooking show about bread.",
+    "chapters": [
+        {"start": "00:10", "end": "01:30", "chapter_title": "Kneading the dough"},
+        {"start": 90, "end": 200, "chapter_title": "Baking in a wood oven", "video_url": "https://example.com/x"},
+    ],
+}
+
+
+def test_extract_segments():
+    segments = extract_segments(CHAPTERS, "v1")
+    assert segments == [
+        {"video_id": "v1", "start": 10.0, "end": 90.0, "text": "Kneading the dough"},
+        {"video_id": "v1", "start": 90.0, "end": 200.0, "text": "Baking in a wood oven"},
+        {"video_id": "v1", "start": None, "end": None, "text": "A cooking show about bread."},
+    ]
+    # Search clips name their own video
+    clips = extract_segments('{"data": [{"video_id": "v2", "start": 1, "end": 2, "text": "oven"}]}')
+    assert [(s["video_id"], s["text"]) for s in clips] == [("v2", "oven")]
+
+
+def test_query_ranks_and_filters(tmp_path):
+    index = SegmentIndex(tmp_path / "segments.db")
+    index.replace("analysis:v1:chapter", "chapter", extract_segments(CHAPTERS, "v1"))
+    index.replace("analysis:v2:summary", "summary", [
+        {"video_id": "v2", "start": None, "end": None, "text": "A wood oven and a stone oven compared."}])
+
+    matches = index.query("wood oven")
+    assert [(m["video_id"], m["start"]) for m in matches] == [("v2", None), ("v1", 90.0)]
+    assert "[wood]" in matches[1]["snippet"]
+    assert [m["video_id"] for m in index.query("oven", video_id="v1")] == ["v1"]
+    assert index.query("!!!") == []
+
+    # Re-indexing a source replaces its segments
+    index.replace("analysis:v1:chapter", "chapter", [])
+    assert [m["video_id"] for m in index.query("oven")] == ["v2"]
+
+
+def test_remove_by_prefix_spares_longer_ids(tmp_path):
+    index = SegmentIndex(tmp_path / "segments.db")
+    for video_id in ("v1", "v10"):
+        index.replace(f"analysis:{video_id}:summary", "summary",
+                      [{"video_id": video_id, "start": None, "end": None, "text": "bread"}])
+    assert index.remove("analysis:v1:") == 1
+    assert [m["video_id"] for m in index.query("bread")] == ["v10"]
+    assert index.stats() == {"segments": 1, "sources": 1, "videos": 1}
+
+
+def test_cached_analyses_are_searchable():
+    config_helper.add_pending_task("t1", "/videos/bread.mp4", index_id="i1")
+    config_helper.complete_task("t1", "v1", filename="bread.mp4")
+    config_helper.cache_analysis("v1", "chapter", CHAPTERS)
+
+    match = config_helper.search_segments("kneading")[0]
+    assert (match["video_id"], match["filename"], match["start"], match["label"]) == ("v1", "bread.mp4", 10.0, "chapter")
+
+    config_helper.clear_analysis_cache("v1")
+    assert config_helper.search_segments("kneading") == []
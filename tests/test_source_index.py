@@ -0,0 +1,41 @@
+import os
+
+import config_helper
+from config_helper import add_pending_task, complete_task, lookup_source
+
+
+def test_path_forms_find_the_same_task(tmp_path, monkeypatch):
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"video")
+    link = tmp_path / "link.mp4"
+    os.symlink(video, link)
+    add_pending_task("t1", str(video), index_id="i1")
+
+    monkeypatch.chdir(tmp_path)
+    for source in (str(video), "a.mp4", "./a.mp4", str(link)):
+        found = lookup_source(source)
+        assert found["pending_task"]["task_id"] == "t1", source
+        assert found["video"] is None
+
+
+def test_url_variants_find_the_indexed_video():
+    add_pending_task("t1", "https://Example.com/v.mp4?utm_source=x&b=2&a=1", index_id="i1")
+    complete_task("t1", "v1")
+    found = lookup_source("https://example.com:443/v.mp4?a=1&b=2#t=10")
+    assert found["video"]["video_id"] == "v1"
+    assert found["pending_task"] is None
+
+
+def test_lookup_is_limited_to_the_index():
+    add_pending_task("t1", "https://example.com/v.mp4", index_id="i1")
+    assert lookup_source("https://example.com/v.mp4", "i1")["pending_task"]["task_id"] == "t1"
+    assert lookup_source("https://example.com/v.mp4", "i2")["pending_task"] is None
+    assert lookup_source("https://example.com/other.mp4", "i1") == {"video": None, "pending_task": None}
+
+
+def test_stale_index_is_rebuilt():
+    add_pending_task("t1", "https://example.com/v.mp4", index_id="i1")
+    with config_helper.shard_transaction("i1") as txn:
+        txn.clear("source_index")
+        txn.set_meta("source_index_version", 0)
+    assert lookup_source("https://example.com/v.mp4", "i1")["pending_task"]["task_id"] == "t1"
@@ -0,0 +1,120 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import config_helper
+from storage import JournalBackend, JsonBackend, SQLiteBackend, open_backend
+
+PLUGIN_DIR = Path(config_helper.__file__).parent
+BACKENDS = ("sqlite", "json", "journal")
+DEFAULT = {"videos": {}, "pending_tasks": {}}
+
+
+@pytest.fixture(params=BACKENDS)
+def backend_name(request, monkeypatch):
+    monkeypatch.setattr(config_helper, "STATE_BACKEND", request.param)
+    return request.param
+
+
+def test_replace_keeps_meta(backend_name, tmp_path):
+    backend = open_backend(backend_name, tmp_path, DEFAULT)
+    with backend.transaction() as txn:
+        txn.set_meta("index_version", 3)
+        txn.set_meta("default_index_id", "old")
+        txn.put("videos", "v1", {"video_id": "v1"})
+
+    backend.replace({"videos": {"v2": {"video_id": "v2"}}, "pending_tasks": {}, "default_index_id": "new"})
+    with backend.read() as txn:
+        assert txn.get_meta("index_version") == 3
+        assert txn.get_meta("default_index_id") == "new"
+        assert txn.get("videos", "v1") is None
+        assert txn.get("videos", "v2") == {"video_id": "v2"}
+    backend.close()
+
+
+def test_write_config_never_lowers_index_version(backend_name):
+    config_helper.add_pending_task("t1", "/videos/a.mp4", index_id="i1")
+    config_helper.complete_task("t1", "v1")
+    before = config_helper._index_version("i1")[0]
+    assert before >= 1
+
+    assert config_helper.write_config(config_helper.read_config())
+    assert config_helper._index_version("i1")[0] > before
+    assert config_helper.get_video("v1")["index_id"] == "i1"
+
+
+def test_journal_compaction_keeps_index_version(tmp_path):
+    backend = open_backend("journal", tmp_path, DEFAULT)
+    for _ in range(3):
+        with backend.transaction() as txn:
+            txn.set_meta("index_version", txn.get_meta("index_version", 0) + 1)
+    backend.compact()
+    backend.close()
+
+    reopened = open_backend("journal", tmp_path, DEFAULT)
+    with reopened.read() as txn:
+        assert txn.get_meta("index_version") == 3
+    reopened.replace({"videos": {}, "pending_tasks": {}})
+    reopened.compact()
+    with reopened.read() as txn:
+        assert txn.get_meta("index_version") == 3
+    reopened.close()
+
+
+WRITER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from config_helper import config_transaction
+
+writer, writes = sys.argv[2], int(sys.argv[3])
+for i in range(writes):
+    with config_transaction("test_write") as txn:
+        txn.set_meta("counter", txn.get_meta("counter", 0) + 1)
+        txn.put("videos", f"{writer}-{i}", {"video_id": f"{writer}-{i}"})
+"""
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_concurrent_writers_lose_nothing(backend, tmp_path, monkeypatch):
+    processes, writes = 4, 40
+    env = dict(os.environ, TWELVELABS_STATE_DIR=str(tmp_path), TWELVELABS_STATE_BACKEND=backend)
+    writers = [
+        subprocess.Popen([sys.executable, "-c", WRITER, str(PLUGIN_DIR), str(n), str(writes)], env=env)
+        for n in range(processes)
+    ]
+    assert [w.wait(timeout=120) for w in writers] == [0] * processes
+
+    monkeypatch.setattr(config_helper, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(config_helper, "STATE_BACKEND", backend)
+    with config_helper.get_backend().read() as txn:
+        assert txn.get_meta("counter") == processes * writes
+        assert len(list(txn.rows("videos"))) == processes * writes
+
+
+@pytest.mark.parametrize("name, backend_class, file_name", [
+    ("sqlite", SQLiteBackend, "state.db"),
+    ("json", JsonBackend, "config.json"),
+    ("journal", JournalBackend, "journal/snapshot"),
+])
+def test_backend_selection_migrates_config_json(tmp_path, name, backend_class, file_name):
+    legacy = {"videos": {"v1": {"video_id": "v1"}}, "pending_tasks": {}, "default_index_id": "i1"}
+    (tmp_path / "config.json").write_text(json.dumps(legacy))
+
+    backend = open_backend(name, tmp_path, DEFAULT)
+    assert isinstance(backend, backend_class)
+    with backend.transaction() as txn:
+        txn.put("pending_tasks", "t1", {"task_id": "t1"})
+        assert txn.get("videos", "v1") == {"video_id": "v1"}
+        assert txn.get_meta("default_index_id") == "i1"
+    assert backend.path == tmp_path / file_name
+    assert backend.path.exists()
+    backend.close()
+
+
+def test_unknown_backend_is_value_error(tmp_path):
+    with pytest.raises(ValueError, match="Unknown state backend"):
+        open_backend("redis", tmp_path, DEFAULT)
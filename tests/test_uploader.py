@@ -0,0 +1,123 @@
+import asyncio
+import os
+import random
+import urllib.error
+import urllib.request
+
+import pytest
+
+import config_helper
+import uploader
+from upload_server import start_server
+from uploader import HttpTransport, upload
+
+CHUNK = 1024
+CHUNKS = 11
+
+
+class InterruptedTransport(HttpTransport):
+    """Fails for good on the chunk at index `stop`, like a run cut short there."""
+
+    def __init__(self, base_url: str, stop: int):
+        super().__init__(base_url)
+        self.stop = stop
+
+    def put_chunk(self, upload_id, index, data, sha256):
+        if index >= self.stop:
+            raise urllib.error.HTTPError(self.base_url, 400, "Interrupted", {}, None)
+        return super().put_chunk(upload_id, index, data, sha256)
+
+
+def run(path, transport, **options):
+    options.setdefault("chunk_size", CHUNK)
+    options.setdefault("workers", 1)
+    return asyncio.run(asyncio.wait_for(upload(str(path), transport, **options), timeout=60))
+
+
+def download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=10) as resp:
+        return resp.read()
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = start_server(tmp_path / "server")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(os.urandom(CHUNK * (CHUNKS - 1) + 100))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(uploader, "RETRY_DELAY", 0)
+
+
+def test_clean_upload(server, video):
+    result = run(video, HttpTransport(server.url), workers=4)
+    assert (result["sent"], result["reused"]) == (CHUNKS, 0)
+    assert download(result["url"]) == video.read_bytes()
+    assert server.stats["chunks"] == CHUNKS
+    assert server.stats["completed"] == 1
+    assert config_helper.get_upload(str(video))["status"] == "complete"
+
+    # A finished upload is reused without contacting the server
+    requests = server.stats["requests"]
+    again = run(video, HttpTransport(server.url))
+    assert (again["url"], again["sent"]) == (result["url"], 0)
+    assert server.stats["requests"] == requests
+
+
+def test_resume_sends_only_unacknowledged_chunks(server, video):
+    with pytest.raises(urllib.error.HTTPError):
+        run(video, InterruptedTransport(server.url, stop=5))
+    assert len(config_helper.get_upload(str(video))["chunks"]) == 5
+    assert server.stats["chunks"] == 5
+
+    lines = []
+    result = run(video, HttpTransport(server.url), log=lines.append)
+    assert (result["sent"], result["reused"]) == (CHUNKS - 5, 5)
+    assert server.stats["chunks"] == CHUNKS
+    assert any(line.startswith("resuming") for line in lines)
+    assert download(result["url"]) == video.read_bytes()
+
+
+def test_retries_failed_and_corrupted_chunks(tmp_path, video):
+    random.seed(7)
+    server = start_server(tmp_path / "server", failure_rate=0.3, corrupt_rate=0.3)
+    try:
+        result = run(video, HttpTransport(server.url))
+        assert server.stats["failed"] > 0
+        assert server.stats["rejected"] > 0
+        assert server.stats["chunks"] == CHUNKS
+        assert download(result["url"]) == video.read_bytes()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("change", ["size", "mtime"])
+def test_restarts_when_the_file_changed(server, video, change):
+    with pytest.raises(urllib.error.HTTPError):
+        run(video, InterruptedTransport(server.url, stop=5))
+    first_id = config_helper.get_upload(str(video))["upload_id"]
+
+    stat = video.stat()
+    if change == "size":
+        with open(video, "ab") as f:
+            f.write(os.urandom(CHUNK))
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    lines = []
+    result = run(video, HttpTransport(server.url), log=lines.append)
+    total = -(-video.stat().st_size // CHUNK)
+    assert result["upload_id"] != first_id
+    assert (result["sent"], result["reused"]) == (total, 0)
+    assert any(line.startswith("restarting") for line in lines)
+    assert download(result["url"]) == video.read_bytes()